@@ -0,0 +1,10 @@
+from .data import generate_users
+from .fakes import FakeMessage, FakeUpdate, FakeContext, FakeBot
+
+__all__ = [
+    'generate_users',
+    'FakeMessage',
+    'FakeUpdate',
+    'FakeContext',
+    'FakeBot',
+]
@@ -0,0 +1,61 @@
+import argparse
+import json
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> list:
+    """
+    Compares the median times of two benchmark runs.
+
+    Args:
+    - baseline (dict): The results of the earlier run.
+    - current (dict): The results of the later run.
+    - threshold (float, optional): The relative slowdown reported as a regression. Defaults to 0.1.
+
+    Returns:
+    - list: The name, baseline median, current median, ratio and regression flag of every benchmark.
+    """
+    def flatten(results: dict, prefix: str = '') -> dict:
+        medians = {}
+
+        for name, result in results.items():
+            if isinstance(result, dict) and 'median' in result:
+                medians[prefix + name] = result['median']
+            elif isinstance(result, dict):
+                medians.update(flatten(result, f'{prefix}{name}.'))
+
+        return medians
+
+    before = flatten(baseline['results'])
+    after = flatten(current['results'])
+    rows = []
+
+    for name in before.keys() & after.keys():
+        ratio = after[name] / before[name] if before[name] else float('inf')
+        rows.append((name, before[name], after[name], ratio, ratio > 1 + threshold))
+
+    return sorted(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare two JSON benchmark results.')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline_report = json.load(file)
+
+    with open(args.current, encoding='utf-8') as file:
+        current_report = json.load(file)
+
+    regressions = 0
+
+    for name, before_median, after_median, ratio, regressed in compare(
+            baseline_report, current_report, args.threshold
+    ):
+        regressions += regressed
+        print(f'{name:40} {before_median * 1000:10.3f}ms {after_median * 1000:10.3f}ms '
+              f'{ratio:6.2f}x{"  REGRESSION" if regressed else ""}')
+
+    raise SystemExit(1 if regressions else 0)
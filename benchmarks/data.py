@@ -0,0 +1,74 @@
+import random
+from datetime import date
+
+from classes import Expense, Income, User
+from constants import categories
+from storage import Storage
+
+INCOME_CATEGORIES = ['Salary', 'Freelance', 'Gift', 'Interest']
+
+
+def generate_users(
+        storage: Storage,
+        users_count: int,
+        transactions_count: int,
+        days: int = 730,
+        seed: int = 0,
+) -> list:
+    """
+    Fills the storage with synthetic users and transactions.
+
+    Every user gets transactions_count transactions, three quarters of them
+    expenses in the categories from constants.categories and the rest incomes,
+    dated within the last days days. The same seed always gives the same data.
+
+    Args:
+    - storage (Storage): The storage to fill.
+    - users_count (int): The number of users.
+    - transactions_count (int): The number of transactions per user.
+    - days (int, optional): The number of days the transactions are spread over. Defaults to 730.
+    - seed (int, optional): The seed of the random generator. Defaults to 0.
+
+    Returns:
+    - list: The IDs of the generated users.
+    """
+    generator = random.Random(seed)
+    last_day = date.today().toordinal()
+    user_ids = []
+
+    for number in range(users_count):
+        user_id = str(100000 + number)
+        user = User(f'User {number}')
+        storage.users[user_id] = user
+        storage.submit({'op': 'user', 'user_id': user_id, 'name': user.name})
+
+        for _ in range(transactions_count):
+            date_ordinal = last_day - generator.randrange(days)
+            amount = round(generator.uniform(1, 5000), 2)
+
+            if generator.random() < 0.75:
+                category = generator.choice(categories).split()[0]
+                record_type = 'expenses'
+                record = Expense(amount, f'Item {generator.randrange(1000)}', category, date_ordinal)
+                user.create_expenses(category)
+                user.add_expense(category, record)
+            else:
+                category = generator.choice(INCOME_CATEGORIES)
+                record_type = 'incomes'
+                record = Income(category, amount, date_ordinal)
+                user.create_incomes(category)
+                user.add_income(category, record)
+
+            storage.submit({
+                'op': 'add',
+                'user_id': user_id,
+                'record_type': record_type,
+                'category': category,
+                'record': record.to_dict(),
+            })
+
+        user_ids.append(user_id)
+
+    storage.flush()
+
+    return user_ids
@@ -0,0 +1,142 @@
+import time
+from collections import deque
+from types import SimpleNamespace
+
+from telegram.error import RetryAfter
+
+
+class FakeMessage:
+    """
+    Stands in for a Telegram message. The handlers reply through the send queue,
+    so the replies are recorded by FakeBot.
+    """
+    def __init__(self, text: str, user_id: int, first_name: str = 'Benchmark') -> None:
+        """
+        Initializes a new FakeMessage object.
+
+        Args:
+        - text (str): The text of the message.
+        - user_id (int): The ID of the sender.
+        - first_name (str, optional): The first name of the sender. Defaults to 'Benchmark'.
+        """
+        self.text = text
+        self.chat_id = user_id
+        self.from_user = SimpleNamespace(id=user_id, first_name=first_name)
+        self.photo = [SimpleNamespace(file_id=f'photo-{user_id}')]
+
+
+class FakeUpdate:
+    """
+    Stands in for a Telegram update carrying a text message.
+    """
+    def __init__(self, text: str, user_id: int) -> None:
+        """
+        Initializes a new FakeUpdate object.
+
+        Args:
+        - text (str): The text of the message.
+        - user_id (int): The ID of the sender.
+        """
+        self.message = FakeMessage(text, user_id)
+        self.effective_chat = SimpleNamespace(id=user_id)
+        self.effective_user = self.message.from_user
+
+
+class FakeContext:
+    """
+    Stands in for the CallbackContext of one user, keeping their user_data between updates.
+    """
+    def __init__(self) -> None:
+        """
+        Initializes a new FakeContext object.
+        """
+        self.user_data = {}
+        self.chat_data = {}
+        self.bot_data = {}
+
+
+class FakeBot:
+    """
+    Stands in for the Bot API, recording the calls and enforcing a per-chat flood limit.
+
+    A call to a chat that already got chat_limit calls within the last second
+    is refused with RetryAfter, like Telegram does under a flood.
+
+    Methods:
+    - send_message(self, chat_id: int, text: str, **kwargs) -> SimpleNamespace:
+                Records a text message.
+    - send_photo(self, chat_id: int, photo, **kwargs) -> SimpleNamespace:
+                Records a photo.
+    - send_document(self, chat_id: int, document, **kwargs) -> SimpleNamespace:
+                Records a document.
+    - edit_message_text(self, chat_id: int, message_id: int, text: str, **kwargs) -> SimpleNamespace:
+                Records an edit of a text message.
+    """
+    def __init__(self, chat_limit: int = None, retry_after: int = 1) -> None:
+        """
+        Initializes a new FakeBot object.
+
+        Args:
+        - chat_limit (int, optional): The number of calls a chat accepts per second.
+                                    Unlimited if not set.
+        - retry_after (int, optional): The number of seconds a refused call asks to wait.
+                                    Defaults to 1.
+        """
+        self.chat_limit = chat_limit
+        self.retry_after = retry_after
+        self.calls = []
+        self.refused = 0
+        self._recent = {}
+
+    def _call(self, method: str, chat_id: int, **kwargs) -> SimpleNamespace:
+        """
+        Records a call, or refuses it if the chat is over its flood limit.
+
+        Args:
+        - method (str): The name of the Bot method.
+        - chat_id (int): The chat ID.
+        - **kwargs: The arguments of the call.
+
+        Returns:
+        - SimpleNamespace: The sent message.
+
+        Raises:
+        - RetryAfter: If the chat got chat_limit calls within the last second.
+        """
+        now = time.monotonic()
+        recent = self._recent.setdefault(chat_id, deque())
+
+        while recent and recent[0] <= now - 1:
+            recent.popleft()
+
+        if self.chat_limit is not None and len(recent) >= self.chat_limit:
+            self.refused += 1
+            raise RetryAfter(self.retry_after)
+
+        recent.append(now)
+        self.calls.append((method, chat_id, kwargs))
+
+        return SimpleNamespace(
+            message_id=len(self.calls),
+            chat_id=chat_id,
+            text=kwargs.get('text'),
+            photo=[SimpleNamespace(file_id=f'photo-{len(self.calls)}')],
+        )
+
+    async def send_message(self, chat_id: int, text: str, **kwargs) -> SimpleNamespace:
+        return self._call('send_message', chat_id, text=text, **kwargs)
+
+    async def send_photo(self, chat_id: int, photo, **kwargs) -> SimpleNamespace:
+        return self._call('send_photo', chat_id, photo=photo, **kwargs)
+
+    async def send_document(self, chat_id: int, document, **kwargs) -> SimpleNamespace:
+        return self._call('send_document', chat_id, document=document, **kwargs)
+
+    async def edit_message_text(
+            self,
+            chat_id: int,
+            message_id: int,
+            text: str,
+            **kwargs
+    ) -> SimpleNamespace:
+        return self._call('edit_message_text', chat_id, message_id=message_id, text=text, **kwargs)
@@ -0,0 +1,302 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from itertools import cycle
+from typing import Callable
+
+import constants
+import utils
+from classes import Expense
+from outbound import SendQueue
+from storage import Storage, JournalStorage, SqliteStorage
+from .data import generate_users
+from .fakes import FakeUpdate, FakeContext, FakeBot
+
+
+def bind(values: dict) -> None:
+    """
+    Points the modules that imported the given names from constants at other objects.
+
+    Args:
+    - values (dict): The objects keyed by the name they were imported as.
+
+    Returns:
+    - None
+    """
+    modules = [constants, utils]
+
+    for name in ('commands.text_handlers', 'commands.add_expense_income_handler',
+                 'commands.delete_handlers', 'commands.view_records_handlers',
+                 'commands.statistic_handlers', 'commands.budget_handlers',
+                 'commands.build_chart'):
+        if name in sys.modules:
+            modules.append(sys.modules[name])
+
+    for module in modules:
+        for name, value in values.items():
+            if hasattr(module, name):
+                setattr(module, name, value)
+
+
+def bind_storage(storage: Storage) -> None:
+    """
+    Points the modules that imported the storage and its users at another storage.
+
+    Args:
+    - storage (Storage): The storage to use.
+
+    Returns:
+    - None
+    """
+    bind({'storage': storage, 'users': storage.users})
+
+
+def measure(func: Callable[[], object], repeat: int) -> dict:
+    """
+    Times a function and measures the peak of memory allocated by one call.
+
+    Args:
+    - func (Callable[[], object]): The function to measure.
+    - repeat (int): The number of timed calls.
+
+    Returns:
+    - dict: The minimum, median and mean time of a call in seconds and the peak of memory in bytes.
+    """
+    timings = []
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    func()
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'calls': repeat,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.fmean(timings),
+        'peak_bytes': peak,
+    }
+
+
+def benchmark_utils(storage: Storage, user_ids: list, repeat: int) -> dict:
+    """
+    Measures the utils query and aggregation functions and the write path.
+
+    Args:
+    - storage (Storage): The storage filled with the users.
+    - user_ids (list): The IDs of the users to query in turn.
+    - repeat (int): The number of timed calls of each function.
+
+    Returns:
+    - dict: The results keyed by the name of the measured call.
+    """
+    today = date.today()
+    quarter = ((today - timedelta(days=90)).isoformat(), today.isoformat())
+    next_user = cycle(user_ids).__next__
+
+    def save_record() -> None:
+        user_id = next_user()
+        record = Expense(10, 'Benchmark', 'Other', today.toordinal())
+        user = storage.users[user_id]
+        user.create_expenses('Other')
+        user.add_expense('Other', record)
+        utils.save_record(user_id, 'expenses', record)
+        storage.flush()
+
+    def load_user() -> None:
+        user_id = next_user()
+        storage.users.evict(user_id)
+        storage.users[user_id]
+
+    cases = {
+        'get_records_by_date[Month]':
+            lambda: utils.get_records_by_date(next_user(), 'expenses', 'Month'),
+        'get_records_by_date[Year]':
+            lambda: utils.get_records_by_date(next_user(), 'expenses', 'Year'),
+        'get_records_page[all]':
+            lambda: utils.get_records_page(next_user(), 'expenses'),
+        'get_records_page[Year]':
+            lambda: utils.get_records_page(next_user(), 'expenses', 'Year'),
+        'get_general_amount[all]':
+            lambda: utils.get_general_amount(next_user(), 'expenses'),
+        'get_general_amount[90 days]':
+            lambda: utils.get_general_amount(next_user(), 'expenses', quarter),
+        'get_amounts_by_category[all]':
+            lambda: utils.get_amounts_by_category(next_user(), 'expenses'),
+        'get_amounts_by_category[90 days]':
+            lambda: utils.get_amounts_by_category(next_user(), 'expenses', quarter),
+        'save_record': save_record,
+        'load_user': load_user,
+    }
+
+    return {name: measure(func, repeat) for name, func in cases.items()}
+
+
+def benchmark_handlers(storage: Storage, user_ids: list, repeat: int) -> dict:
+    """
+    Measures full conversation flows of the handlers against fake updates.
+
+    The replies are sent to a fake Bot API without rate limits, and every
+    flow waits until its replies have been sent.
+
+    Args:
+    - storage (Storage): The storage filled with the users.
+    - user_ids (list): The IDs of the users sending the updates in turn.
+    - repeat (int): The number of timed runs of each flow.
+
+    Returns:
+    - dict: The results keyed by the name of the flow, or the reason they were skipped.
+    """
+    try:
+        import commands
+    except (ImportError, SyntaxError) as error:
+        return {'skipped': f'handlers are not importable: {error}'}
+
+    bind_storage(storage)
+    outbox = SendQueue(bot=FakeBot())
+    bind({'outbox': outbox})
+    flows = {
+        'add_expense': [
+            (commands.add_transaction, '/add_expense'),
+            (commands.get_transaction, constants.categories[0]),
+            (commands.get_title, 'Benchmark'),
+            (commands.get_price, '42'),
+            (commands.get_date, 'No'),
+        ],
+        'list': [
+            (commands.view_records, '/list'),
+        ],
+        'list_by_filter': [
+            (commands.get_filter, '/list_by_filter'),
+            (commands.get_records_by_filter, constants.EXPENSES),
+            (commands.filter_by_date, constants.MONTH),
+        ],
+        'delete_record': [
+            (commands.delete_record, '/delete_record'),
+            (commands.select_item, constants.EXPENSES),
+            (commands.delete_item, '1'),
+        ],
+    }
+    next_user = cycle(user_ids).__next__
+    contexts = {user_id: FakeContext() for user_id in user_ids}
+
+    def run_flow(steps: list) -> None:
+        user_id = next_user()
+
+        async def send_updates() -> None:
+            for handler, text in steps:
+                await handler(FakeUpdate(text, int(user_id)), contexts[user_id])
+
+            await outbox.stop()
+
+        asyncio.run(send_updates())
+
+    return {name: measure(lambda: run_flow(steps), repeat) for name, steps in flows.items()}
+
+
+def get_commit() -> str | None:
+    """
+    Returns the current git commit of the repository.
+
+    Returns:
+    - str | None: The hash of the commit, None outside of a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+        backend: str,
+        users_count: int,
+        transactions_count: int,
+        repeat: int,
+        seed: int,
+        handlers: bool = True,
+) -> dict:
+    """
+    Generates the synthetic data in a temporary directory and runs the benchmarks.
+
+    Args:
+    - backend (str): The storage backend ('journal' or 'sqlite').
+    - users_count (int): The number of users.
+    - transactions_count (int): The number of transactions per user.
+    - repeat (int): The number of timed calls of each benchmark.
+    - seed (int): The seed of the data generator.
+    - handlers (bool, optional): Whether to measure the handler flows. Defaults to True.
+
+    Returns:
+    - dict: The parameters, the environment and the results of the run.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        if backend == 'sqlite':
+            storage = SqliteStorage(os.path.join(directory, 'data.sqlite3'), cache_size=users_count)
+        else:
+            storage = JournalStorage(os.path.join(directory, 'data'), cache_size=users_count)
+
+        bind_storage(storage)
+        storage.start()
+
+        started = time.perf_counter()
+        user_ids = generate_users(storage, users_count, transactions_count, seed=seed)
+        generate_time = time.perf_counter() - started
+
+        results = benchmark_utils(storage, user_ids, repeat)
+
+        if handlers:
+            results['handlers'] = benchmark_handlers(storage, user_ids, repeat)
+
+        storage.close()
+
+    return {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'backend': backend,
+        'users': users_count,
+        'transactions_per_user': transactions_count,
+        'repeat': repeat,
+        'seed': seed,
+        'generate_seconds': generate_time,
+        'results': results,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the utils queries and the handler flows.')
+    parser.add_argument('--backend', choices=['journal', 'sqlite'], default=constants.STORAGE_BACKEND)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--transactions', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-handlers', action='store_true')
+    parser.add_argument('--output', help='The file to write the JSON results to, stdout by default.')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    report = run(
+        args.backend, args.users, args.transactions, args.repeat, args.seed, not args.no_handlers
+    )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
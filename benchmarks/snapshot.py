@@ -0,0 +1,180 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from storage import JournalStorage
+from storage.snapshot import Snapshot, write_snapshot
+from .data import generate_users
+from .run import get_commit
+
+CASES = ['json.load', 'snapshot.open', 'snapshot.load_user', 'snapshot.get_all']
+
+
+def get_rss() -> int:
+    """
+    Returns the resident set size of this process.
+
+    Returns:
+    - int: The RSS in bytes, the peak RSS where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def load(case: str, json_path: str, snapshot_path: str, user_id: str) -> object:
+    """
+    Loads the data the way a case does.
+
+    Args:
+    - case (str): The case, one of CASES.
+    - json_path (str): The path to the data.json snapshot.
+    - snapshot_path (str): The path to the binary snapshot.
+    - user_id (str): The ID of the user loaded by 'snapshot.load_user'.
+
+    Returns:
+    - object: The loaded data, or the open snapshot for 'snapshot.open'.
+    """
+    if case == 'json.load':
+        with open(json_path, 'r') as file:
+            return json.load(file)
+
+    snapshot = Snapshot(snapshot_path)
+
+    if case == 'snapshot.load_user':
+        return snapshot, snapshot.load_user(user_id)
+
+    if case == 'snapshot.get_all':
+        return {snapshot_user_id: snapshot.get_user(snapshot_user_id)
+                for snapshot_user_id in snapshot.user_ids()}
+
+    return snapshot
+
+
+def measure_case(case: str, json_path: str, snapshot_path: str, user_id: str) -> dict:
+    """
+    Loads the data once in this process and measures the time and the growth of the RSS.
+
+    The loaded data is kept while the RSS is read, so the RSS includes it and,
+    for the snapshot, the pages of the mapping that were read.
+
+    Called in a fresh process for every run, so the RSS of one run is not
+    hidden by the memory left over from another one.
+
+    Args:
+    - case (str): The case, one of CASES.
+    - json_path (str): The path to the data.json snapshot.
+    - snapshot_path (str): The path to the binary snapshot.
+    - user_id (str): The ID of the user loaded by 'snapshot.load_user'.
+
+    Returns:
+    - dict: The time in seconds and the growth of the RSS in bytes.
+    """
+    before = get_rss()
+    started = time.perf_counter()
+    data = load(case, json_path, snapshot_path, user_id)
+    elapsed = time.perf_counter() - started
+    rss = get_rss() - before
+    del data
+
+    return {'seconds': elapsed, 'rss_bytes': rss}
+
+
+def run(users_count: int, transactions_count: int, repeat: int, seed: int) -> dict:
+    """
+    Generates the synthetic data as data.json and as a binary snapshot and compares loading them.
+
+    Args:
+    - users_count (int): The number of users.
+    - transactions_count (int): The number of transactions per user.
+    - repeat (int): The number of runs of each case, each in a fresh process.
+    - seed (int): The seed of the data generator.
+
+    Returns:
+    - dict: The parameters, the environment, the file sizes and the results of the run.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        storage = JournalStorage(os.path.join(directory, 'data'), cache_size=users_count)
+        storage.start()
+        user_ids = generate_users(storage, users_count, transactions_count, seed=seed)
+        users = {user_id: storage.users[user_id].to_dict() for user_id in user_ids}
+        storage.close()
+
+        json_path = os.path.join(directory, 'data.json')
+        snapshot_path = os.path.join(directory, 'data.snapshot')
+
+        with open(json_path, 'w') as file:
+            json.dump(users, file, indent=4)
+
+        write_snapshot(users, snapshot_path)
+        del users
+        results = {}
+
+        for case in CASES:
+            runs = [
+                json.loads(subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.snapshot', '--case', case,
+                     json_path, snapshot_path, user_ids[0]],
+                    capture_output=True, text=True, check=True,
+                ).stdout)
+                for _ in range(repeat)
+            ]
+            timings = [result['seconds'] for result in runs]
+            results[case] = {
+                'calls': repeat,
+                'min': min(timings),
+                'median': statistics.median(timings),
+                'mean': statistics.fmean(timings),
+                'rss_bytes': statistics.median(result['rss_bytes'] for result in runs),
+            }
+
+        sizes = {'json_bytes': os.path.getsize(json_path),
+                 'snapshot_bytes': os.path.getsize(snapshot_path)}
+
+    return {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'users': users_count,
+        'transactions_per_user': transactions_count,
+        'repeat': repeat,
+        'seed': seed,
+        **sizes,
+        'results': results,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Compare loading data.json with json.load and the binary snapshot.'
+    )
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--transactions', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='The file to write the JSON results to, stdout by default.')
+    parser.add_argument('--case', choices=CASES, help=argparse.SUPPRESS)
+    parser.add_argument('paths', nargs='*', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(measure_case(args.case, *args.paths)))
+        raise SystemExit(0)
+
+    logging.disable(logging.INFO)
+    report = run(args.users, args.transactions, args.repeat, args.seed)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
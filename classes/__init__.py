@@ -1,4 +1,5 @@
 from .transaction import Expense, Income
-from .user import User
+from .date_index import DateIndex
+from .user import User, covers_whole_months
 
-__all__ = ['Expense', 'Income', 'User']
+__all__ = ['Expense', 'Income', 'DateIndex', 'User', 'covers_whole_months']
@@ -0,0 +1,124 @@
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
+
+from .transaction import Transaction
+
+SORT_KEY = attrgetter('date', 'id')
+
+
+class DateIndex:
+    """
+    Date-sorted index of transactions.
+
+    Keeps a sorted list of date ordinals with a parallel list of the transactions,
+    so a date range is located with two binary searches and only
+    the matching transactions are touched. Transactions of the same date are
+    ordered by ID, like the SQLite backend orders them, so a listing is paged
+    the same way whichever of them answers it.
+
+    Methods:
+    - add(self, record: Transaction) -> None:
+                Inserts a transaction keeping the index sorted.
+    - extend(self, records: list) -> None:
+                Adds many transactions, sorting the index once.
+    - remove(self, record: Transaction) -> None:
+                Removes a transaction from the index.
+    - between(self, start: int = None, end: int = None) -> list:
+                Returns the transactions within the date range.
+    """
+    def __init__(self, records=None) -> None:
+        """
+        Initializes a new DateIndex object.
+
+        Args:
+        - records (iterable, optional): The transactions to index. Defaults to None.
+        """
+        self.records = sorted(records or [], key=SORT_KEY)
+        self.ordinals = [record.date for record in self.records]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _find(self, record: Transaction) -> int:
+        """
+        Locates the position of a transaction among the ones with the same date.
+
+        Args:
+        - record (Transaction): The transaction.
+
+        Returns:
+        - int: The position of the transaction, or where it belongs.
+        """
+        start = bisect_left(self.ordinals, record.date)
+        end = bisect_right(self.ordinals, record.date, start)
+
+        return bisect_left(self.records, record.id, start, end, key=attrgetter('id'))
+
+    def add(self, record: Transaction) -> None:
+        """
+        Inserts a transaction at its date, ordered by ID among the ones with the same date.
+
+        Args:
+        - record (Transaction): The transaction to add.
+        """
+        position = self._find(record)
+        self.ordinals.insert(position, record.date)
+        self.records.insert(position, record)
+
+    def extend(self, records: list) -> None:
+        """
+        Adds many transactions at once.
+
+        The index is sorted once instead of inserting every transaction,
+        which would move the tail of the lists for each of them.
+
+        Args:
+        - records (list): The transactions to add.
+        """
+        self.records.extend(records)
+        self.records.sort(key=SORT_KEY)
+        self.ordinals = [record.date for record in self.records]
+
+    def remove(self, record: Transaction) -> None:
+        """
+        Removes a transaction from the index.
+
+        Args:
+        - record (Transaction): The transaction to remove.
+        """
+        position = self._find(record)
+
+        if position < len(self.records) and self.records[position] is record:
+            del self.ordinals[position]
+            del self.records[position]
+
+    def bounds(self, start: int = None, end: int = None) -> tuple:
+        """
+        Locates the positions of a date range in the index.
+
+        Args:
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+
+        Returns:
+        - tuple: The first position in the range and the position after the last one.
+        """
+        first = 0 if start is None else bisect_left(self.ordinals, start)
+        last = len(self.ordinals) if end is None else bisect_right(self.ordinals, end, first)
+
+        return first, last
+
+    def between(self, start: int = None, end: int = None) -> list:
+        """
+        Returns the transactions within the date range, ordered by date.
+
+        Args:
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+
+        Returns:
+        - list: The transactions.
+        """
+        first, last = self.bounds(start, end)
+
+        return self.records[first:last]
@@ -1,9 +1,29 @@
+import sys
+import uuid
 from abc import ABC, abstractmethod
-from datetime import datetime
+from datetime import date
+
+
+def new_record_id() -> str:
+    """
+    Generates a new unique ID for a transaction.
+
+    Returns:
+        str: The ID.
+    """
+    return uuid.uuid4().hex[:12]
 
 
 class Transaction(ABC):
-    """Abstract base class for representing transaction objects."""
+    """
+    Abstract base class for representing transaction objects.
+
+    Transactions are compact records with a persistent unique ID: their date is
+    held as a date ordinal, so filters compare integers, and their category is interned.
+    They are converted from and to the data.json layout only at the persistence boundary.
+    """
+    __slots__ = ()
+
     @abstractmethod
     def __repr__(self):
         """
@@ -11,15 +31,35 @@ class Transaction(ABC):
         for providing string representation of transactions.
         """
 
+    @abstractmethod
+    def to_dict(self) -> dict:
+        """
+        Abstract method to be implemented by subclasses
+        for converting transactions to the data.json layout.
+        """
+
+    @property
+    def date_string(self) -> str:
+        """
+        Return the date of the transaction in YYYY-MM-DD format.
+
+        Returns:
+            str: The date of the transaction.
+        """
+        return date.fromordinal(self.date).isoformat()
+
 
 class Expense(Transaction):
     """Represents an expense transaction."""
+    __slots__ = ('id', 'category', 'title', 'amount', 'date')
+
     def __init__(
             self,
             amount: float,
             title: str,
             category: str,
-            date: datetime = datetime.now().date(),
+            date_ordinal: int = None,
+            record_id: str = None,
     ):
         """
         Initialize an Expense object.
@@ -28,13 +68,49 @@ class Expense(Transaction):
             amount (float): The amount of the expense.
             title (str): The title or description of the expense.
             category (str): The category to which the expense belongs.
-            date (datetime, optional): The date of the expense transaction.
+            date_ordinal (int, optional): The date of the expense transaction as a date ordinal.
                                         Defaults to current date.
+            record_id (str, optional): The ID of the transaction. Defaults to a new ID.
         """
-        self.category = category
+        self.id = new_record_id() if record_id is None else record_id
+        self.category = sys.intern(category)
         self.title = title
         self.amount = amount
-        self.date = date
+        self.date = date.today().toordinal() if date_ordinal is None else date_ordinal
+
+    @classmethod
+    def from_dict(cls, record: dict) -> 'Expense':
+        """
+        Create an Expense object from a record in the data.json layout.
+
+        Parameters:
+            record (dict): The record.
+
+        Returns:
+            Expense: The expense transaction.
+        """
+        return cls(
+            record['amount'],
+            record['title'],
+            record['category'],
+            date.fromisoformat(record['date']).toordinal(),
+            record.get('id'),
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Convert the expense transaction to the data.json layout.
+
+        Returns:
+            dict: The record.
+        """
+        return {
+            'id': self.id,
+            'category': self.category,
+            'title': self.title,
+            'amount': self.amount,
+            'date': self.date_string,
+        }
 
     def __repr__(self):
         """
@@ -44,16 +120,19 @@ class Expense(Transaction):
             str: String representation of the expense transaction.
         """
         return (f"Category: "
-                f"{self.category}\nName: {self.title}\nAmount: {self.amount}UAH\nDate: {self.date}")
+                f"{self.category}\nName: {self.title}\nAmount: {self.amount}UAH\nDate: {self.date_string}")
 
 
 class Income(Transaction):
     """Represents an income transaction."""
+    __slots__ = ('id', 'category', 'amount', 'date')
+
     def __init__(
             self,
             category: str,
             amount: float,
-            date: datetime = datetime.now().date(),
+            date_ordinal: int = None,
+            record_id: str = None,
     ):
         """
         Initialize an Income object.
@@ -61,11 +140,46 @@ class Income(Transaction):
         Parameters:
             category (str): The category to which the income belongs.
             amount (float): The amount of the income.
-            date (datetime, optional): The date of the income transaction. Defaults to current date.
+            date_ordinal (int, optional): The date of the income transaction as a date ordinal.
+                                        Defaults to current date.
+            record_id (str, optional): The ID of the transaction. Defaults to a new ID.
         """
-        self.category = category
+        self.id = new_record_id() if record_id is None else record_id
+        self.category = sys.intern(category)
         self.amount = amount
-        self.date = date
+        self.date = date.today().toordinal() if date_ordinal is None else date_ordinal
+
+    @classmethod
+    def from_dict(cls, record: dict) -> 'Income':
+        """
+        Create an Income object from a record in the data.json layout.
+
+        Parameters:
+            record (dict): The record.
+
+        Returns:
+            Income: The income transaction.
+        """
+        return cls(
+            record['category'],
+            record['amount'],
+            date.fromisoformat(record['date']).toordinal(),
+            record.get('id'),
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Convert the income transaction to the data.json layout.
+
+        Returns:
+            dict: The record.
+        """
+        return {
+            'id': self.id,
+            'category': self.category,
+            'amount': self.amount,
+            'date': self.date_string,
+        }
 
     def __repr__(self):
         """
@@ -74,4 +188,4 @@ class Income(Transaction):
         Returns:
             str: String representation of the income transaction.
         """
-        return f"{self.category} - {self.amount} UAH\nDate: {self.date}"
+        return f"{self.category} - {self.amount} UAH\nDate: {self.date_string}"
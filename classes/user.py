@@ -1,3 +1,100 @@
+from collections import deque
+from datetime import date
+
+from .date_index import DateIndex
+from .transaction import Expense, Income, Transaction
+
+CHANGE_LOG_SIZE = 1000  # changes of one type of transactions kept for derived data to catch up
+
+
+def get_month(date_ordinal: int) -> int:
+    """
+    Returns the number of the month a date belongs to, counted from year 0.
+
+    Args:
+    - date_ordinal (int): The date ordinal.
+
+    Returns:
+    - int: The month number.
+    """
+    day = date.fromordinal(date_ordinal)
+
+    return day.year * 12 + day.month - 1
+
+
+def get_month_bounds(month: int) -> tuple:
+    """
+    Returns the date ordinals of the first and the last day of a month.
+
+    Args:
+    - month (int): The month number, as returned by get_month.
+
+    Returns:
+    - tuple: The date ordinals of the first and the last day.
+    """
+    year, month_index = divmod(month, 12)
+    next_year, next_month_index = divmod(month + 1, 12)
+    first_day = date(year, month_index + 1, 1).toordinal()
+    next_first_day = date(next_year, next_month_index + 1, 1).toordinal()
+
+    return first_day, next_first_day - 1
+
+
+def covers_whole_months(start: int = None, end: int = None) -> bool:
+    """
+    Checks if a date range is all time or made of whole months.
+
+    The running totals answer such ranges without scanning any transaction.
+
+    Args:
+    - start (int, optional): The date ordinal of the first day of the range.
+    - end (int, optional): The date ordinal of the last day of the range.
+
+    Returns:
+    - bool: True if the range is all time or starts and ends on month boundaries.
+    """
+    if start is None and end is None:
+        return True
+
+    if start is None or end is None:
+        return False
+
+    return (start == get_month_bounds(get_month(start))[0]
+            and end == get_month_bounds(get_month(end))[1])
+
+
+def get_week(date_ordinal: int) -> int:
+    """
+    Returns the number of the Monday-to-Sunday week a date belongs to.
+
+    Args:
+    - date_ordinal (int): The date ordinal.
+
+    Returns:
+    - int: The week number.
+    """
+    return (date_ordinal - 1) // 7
+
+
+def get_week_bounds(week: int) -> tuple:
+    """
+    Returns the date ordinals of the Monday and the Sunday of a week.
+
+    Args:
+    - week (int): The week number, as returned by get_week.
+
+    Returns:
+    - tuple: The date ordinals of the first and the last day.
+    """
+    return week * 7 + 1, week * 7 + 7
+
+
+PERIODS = {
+    'week': (get_week, get_week_bounds),
+    'month': (get_month, get_month_bounds),
+}
+
+
 class User:
     """
     Represents a user with their expenses and incomes.
@@ -5,23 +102,52 @@ class User:
     Attributes:
     - name (str): The name of the user.
     - expenses (dict): A dictionary containing expense categories as keys
-                        and lists of expense transactions as values.
+                        and dictionaries of expense transactions keyed by ID as values.
     - incomes (dict): A dictionary containing income categories as keys
-                        and lists of income transactions as values.
+                        and dictionaries of income transactions keyed by ID as values.
+    - records_by_id (dict): The transactions keyed by ID for 'expenses' and for 'incomes'.
+    - index (dict): A date-sorted DateIndex of the transactions
+                        for 'expenses' and for 'incomes'.
+    - totals (dict): Running totals by category for 'expenses' and for 'incomes'.
+    - monthly_totals (dict): Running totals by month and category
+                        for 'expenses' and for 'incomes'.
+    - weekly_totals (dict): Running totals by week and category
+                        for 'expenses' and for 'incomes'.
+    - versions (dict): The number of changes to the transactions
+                        of 'expenses' and of 'incomes', to invalidate derived data.
+    - changes (dict): The last CHANGE_LOG_SIZE changes to the transactions of 'expenses'
+                        and of 'incomes' as (transaction, added) pairs, to update derived data.
+    - budgets (dict): The monthly spending limits keyed by expense category.
 
     Methods:
-    - __init__(self, name: str, expenses=None, incomes=None) -> None:
+    - __init__(self, name: str, expenses=None, incomes=None, budgets=None) -> None:
                 Initializes a new User object.
     - create_expenses(self, category: str) -> None:
                 Creates a new expense category if it does not exist.
     - create_incomes(self, category: str) -> None:
                 Creates a new income category if it does not exist.
-    - add_expense(self, category: str, expense: dict) -> None:
+    - add_expense(self, category: str, expense: Expense) -> None:
                 Adds an expense transaction to the specified category.
-    - add_income(self, category: str, income: dict) -> None:
+    - add_income(self, category: str, income: Income) -> None:
                 Adds an income transaction to the specified category.
+    - add_records(self, record_type: str, records: list) -> None:
+                Adds many transactions at once, creating their categories.
+    - delete_records(self, record_type: str, record_ids: list) -> list:
+                Deletes transactions by their IDs.
+    - set_budget(self, category: str, limit: float | None) -> None:
+                Sets or removes the monthly budget of an expense category.
+    - get_budget_status(self, category: str, date_ordinal: int) -> tuple | None:
+                Returns the amount spent in a category in the month of a date and its budget.
+    - get_amounts_by_category(self, record_type: str, start=None, end=None) -> dict:
+                Returns the total amounts by category within the date range.
+    - get_trend(self, record_type: str, period: str, start: int, end: int) -> list:
+                Returns the amounts by category of every week or month of the date range.
+    - from_dict(cls, data: dict) -> User:
+                Creates a User object from the data.json layout.
+    - to_dict(self) -> dict:
+                Converts the user to the data.json layout.
     """
-    def __init__(self, name: str, expenses=None, incomes=None) -> None:
+    def __init__(self, name: str, expenses=None, incomes=None, budgets=None) -> None:
         """
         Initializes a new User object.
 
@@ -31,6 +157,8 @@ class User:
                                     Defaults to None.
         - incomes (dict, optional): A dictionary containing income categories and transactions.
                                     Defaults to None.
+        - budgets (dict, optional): The monthly spending limits keyed by expense category.
+                                    Defaults to None.
         """
         if incomes is None:
             incomes = {}
@@ -41,6 +169,31 @@ class User:
         self.name = name
         self.expenses = expenses
         self.incomes = incomes
+        self.records_by_id = {
+            'expenses': {
+                record.id: record for records in expenses.values() for record in records.values()
+            },
+            'incomes': {
+                record.id: record for records in incomes.values() for record in records.values()
+            },
+        }
+        self.index = {
+            'expenses': DateIndex(self.records_by_id['expenses'].values()),
+            'incomes': DateIndex(self.records_by_id['incomes'].values()),
+        }
+        self.totals = {'expenses': {}, 'incomes': {}}
+        self.monthly_totals = {'expenses': {}, 'incomes': {}}
+        self.weekly_totals = {'expenses': {}, 'incomes': {}}
+        self.versions = {'expenses': 0, 'incomes': 0}
+        self.changes = {
+            'expenses': deque(maxlen=CHANGE_LOG_SIZE),
+            'incomes': deque(maxlen=CHANGE_LOG_SIZE),
+        }
+        self.budgets = {} if budgets is None else budgets
+
+        for record_type in ('expenses', 'incomes'):
+            for record in self.index[record_type].records:
+                self._add_to_totals(record_type, record)
 
     def create_expenses(self, category: str) -> None:
         """
@@ -50,7 +203,7 @@ class User:
         - category (str): The name of the expense category.
         """
         if category not in self.expenses:
-            self.expenses[category] = []
+            self.expenses[category] = {}
 
     def create_incomes(self, category: str) -> None:
         """
@@ -60,24 +213,301 @@ class User:
         - category (str): The name of the income category.
         """
         if category not in self.incomes:
-            self.incomes[category] = []
+            self.incomes[category] = {}
 
-    def add_expense(self, category: str, expense: dict) -> None:
+    def add_expense(self, category: str, expense: Expense) -> None:
         """
-        Adds an expense transaction to the specified category.
+        Adds an expense transaction to the specified category, creating it if it does not exist.
+
+        The category chosen in a conversation is created only in memory, so it is
+        missing once the user was reloaded before the conversation ended.
 
         Args:
         - category (str): The name of the expense category.
-        - expense (dict): The expense transaction to add.
+        - expense (Expense): The expense transaction to add.
         """
-        self.expenses[category].append(expense)
+        self.expenses.setdefault(category, {})[expense.id] = expense
+        self.records_by_id['expenses'][expense.id] = expense
+        self.index['expenses'].add(expense)
+        self._add_to_totals('expenses', expense)
 
-    def add_income(self, category: str, income: dict) -> None:
+    def add_income(self, category: str, income: Income) -> None:
         """
-        Adds an income transaction to the specified category.
+        Adds an income transaction to the specified category, creating it if it does not exist.
 
         Args:
         - category (str): The name of the income category.
-        - income (dict): The income transaction to add.
+        - income (Income): The income transaction to add.
+        """
+        self.incomes.setdefault(category, {})[income.id] = income
+        self.records_by_id['incomes'][income.id] = income
+        self.index['incomes'].add(income)
+        self._add_to_totals('incomes', income)
+
+    def add_records(self, record_type: str, records: list) -> None:
+        """
+        Adds many transactions at once, creating their categories if they do not exist.
+
+        The date index is sorted once for all of them.
+
+        Args:
+        - record_type (str): The type of the transactions ('expenses' or 'incomes').
+        - records (list): The transactions to add.
+        """
+        categories = getattr(self, record_type)
+
+        for record in records:
+            categories.setdefault(record.category, {})[record.id] = record
+            self.records_by_id[record_type][record.id] = record
+            self._add_to_totals(record_type, record)
+
+        self.index[record_type].extend(records)
+
+    def delete_records(self, record_type: str, record_ids: list) -> list:
         """
-        self.incomes[category].append(income)
+        Deletes transactions by their IDs, removing categories and their running totals
+        once they are empty.
+
+        Each transaction is found through the ID map, so no category is scanned.
+
+        Args:
+        - record_type (str): The type of the transactions ('expenses' or 'incomes').
+        - record_ids (list): The IDs of the transactions to delete.
+
+        Returns:
+        - list: The IDs of the deleted transactions.
+        """
+        records = getattr(self, record_type)
+        deleted = []
+
+        for record_id in record_ids:
+            record = self.records_by_id[record_type].pop(record_id, None)
+
+            if record is None:
+                continue
+
+            category_records = records[record.category]
+            del category_records[record_id]
+            self.index[record_type].remove(record)
+            self._add_to_totals(record_type, record, added=False)
+            deleted.append(record_id)
+
+            if not category_records:
+                del records[record.category]
+                del self.totals[record_type][record.category]
+                self._drop_category_buckets(record_type, record.category)
+
+        return deleted
+
+    def set_budget(self, category: str, limit: float | None) -> None:
+        """
+        Sets or removes the monthly budget of an expense category.
+
+        Args:
+        - category (str): The name of the expense category.
+        - limit (float | None): The amount that may be spent per month, None to remove the budget.
+        """
+        if limit is None:
+            self.budgets.pop(category, None)
+        else:
+            self.budgets[category] = limit
+
+    def get_budget_status(self, category: str, date_ordinal: int) -> tuple | None:
+        """
+        Returns the amount spent in a category in the month of a date and the category's budget.
+
+        The amount is read from the running monthly totals, so no transaction is scanned.
+
+        Args:
+        - category (str): The name of the expense category.
+        - date_ordinal (int): A date ordinal within the month.
+
+        Returns:
+        - tuple | None: The amount spent and the budget, None if the category has no budget.
+        """
+        limit = self.budgets.get(category)
+
+        if limit is None:
+            return None
+
+        spent = self.monthly_totals['expenses'].get(get_month(date_ordinal), {}).get(category, 0)
+
+        return spent, limit
+
+    def _drop_category_buckets(self, record_type: str, category: str) -> None:
+        """
+        Removes an emptied category from the monthly and weekly running totals,
+        dropping the months and weeks left without categories.
+
+        Args:
+        - record_type (str): The type of the transactions ('expenses' or 'incomes').
+        - category (str): The emptied category.
+        """
+        for buckets in (self.monthly_totals[record_type], self.weekly_totals[record_type]):
+            for period in [period for period, totals in buckets.items() if category in totals]:
+                del buckets[period][category]
+
+                if not buckets[period]:
+                    del buckets[period]
+
+    def _add_to_totals(self, record_type: str, record: Transaction, added: bool = True) -> None:
+        """
+        Adds the transaction's amount to the running totals of its category, month and week.
+
+        Args:
+        - record_type (str): The type of the transaction ('expenses' or 'incomes').
+        - record (Transaction): The transaction.
+        - added (bool, optional): False when the transaction is deleted and its amount
+                                    is subtracted. Defaults to True.
+        """
+        amount = record.amount if added else -record.amount
+        totals = self.totals[record_type]
+        totals[record.category] = totals.get(record.category, 0) + amount
+
+        month_totals = self.monthly_totals[record_type].setdefault(get_month(record.date), {})
+        month_totals[record.category] = month_totals.get(record.category, 0) + amount
+
+        week_totals = self.weekly_totals[record_type].setdefault(get_week(record.date), {})
+        week_totals[record.category] = week_totals.get(record.category, 0) + amount
+        self.versions[record_type] += 1
+        self.changes[record_type].append((record, added))
+
+    def get_amounts_by_category(self, record_type: str, start: int = None, end: int = None) -> dict:
+        """
+        Returns the total amounts by category within the date range.
+
+        All-time totals are read from the running totals. A range sums the monthly
+        totals of the months it fully covers and scans only its partial edge months.
+
+        Args:
+        - record_type (str): The type of the transactions ('expenses' or 'incomes').
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+
+        Returns:
+        - dict: The total amounts keyed by category.
+        """
+        amounts = dict.fromkeys(getattr(self, record_type), 0)
+        index = self.index[record_type]
+
+        if start is None and end is None:
+            amounts.update(self.totals[record_type])
+
+            return amounts
+
+        if not index:
+            return amounts
+
+        start = index.ordinals[0] if start is None else start
+        end = index.ordinals[-1] if end is None else end
+
+        if start > end:
+            return amounts
+
+        first_month = get_month(start)
+        last_month = get_month(end)
+        partial_ranges = []
+
+        if first_month == last_month:
+            partial_ranges.append((start, end))
+            full_months = range(0)
+        else:
+            (first_month_start, first_month_end) = get_month_bounds(first_month)
+            (last_month_start, last_month_end) = get_month_bounds(last_month)
+
+            if start != first_month_start:
+                partial_ranges.append((start, first_month_end))
+                first_month += 1
+
+            if end != last_month_end:
+                partial_ranges.append((last_month_start, end))
+                last_month -= 1
+
+            full_months = range(first_month, last_month + 1)
+
+        monthly_totals = self.monthly_totals[record_type]
+
+        for month in full_months:
+            for category, amount in monthly_totals.get(month, {}).items():
+                if category in amounts:
+                    amounts[category] += amount
+
+        for (range_start, range_end) in partial_ranges:
+            for record in index.between(range_start, range_end):
+                amounts[record.category] += record.amount
+
+        return amounts
+
+    def get_trend(self, record_type: str, period: str, start: int, end: int) -> list:
+        """
+        Returns the amounts by category of every week or month overlapping the date range.
+
+        The amounts are read from the running totals, so the cost depends on
+        the number of periods and categories, not on the number of transactions.
+        The first and the last period are counted whole.
+
+        Args:
+        - record_type (str): The type of the transactions ('expenses' or 'incomes').
+        - period (str): The length of a period ('week' or 'month').
+        - start (int): The date ordinal of the first day of the range.
+        - end (int): The date ordinal of the last day of the range.
+
+        Returns:
+        - list: The date ordinal of the first day and the amounts keyed by category
+                of every period, in chronological order.
+        """
+        (get_period, get_period_bounds) = PERIODS[period]
+        buckets = (self.weekly_totals if period == 'week' else self.monthly_totals)[record_type]
+
+        return [
+            (get_period_bounds(number)[0], dict(buckets.get(number, {})))
+            for number in range(get_period(start), get_period(end) + 1)
+        ]
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'User':
+        """
+        Creates a User object from the data.json layout, parsing every record once.
+
+        Args:
+        - data (dict): The user's data.
+
+        Returns:
+        - User: The user.
+        """
+        expenses = {
+            category: {record.id: record for record in map(Expense.from_dict, records)}
+            for category, records in data['expenses'].items()
+        }
+        incomes = {
+            category: {record.id: record for record in map(Income.from_dict, records)}
+            for category, records in data['incomes'].items()
+        }
+
+        return cls(data['name'], expenses, incomes, dict(data.get('budgets', {})))
+
+    def to_dict(self) -> dict:
+        """
+        Converts the user to the data.json layout.
+
+        The budgets are only included when the user has set any.
+
+        Returns:
+        - dict: The user's data.
+        """
+        data = {
+            'name': self.name,
+            'expenses': {
+                category: [record.to_dict() for record in records.values()]
+                for category, records in self.expenses.items()
+            },
+            'incomes': {
+                category: [record.to_dict() for record in records.values()]
+                for category, records in self.incomes.items()
+            },
+        }
+
+        if self.budgets:
+            data['budgets'] = dict(self.budgets)
+
+        return data
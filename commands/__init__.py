@@ -18,12 +18,27 @@ from .view_records_handlers import (
     get_records_by_filter,
     filter_by_date,
     filter_by_category,
+    turn_page,
+    PAGE_CALLBACK,
 )
 from .delete_handlers import (
     delete_record,
     select_item,
     delete_item,
 )
+from .import_handlers import (
+    import_records,
+    import_file,
+)
+from .export_handlers import (
+    export_records,
+    send_export,
+)
+from .budget_handlers import (
+    set_budget,
+    get_budget_category,
+    get_budget_amount,
+)
 from .statistic_handlers import (
     get_data_for_stat,
     get_filter_for_stat,
@@ -47,9 +62,18 @@ __all__ = [
     'get_records_by_filter',
     'filter_by_date',
     'filter_by_category',
+    'turn_page',
+    'PAGE_CALLBACK',
     'delete_record',
     'select_item',
     'delete_item',
+    'import_records',
+    'import_file',
+    'export_records',
+    'send_export',
+    'set_budget',
+    'get_budget_category',
+    'get_budget_amount',
     'get_data_for_stat',
     'get_filter_for_stat',
     'get_filter_date',
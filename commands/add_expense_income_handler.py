@@ -1,4 +1,5 @@
 import logging
+import math
 from datetime import datetime
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import (
@@ -7,8 +8,9 @@ from telegram.ext import (
 )
 
 from classes import Expense, Income
-from utils import save_data, is_valid_date
+from utils import save_record, is_valid_date, get_budget_warning
 from constants import (
+    outbox,
     ASKING_CATEGORY,
     ASKING_TITLE,
     ASKING_PRICE,
@@ -38,9 +40,9 @@ async def add_transaction(update: Update, context: CallbackContext) -> int:
         reply_keyboard = [categories[i:i + 3] for i in range(0, len(categories), 3)]
 
         markup = ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
-        await update.message.reply_text('Choose a category: ', reply_markup=markup)
+        outbox.send_message(update.effective_chat.id, 'Choose a category: ', reply_markup=markup)
     else:
-        await update.message.reply_text('Enter a category: ')
+        outbox.send_message(update.effective_chat.id, 'Enter a category: ')
 
     return ASKING_CATEGORY
 
@@ -64,7 +66,8 @@ async def get_transaction(update: Update, context: CallbackContext) -> int:
     markup = ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
 
     if category not in categories and context.user_data['current_command'] == '/add_expense':
-        await update.message.reply_text(
+        outbox.send_message(
+            update.effective_chat.id,
             'I don`t know this category\n'
             'If the one you need is not among those offered, select "Other".',
             reply_markup=markup
@@ -74,22 +77,20 @@ async def get_transaction(update: Update, context: CallbackContext) -> int:
 
     if context.user_data['current_command'] == '/add_income':
         context.user_data['current_category'] = category
-        context.user_data['current_user'].create_incomes(context.user_data['current_category'])
-        users[user_id] = context.user_data['current_user'].__dict__
-        save_data(users)
+        users[user_id].create_incomes(context.user_data['current_category'])
 
-        await update.message.reply_text(
+        outbox.send_message(
+            update.effective_chat.id,
             f'{category} category entered.\n'
         )
 
         return await get_title(update, context)
 
     context.user_data['current_category'] = category.split()[0]
-    context.user_data['current_user'].create_expenses(context.user_data['current_category'])
-    users[user_id] = context.user_data['current_user'].__dict__
-    save_data(users)
+    users[user_id].create_expenses(context.user_data['current_category'])
 
-    await update.message.reply_text(
+    outbox.send_message(
+        update.effective_chat.id,
         f'{category} category selected.\n'
         'Enter the name of this action:',
         reply_markup=ReplyKeyboardRemove()
@@ -115,7 +116,8 @@ async def get_title(update: Update, context: CallbackContext) -> int:
     if context.user_data['current_command'] == '/add_expense':
         context.user_data['title'] = title
 
-    await update.message.reply_text(
+    outbox.send_message(
+        update.effective_chat.id,
         'Now enter the amount '
         f'{
             'you spent' if context.user_data['current_command'] == '/add_expense'
@@ -144,11 +146,16 @@ async def get_price(update: Update, context: CallbackContext) -> int:
     try:
         price = float(update.message.text)
     except ValueError:
-        await update.message.reply_text('Wrong amount entered. Please try again.')
+        outbox.send_message(update.effective_chat.id, 'Wrong amount entered. Please try again.')
+        return ASKING_PRICE
+
+    if not math.isfinite(price):
+        outbox.send_message(update.effective_chat.id, 'Wrong amount entered. Please try again.')
         return ASKING_PRICE
 
     if price <= 0:
-        await update.message.reply_text(
+        outbox.send_message(
+            update.effective_chat.id,
             'Amount should be greater than 0.00.\n'
             'Please try again'
         )
@@ -157,7 +164,8 @@ async def get_price(update: Update, context: CallbackContext) -> int:
 
     context.user_data['amount'] = price
 
-    await update.message.reply_text(
+    outbox.send_message(
+        update.effective_chat.id,
         'Great! Now, please, write the date when the action was made in YYYY-MM-DD format.\n'
         'If you don\'t need it, just write "No".\n'
         'We will add today`s date.'
@@ -172,6 +180,9 @@ async def get_date(update: Update, context: CallbackContext) -> int:
     """
     Receives the date for the transaction.
 
+    An expense is checked against the monthly budget of its category, and the user
+    is warned when the budget of that month is nearly or completely spent.
+
     Args:
     - update (Update): The update object from Telegram.
     - context (CallbackContext): The context object for the handler.
@@ -183,7 +194,7 @@ async def get_date(update: Update, context: CallbackContext) -> int:
     date = update.message.text
 
     if date.lower() != 'no' and not is_valid_date(date):
-        await update.message.reply_text('Please enter a valid')
+        outbox.send_message(update.effective_chat.id, 'Please enter a valid')
         return ASKING_DATE
 
     if date.lower() != 'no' and is_valid_date(date):
@@ -195,23 +206,36 @@ async def get_date(update: Update, context: CallbackContext) -> int:
     title = context.user_data.get('title')
     amount = context.user_data.get('amount')
     date = context.user_data.get('date', datetime.now().date().strftime('%Y-%m-%d'))
+    date_ordinal = datetime.strptime(date, '%Y-%m-%d').toordinal()
+
+    user = users[user_id]
 
     if context.user_data.get('current_command') == '/add_expense':
-        transactions_dict = Expense(amount, title, category, date)
+        transaction = Expense(amount, title, category, date_ordinal)
+        record_type = 'expenses'
 
-        context.user_data['current_user'].add_expense(category, transactions_dict.__dict__)
+        user.add_expense(category, transaction)
     else:
-        transactions_dict = Income(category, amount, date)
-        context.user_data['current_user'].add_income(category, transactions_dict.__dict__)
+        transaction = Income(category, amount, date_ordinal)
+        record_type = 'incomes'
+        user.add_income(category, transaction)
 
-    users[user_id] = context.user_data['current_user'].__dict__
-    save_data(users)
+    save_record(user_id, record_type, transaction)
     logging.info(f'Information about user {user_id} was saved')
 
-    await update.message.reply_text(
+    outbox.send_message(
+        update.effective_chat.id,
         'Thank you! Record:\n'
-        f'{transactions_dict}\n'
+        f'{transaction}\n'
         'was added!'
     )
 
+    if record_type == 'expenses':
+        warning = get_budget_warning(
+            category, user.get_budget_status(category, date_ordinal), date_ordinal
+        )
+
+        if warning is not None:
+            outbox.send_message(update.effective_chat.id, warning)
+
     return ConversationHandler.END
@@ -0,0 +1,148 @@
+import logging
+import math
+from datetime import datetime
+
+from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram.ext import (
+    CallbackContext,
+    ConversationHandler,
+)
+
+from utils import save_budget
+from constants import (
+    outbox,
+    users,
+    categories,
+    BUDGET_CATEGORY,
+    BUDGET_AMOUNT,
+)
+from .text_handlers import user_exist_decorator
+
+
+@user_exist_decorator
+async def set_budget(update: Update, context: CallbackContext) -> int:
+    """
+    Handles the /set_budget command by showing the current budgets and asking for a category.
+
+    Args:
+    - update (Update): The update object from Telegram.
+    - context (CallbackContext): The callback context.
+
+    Returns:
+    - int: The state value for conversation handler.
+    """
+    logging.info('Command /set_budget was triggered')
+    budgets = users[context.user_data['user_id']].budgets
+    reply_keyboard = [categories[i:i + 3] for i in range(0, len(categories), 3)]
+    markup = ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
+
+    if budgets:
+        current = 'Monthly budgets:\n' + '\n'.join(
+            f'{category}: {limit:.2f} UAH' for category, limit in budgets.items()
+        )
+    else:
+        current = 'You have no monthly budgets yet.'
+
+    outbox.send_message(
+        update.effective_chat.id,
+        f'{current}\n\nChoose the category to set a budget for:',
+        reply_markup=markup
+    )
+
+    return BUDGET_CATEGORY
+
+
+async def get_budget_category(update: Update, context: CallbackContext) -> int:
+    """
+    Receives the category of the budget and asks for the monthly limit.
+
+    Args:
+    - update (Update): The update object from Telegram.
+    - context (CallbackContext): The callback context.
+
+    Returns:
+    - int: The state value for conversation handler.
+    """
+    logging.info(f'Budget category {update.message.text} was selected')
+
+    if update.message.text not in categories:
+        reply_keyboard = [categories[i:i + 3] for i in range(0, len(categories), 3)]
+        markup = ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
+
+        outbox.send_message(
+            update.effective_chat.id,
+            'Please select one of the suggested categories.',
+            reply_markup=markup
+        )
+
+        return BUDGET_CATEGORY
+
+    context.user_data['budget_category'] = update.message.text.split()[0]
+
+    outbox.send_message(
+        update.effective_chat.id,
+        f'Enter the amount you plan to spend on {update.message.text} per month.\n'
+        'Enter 0 to remove the budget.',
+        reply_markup=ReplyKeyboardRemove()
+    )
+
+    return BUDGET_AMOUNT
+
+
+async def get_budget_amount(update: Update, context: CallbackContext) -> int:
+    """
+    Receives the monthly limit, saves the budget and shows how much of it is already spent.
+
+    Args:
+    - update (Update): The update object from Telegram.
+    - context (CallbackContext): The callback context.
+
+    Returns:
+    - int: The state value for conversation handler.
+    """
+    user_id = context.user_data['user_id']
+    category = context.user_data['budget_category']
+
+    try:
+        limit = float(update.message.text)
+    except ValueError:
+        outbox.send_message(update.effective_chat.id, 'Wrong amount entered. Please try again.')
+        return BUDGET_AMOUNT
+
+    if not math.isfinite(limit):
+        outbox.send_message(update.effective_chat.id, 'Wrong amount entered. Please try again.')
+        return BUDGET_AMOUNT
+
+    if limit < 0:
+        outbox.send_message(
+            update.effective_chat.id,
+            'Amount should not be negative.\n'
+            'Please try again'
+        )
+
+        return BUDGET_AMOUNT
+
+    user = users[user_id]
+
+    if limit == 0:
+        user.set_budget(category, None)
+        save_budget(user_id, category, None)
+        logging.info(f'Budget of {category} was removed')
+
+        outbox.send_message(update.effective_chat.id, f'The budget of {category} was removed.')
+
+        return ConversationHandler.END
+
+    user.set_budget(category, limit)
+    save_budget(user_id, category, limit)
+    logging.info(f'Budget of {category} was set to {limit}')
+
+    (spent, limit) = user.get_budget_status(category, datetime.now().date().toordinal())
+
+    outbox.send_message(
+        update.effective_chat.id,
+        f'The monthly budget of {category} is set to {limit:.2f} UAH.\n'
+        f'Spent this month: {spent:.2f} UAH, left: {max(limit - spent, 0):.2f} UAH.'
+    )
+
+    return ConversationHandler.END
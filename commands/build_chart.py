@@ -1,31 +1,176 @@
+import asyncio
 import io
-import matplotlib.pyplot as plt
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
-def build_chart(labels: list, amounts: list, title: str) -> io.BytesIO:
+from constants import outbox, CHART_WORKERS, CHART_CACHE_SIZE
+from instrumentation import registry
+from .chart_cache import ChartCache, make_chart_key
+
+chart_pool = None
+chart_cache = ChartCache(CHART_CACHE_SIZE)
+
+
+def get_chart_pool() -> ProcessPoolExecutor:
+    """
+    Returns the process pool rendering charts, creating it on first use.
+
+    The workers are spawned rather than forked: by the first chart the storage
+    writer, the metrics server and the event loop are running, and a forked
+    child could inherit one of their locks held and deadlock on it.
+
+    Returns:
+    - ProcessPoolExecutor: The chart rendering pool.
+    """
+    global chart_pool
+
+    if chart_pool is None:
+        chart_pool = ProcessPoolExecutor(
+            CHART_WORKERS, mp_context=multiprocessing.get_context('spawn')
+        )
+
+    return chart_pool
+
+
+def shutdown_chart_pool() -> None:
+    """
+    Shuts down the chart rendering pool, waiting for the charts being rendered.
+
+    Returns:
+    - None
+    """
+    global chart_pool
+
+    if chart_pool is not None:
+        chart_pool.shutdown()
+        chart_pool = None
+
+
+def build_chart(labels: list, amounts: list, title: str) -> bytes:
     """
     Builds a pie chart based on the provided labels and amounts.
 
+    Uses a standalone Agg figure instead of the global pyplot state,
+    so charts can be rendered in parallel and the figure is released
+    as soon as the image is saved.
+
     Args:
     - labels (list): A list of labels for the chart.
     - amounts (list): A list of corresponding amounts for each label.
     - title (str): The title of the chart.
 
     Returns:
-    - io.BytesIO: A BytesIO object containing the chart image.
+    - bytes: The chart image in PNG format.
+    """
+    figure = Figure(figsize=(6, 6))
+    FigureCanvasAgg(figure)
+
+    try:
+        axes = figure.subplots()
+        axes.pie(amounts, labels=labels, autopct='%1.1f%%', startangle=140, shadow=True)
+        axes.axis('equal')
+        axes.set_title(title)
+
+        buf = io.BytesIO()
+        figure.savefig(buf, format='png')
+
+        return buf.getvalue()
+    finally:
+        figure.clear()
+
+
+def build_trend_chart(labels: list, expenses: dict, incomes: list, title: str) -> bytes:
+    """
+    Builds a trend chart: expenses stacked by category as bars and incomes as a line.
+
+    Args:
+    - labels (list): The labels of the periods.
+    - expenses (dict): The expenses of every period keyed by category.
+    - incomes (list): The total incomes of every period.
+    - title (str): The title of the chart.
+
+    Returns:
+    - bytes: The chart image in PNG format.
     """
-    sizes = amounts
+    figure = Figure(figsize=(max(6, len(labels) * 0.25), 6))
+    FigureCanvasAgg(figure)
 
-    plt.figure(figsize=(6, 6))
-    plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140, shadow=True)
-    plt.axis('equal')
-    plt.title(title)
+    try:
+        axes = figure.subplots()
+        positions = range(len(labels))
+        bottom = [0] * len(labels)
 
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
+        for category, amounts in expenses.items():
+            axes.bar(positions, amounts, bottom=bottom, label=category)
+            bottom = [total + amount for total, amount in zip(bottom, amounts)]
 
-    return buf
+        axes.plot(positions, incomes, color='black', marker='o', label='Incomes')
+
+        step = max(1, len(labels) // 24)
+        axes.set_xticks(positions[::step], labels[::step], rotation=45, ha='right')
+        axes.set_ylabel('UAH')
+        axes.set_title(title)
+        axes.legend(fontsize='small')
+        figure.tight_layout()
+
+        buf = io.BytesIO()
+        figure.savefig(buf, format='png')
+
+        return buf.getvalue()
+    finally:
+        figure.clear()
+
+
+async def send_chart(update, key: str, render, *args) -> None:
+    """
+    Sends a chart to the user via Telegram.
+
+    A chart already sent is resent by its Telegram file_id, a cached one is
+    uploaded from the cache; otherwise it is rendered in the chart pool,
+    so the event loop keeps serving other chats meanwhile. The file_id of an
+    upload is remembered once the send queue has sent it.
+
+    Args:
+    - update: The update object from Telegram.
+    - key (str): The content address of the chart.
+    - render (function): The module-level function rendering the chart to PNG bytes.
+    - *args: The arguments of the render function.
+
+    Returns:
+    - None
+    """
+    file_id = chart_cache.get_file_id(key)
+
+    if file_id is not None:
+        registry.increment('chart_requests_total', (('source', 'file_id'),))
+        outbox.send(update.effective_chat.id, 'send_photo', photo=file_id)
+        return
+
+    stat_image = chart_cache.get(key)
+
+    if stat_image is None:
+        registry.increment('chart_requests_total', (('source', 'render'),))
+        loop = asyncio.get_running_loop()
+
+        with registry.time('chart_render_seconds', (('chart', render.__name__),)):
+            stat_image = await loop.run_in_executor(get_chart_pool(), render, *args)
+
+        chart_cache.put(key, stat_image)
+    else:
+        registry.increment('chart_requests_total', (('source', 'cache'),))
+
+    def remember_file_id(sent: asyncio.Future) -> None:
+        if not sent.cancelled() and sent.exception() is None:
+            chart_cache.set_file_id(key, sent.result().photo[-1].file_id)
+
+    outbox.send(update.effective_chat.id, 'send_photo', photo=stat_image).add_done_callback(
+        remember_file_id
+    )
+    logging.info(f'Chart cache: {chart_cache.stats()}')
 
 
 async def show_image(update, labels, amounts, title) -> None:
@@ -41,6 +186,25 @@ async def show_image(update, labels, amounts, title) -> None:
     Returns:
     - None
     """
-    stat_image = build_chart(labels, amounts, title)
+    key = make_chart_key(labels, amounts, title)
+
+    await send_chart(update, key, build_chart, labels, amounts, title)
+
+
+async def show_trend(update, labels: list, expenses: dict, incomes: list, title: str) -> None:
+    """
+    Sends a trend chart of expenses by category and incomes via Telegram.
+
+    Args:
+    - update: The update object from Telegram.
+    - labels (list): The labels of the periods.
+    - expenses (dict): The expenses of every period keyed by category.
+    - incomes (list): The total incomes of every period.
+    - title (str): The title of the chart.
+
+    Returns:
+    - None
+    """
+    key = make_chart_key(labels, [expenses, incomes], title, 'trend')
 
-    await update.message.reply_photo(stat_image)
+    await send_chart(update, key, build_trend_chart, labels, expenses, incomes, title)
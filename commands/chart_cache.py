@@ -0,0 +1,156 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+
+def make_chart_key(labels: list, amounts: list, title: str, style: str = 'pie') -> str:
+    """
+    Builds the content address of a chart.
+
+    Args:
+    - labels (list): A list of labels for the chart.
+    - amounts (list): A list of corresponding amounts for each label.
+    - title (str): The title of the chart.
+    - style (str, optional): The style of the chart. Defaults to 'pie'.
+
+    Returns:
+    - str: The SHA-256 hex digest of the chart's content.
+    """
+    content = json.dumps([style, title, labels, amounts], ensure_ascii=False, default=str)
+
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class ChartCache:
+    """
+    Size-bounded LRU cache of rendered charts keyed by their content address.
+
+    Besides the PNG bytes it remembers the Telegram file_id of a chart
+    once it has been uploaded, so repeat sends reuse the uploaded photo.
+
+    Attributes:
+    - max_bytes (int): The maximum total size of the cached images.
+    - hits (int): The number of charts found in the cache.
+    - misses (int): The number of charts that had to be rendered.
+    - file_id_hits (int): The number of charts sent by their file_id.
+
+    Methods:
+    - get(self, key: str) -> bytes | None:
+                Returns the cached image of a chart.
+    - put(self, key: str, image: bytes) -> None:
+                Caches the image of a chart, evicting the least recently used ones.
+    - get_file_id(self, key: str) -> str | None:
+                Returns the Telegram file_id of an uploaded chart.
+    - set_file_id(self, key: str, file_id: str) -> None:
+                Remembers the Telegram file_id of an uploaded chart.
+    - stats(self) -> dict:
+                Returns the cache counters.
+    """
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024) -> None:
+        """
+        Initializes a new ChartCache object.
+
+        Args:
+        - max_bytes (int, optional): The maximum total size of the cached images.
+                                    Defaults to 32 MiB.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.file_id_hits = 0
+        self._images = OrderedDict()
+        self._file_ids = {}
+
+    def get(self, key: str) -> bytes | None:
+        """
+        Returns the cached image of a chart, counting the hit or miss.
+
+        Args:
+        - key (str): The content address of the chart.
+
+        Returns:
+        - bytes | None: The image, None if it is not cached.
+        """
+        image = self._images.get(key)
+
+        if image is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._images.move_to_end(key)
+
+        return image
+
+    def put(self, key: str, image: bytes) -> None:
+        """
+        Caches the image of a chart, evicting the least recently used ones.
+
+        Args:
+        - key (str): The content address of the chart.
+        - image (bytes): The image.
+
+        Returns:
+        - None
+        """
+        if len(image) > self.max_bytes:
+            return
+
+        if key in self._images:
+            self.size -= len(self._images.pop(key))
+
+        self._images[key] = image
+        self.size += len(image)
+
+        while self.size > self.max_bytes:
+            (evicted_key, evicted_image) = self._images.popitem(last=False)
+            self.size -= len(evicted_image)
+            self._file_ids.pop(evicted_key, None)
+
+    def get_file_id(self, key: str) -> str | None:
+        """
+        Returns the Telegram file_id of an uploaded chart.
+
+        Args:
+        - key (str): The content address of the chart.
+
+        Returns:
+        - str | None: The file_id, None if the chart was not uploaded.
+        """
+        file_id = self._file_ids.get(key)
+
+        if file_id is not None:
+            self.file_id_hits += 1
+            self._images.move_to_end(key)
+
+        return file_id
+
+    def set_file_id(self, key: str, file_id: str) -> None:
+        """
+        Remembers the Telegram file_id of a cached chart.
+
+        Args:
+        - key (str): The content address of the chart.
+        - file_id (str): The file_id returned by Telegram.
+
+        Returns:
+        - None
+        """
+        if key in self._images:
+            self._file_ids[key] = file_id
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+        - dict: The hits, misses, file_id hits, number of entries and size in bytes.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'file_id_hits': self.file_id_hits,
+            'entries': len(self._images),
+            'bytes': self.size,
+        }
@@ -10,16 +10,18 @@ from telegram.ext import (
 )
 
 from utils import (
-    get_items_list,
-    delete_record_from_data,
+    select_record_ids,
+    delete_records_from_data,
 )
 from constants import (
+    outbox,
     users,
     delete_filter,
     DELETE_ITEM,
     DELETE_CHOSEN_ITEM,
 )
 from .text_handlers import user_exist_decorator
+from .view_records_handlers import build_records_page
 
 
 @user_exist_decorator
@@ -42,7 +44,8 @@ async def delete_record(update: Update, context: CallbackContext) -> int:
 
     markup = ReplyKeyboardMarkup(reply_markup, one_time_keyboard=True)
 
-    await update.message.reply_text(
+    outbox.send_message(
+        update.effective_chat.id,
         'What you want to delete?',
         reply_markup=markup
     )
@@ -54,6 +57,10 @@ async def select_item(update: Update, context: CallbackContext) -> int:
     """
     Allows the user to select the type of record they want to delete.
 
+    The records are listed one page at a time with the navigation buttons of /list.
+    Only the record type is remembered; the entered numbers are resolved
+    against the same listing by delete_item.
+
     Args:
     - update (Update): The update object from Telegram.
     - context (CallbackContext): The callback context.
@@ -68,31 +75,36 @@ async def select_item(update: Update, context: CallbackContext) -> int:
         keyboard = [delete_filter]
 
         markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True)
-        await update.message.reply_text(
+        outbox.send_message(
+            update.effective_chat.id,
             'Please select one of the suggested options.',
             reply_markup=markup
         )
 
         return DELETE_ITEM
 
-    user_choice = update.message.text.lower()
-    transactions = users[user_id][user_choice]
+    record_type = update.message.text.lower()
 
-    if not transactions:
-        await update.message.reply_text('No records found', reply_markup=ReplyKeyboardRemove())
+    if not users[user_id].index[record_type]:
+        outbox.send_message(
+            update.effective_chat.id,
+            'No records found',
+            reply_markup=ReplyKeyboardRemove()
+        )
 
         return ConversationHandler.END
 
-    total = [record for transaction in transactions.values() for record in transaction]
-    context.user_data['all_transactions'] = total
-    context.user_data['record_type'] = update.message.text.lower()
-    records = get_items_list(total, user_choice == 'expense')
+    context.user_data['record_type'] = record_type
+    (text, markup) = build_records_page(user_id, record_type, (None, None), 0)
 
-    await update.message.reply_text(
-        'Enter the record number to delete:\n'
-        f'{"\n".join([f"{i + 1}. {record}" for i, record in enumerate(records)])}\n',
+    outbox.send_message(
+        update.effective_chat.id,
+        'Enter the numbers of the records to delete (e.g. "1, 3 5-7"), '
+        'a date range (YYYY-MM-DD - YYYY-MM-DD) or Week, Month or Year. '
+        'Use the buttons below the list to see the other pages.',
         reply_markup=ReplyKeyboardRemove()
     )
+    outbox.send_message(update.effective_chat.id, text, reply_markup=markup)
 
     return DELETE_CHOSEN_ITEM
 
@@ -109,23 +121,22 @@ async def delete_item(update: Update, context: CallbackContext) -> int:
     - int: The state value for conversation handler.
     """
     user_id = context.user_data['user_id']
-    item_index = int(update.message.text) - 1
+    record_type = context.user_data['record_type']
+    record_ids = select_record_ids(user_id, record_type, update.message.text.strip())
 
-    if item_index <= 0 or item_index > len(context.user_data['all_transactions']) - 1:
-        await update.message.reply_text(
+    if record_ids is None:
+        outbox.send_message(
+            update.effective_chat.id,
             'Entered wrong number. Please try again.'
         )
 
         return DELETE_CHOSEN_ITEM
 
-    chosen_record = context.user_data['all_transactions'][item_index]
-    record_category = chosen_record['category']
-    record_type = context.user_data['record_type']
-
-    delete_record_from_data(chosen_record, user_id, record_type, record_category)
+    deleted = delete_records_from_data(user_id, record_type, record_ids)
 
-    await update.message.reply_text(
-        f'Your record number {item_index + 1} has been deleted.'
+    outbox.send_message(
+        update.effective_chat.id,
+        f'{deleted} record(s) have been deleted.'
     )
 
     return ConversationHandler.END
@@ -0,0 +1,109 @@
+import asyncio
+import io
+import logging
+import tempfile
+
+from telegram import (
+    Update,
+    ReplyKeyboardMarkup,
+    ReplyKeyboardRemove,
+)
+from telegram.ext import (
+    CallbackContext,
+    ConversationHandler,
+)
+
+from records_csv import export_csv
+from utils import is_valid_date
+from date_windows import get_window, parse_range
+from constants import (
+    outbox,
+    users,
+    export_filter,
+    ALL_TIME,
+    EXPORT_FILTER,
+    EXPORT_SPOOL_SIZE,
+)
+from .text_handlers import user_exist_decorator
+
+
+@user_exist_decorator
+async def export_records(update: Update, context: CallbackContext) -> int:
+    """
+    Handles the /export command by asking the user for the period to export.
+
+    Args:
+    - update (Update): The update object from Telegram.
+    - context (CallbackContext): The callback context.
+
+    Returns:
+    - int: The state value for conversation handler.
+    """
+    logging.info('Command /export was triggered')
+    markup = ReplyKeyboardMarkup([export_filter], one_time_keyboard=True)
+
+    outbox.send_message(
+        update.effective_chat.id,
+        'Choose the period to export or enter it in the format:\n'
+        'YYYY-MM-DD - YYYY-MM-DD (example 2024-01-01 - 2024-01-31)',
+        reply_markup=markup
+    )
+
+    return EXPORT_FILTER
+
+
+async def send_export(update: Update, context: CallbackContext) -> int:
+    """
+    Sends the user's records of the chosen period as a CSV document.
+
+    The CSV is written row by row into a spooled temporary file in a worker
+    thread, so large exports spill to disk while they are written. The file is
+    read back once and sent as bytes, which a call retried after RetryAfter
+    uploads again in full; a file object would already be read to its end.
+
+    Args:
+    - update (Update): The update object from Telegram.
+    - context (CallbackContext): The callback context.
+
+    Returns:
+    - int: The state value for conversation handler.
+    """
+    user_id = context.user_data['user_id']
+    period = update.message.text
+    (start_date, end_date) = (None, None)
+
+    if period in export_filter and period != ALL_TIME:
+        (start_date, end_date) = get_window(period)
+    elif period not in export_filter:
+        dates = [part.strip() for part in period.split(' - ')]
+
+        if len(dates) != 2 or not all(is_valid_date(part) for part in dates):
+            outbox.send_message(
+                update.effective_chat.id,
+                'Invalid period. Please choose one of the options or enter two dates.'
+            )
+
+            return EXPORT_FILTER
+
+        (start_date, end_date) = parse_range(*dates)
+
+    logging.info(f'Exporting records of user {user_id} for {period}')
+
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as spooled_file:
+        text_file = io.TextIOWrapper(spooled_file, encoding='utf-8', newline='')
+        count = await asyncio.to_thread(export_csv, users[user_id], text_file, start_date, end_date)
+        text_file.flush()
+        text_file.detach()
+        spooled_file.seek(0)
+        document = spooled_file.read()
+
+    outbox.send(
+        update.effective_chat.id,
+        'send_document',
+        document=document,
+        filename='records.csv',
+        caption=f'{count} records exported.',
+        reply_markup=ReplyKeyboardRemove()
+    )
+
+    return ConversationHandler.END
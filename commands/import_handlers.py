@@ -0,0 +1,122 @@
+import asyncio
+import csv
+import logging
+import tempfile
+
+from telegram import Update
+from telegram.ext import (
+    CallbackContext,
+    ConversationHandler,
+)
+
+from records_csv import import_csv, apply_import
+from constants import (
+    outbox,
+    users,
+    storage,
+    IMPORT_FILE,
+    IMPORT_MAX_FILE_SIZE,
+)
+from .text_handlers import user_exist_decorator
+
+
+@user_exist_decorator
+async def import_records(update: Update, context: CallbackContext) -> int:
+    """
+    Handles the /import command by asking the user to upload a CSV file.
+
+    Args:
+    - update (Update): The update object from Telegram.
+    - context (CallbackContext): The callback context.
+
+    Returns:
+    - int: The state value for conversation handler.
+    """
+    logging.info('Command /import was triggered')
+
+    outbox.send_message(
+        update.effective_chat.id,
+        'Send me a CSV file with the columns date (YYYY-MM-DD), amount and, optionally, '
+        'type (expense/income), category and description.\n'
+        'Without a type column negative amounts are imported as expenses '
+        'and positive amounts as incomes.'
+    )
+
+    return IMPORT_FILE
+
+
+async def import_file(update: Update, context: CallbackContext) -> int:
+    """
+    Imports the uploaded CSV file and replies with a summary.
+
+    The file is downloaded to a temporary file and parsed in a worker thread,
+    so the other chats are served meanwhile. The records are added to the user's
+    data only once the whole file was read, so a file that cannot be read
+    imports nothing, and the summary is sent once they are written. If the storage
+    cannot write them yet, the user is told that the import is still being saved;
+    the storage keeps retrying it.
+
+    Args:
+    - update (Update): The update object from Telegram.
+    - context (CallbackContext): The callback context.
+
+    Returns:
+    - int: The state value for conversation handler.
+    """
+    user_id = context.user_data['user_id']
+    document = update.message.document
+
+    if document is None or not (document.file_name or '').lower().endswith('.csv'):
+        outbox.send_message(update.effective_chat.id, 'Please send a file with the .csv extension.')
+
+        return IMPORT_FILE
+
+    if document.file_size and document.file_size > IMPORT_MAX_FILE_SIZE:
+        outbox.send_message(
+            update.effective_chat.id,
+            f'The file is too large. The maximum size is {IMPORT_MAX_FILE_SIZE // (1024 * 1024)} MB.'
+        )
+
+        return ConversationHandler.END
+
+    logging.info(f'Importing {document.file_name} for user {user_id}')
+    telegram_file = await document.get_file()
+
+    with tempfile.NamedTemporaryFile(suffix='.csv') as temporary_file:
+        await telegram_file.download_to_drive(temporary_file.name)
+
+        try:
+            with open(temporary_file.name, newline='', encoding='utf-8-sig') as file:
+                (summary, records, entries) = await asyncio.to_thread(import_csv, user_id, file)
+        except (ValueError, csv.Error) as error:
+            outbox.send_message(
+                update.effective_chat.id,
+                f'The file could not be imported: {error}.'
+            )
+
+            return ConversationHandler.END
+
+    apply_import(users[user_id], records, entries)
+
+    try:
+        await asyncio.to_thread(storage.flush)
+    except RuntimeError:
+        logging.exception(f'The import of user {user_id} is not written yet')
+        status = ('Import pending: the records were added but are not saved yet, '
+                  'they will be saved automatically.')
+    else:
+        logging.info(f'Imported {summary["expenses"]} expenses and {summary["incomes"]} incomes')
+        status = 'Import finished!'
+
+    errors = '\n'.join(summary['errors'])
+
+    outbox.send_message(
+        update.effective_chat.id,
+        f'{status}\n'
+        f'Expenses imported: {summary["expenses"]}\n'
+        f'Incomes imported: {summary["incomes"]}\n'
+        f'Rows skipped: {summary["skipped"]}'
+        + (f'\n\nFirst errors:\n{errors}' if errors else '')
+    )
+
+    return ConversationHandler.END
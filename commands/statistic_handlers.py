@@ -8,25 +8,29 @@ from telegram import (
 from telegram.ext import CallbackContext, ConversationHandler
 
 from constants import (
-    users,
+    outbox,
     stat_filter,
     transaction_filter,
+    trend_filter,
     STAT_FILTER,
     SPECIFIC_FILTER,
     CATEGORY,
     SHOW_STATISTIC,
     DATE,
     GENERAL,
+    TREND,
     INCOMES,
     EXPENSES,
+    MAX_TREND_PERIODS,
 )
 from utils import (
     get_general_amount,
     is_valid_date,
     get_amounts_by_category,
+    get_trend,
 )
 from .text_handlers import user_exist_decorator
-from .build_chart import show_image
+from .build_chart import show_image, show_trend
 
 
 @user_exist_decorator
@@ -47,7 +51,8 @@ async def get_data_for_stat(update: Update, context: CallbackContext) -> int:
 
     markup = ReplyKeyboardMarkup(keyword_markup, one_time_keyboard=True)
 
-    await update.message.reply_text(
+    outbox.send_message(
+        update.effective_chat.id,
         'What statistics do you want to view?',
         reply_markup=markup
     )
@@ -72,7 +77,8 @@ async def get_filter_for_stat(update: Update, context: CallbackContext) -> int:
         keyword_markup = [stat_filter]
         markup = ReplyKeyboardMarkup(keyword_markup, one_time_keyboard=True)
 
-        await update.message.reply_text(
+        outbox.send_message(
+            update.effective_chat.id,
             'Choose one of the proposed options.',
             reply_markup=markup
         )
@@ -85,7 +91,8 @@ async def get_filter_for_stat(update: Update, context: CallbackContext) -> int:
         keyboard = [transaction_filter]
         markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True)
 
-        await update.message.reply_text(
+        outbox.send_message(
+            update.effective_chat.id,
             f'Great! You choose {update.message.text}.\n'
             'Now choose what criteria to filter the data by?',
             reply_markup=markup
@@ -93,7 +100,20 @@ async def get_filter_for_stat(update: Update, context: CallbackContext) -> int:
 
         return SPECIFIC_FILTER
 
-    await update.message.reply_text(
+    if update.message.text == TREND:
+        markup = ReplyKeyboardMarkup([trend_filter], one_time_keyboard=True)
+
+        outbox.send_message(
+            update.effective_chat.id,
+            f'Great! You choose {update.message.text}.\n'
+            'Show the amounts by week or by month?',
+            reply_markup=markup
+        )
+
+        return SPECIFIC_FILTER
+
+    outbox.send_message(
+        update.effective_chat.id,
         f'Great! You choose {update.message.text}.'
         'Enter the beginning and end of the period in the format:\n'
         'YYYY-MM-DD - YYYY-MM-DD (example 2024-01-01 - 2024-01-31)\n',
@@ -117,12 +137,25 @@ async def get_filter_date(update: Update, context: CallbackContext) -> int:
     logging.info(f'Entered {update.message.text} at get_filter_for_stat func')
     is_filter = update.message.text not in transaction_filter
     is_general = context.user_data['general_stat_filter'] == GENERAL
+    is_trend = context.user_data['general_stat_filter'] == TREND
+
+    if is_trend and update.message.text not in trend_filter:
+        markup = ReplyKeyboardMarkup([trend_filter], one_time_keyboard=True)
+
+        outbox.send_message(
+            update.effective_chat.id,
+            'Choose one of the proposed options.',
+            reply_markup=markup
+        )
+
+        return SPECIFIC_FILTER
 
     if is_filter and is_general:
         keyboard = [transaction_filter]
         markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True)
 
-        await update.message.reply_text(
+        outbox.send_message(
+            update.effective_chat.id,
             'Choose one of the proposed options.',
             reply_markup=markup
         )
@@ -132,7 +165,8 @@ async def get_filter_date(update: Update, context: CallbackContext) -> int:
     context.user_data['specific_stat_filter'] = update.message.text
 
     if update.message.text == CATEGORY:
-        await update.message.reply_text(
+        outbox.send_message(
+            update.effective_chat.id,
             'Want to view statistics for a specific period of time?\n'
             'If so, enter the beginning and end of the period in the format:\n'
             'YYYY-MM-DD - YYYY-MM-DD (example 2024-01-01 - 2024-01-31)\n'
@@ -140,7 +174,8 @@ async def get_filter_date(update: Update, context: CallbackContext) -> int:
             reply_markup=ReplyKeyboardRemove()
         )
     else:
-        await update.message.reply_text(
+        outbox.send_message(
+            update.effective_chat.id,
             'Enter the beginning and end of the period in the format:\n'
             'YYYY-MM-DD - YYYY-MM-DD (example 2024-01-01 - 2024-01-31)\n',
             reply_markup=ReplyKeyboardRemove()
@@ -164,10 +199,10 @@ async def show_statistics(update: Update, context: CallbackContext) -> int:
     user_id = context.user_data['user_id']
     general_filter = context.user_data['general_stat_filter']
     specific_filter = context.user_data.get('specific_stat_filter')
-    data = users[user_id]
 
-    if update.message.text.lower() == 'no' and specific_filter == DATE:
-        await update.message.reply_text(
+    if update.message.text.lower() == 'no' and specific_filter != CATEGORY:
+        outbox.send_message(
+            update.effective_chat.id,
             'You have entered an incorrect date. Please try again.'
         )
 
@@ -176,52 +211,76 @@ async def show_statistics(update: Update, context: CallbackContext) -> int:
     if update.message.text.lower() == 'no' and specific_filter == CATEGORY:
         if general_filter == GENERAL:
             labels = [EXPENSES, INCOMES]
-            amount_expenses = get_general_amount(data[EXPENSES.lower()])
-            amount_incomes = get_general_amount(data[INCOMES.lower()])
+            amount_expenses = get_general_amount(user_id, EXPENSES.lower())
+            amount_incomes = get_general_amount(user_id, INCOMES.lower())
 
             await show_image(update, labels, [amount_expenses, amount_incomes], GENERAL)
         else:
-            transactions = data[general_filter.lower()]
-            labels = list(transactions.keys())
-            list_of_category_amounts = [
-                sum(item['amount'] for item in items) for items in transactions.values()
-            ]
+            amounts_by_category = get_amounts_by_category(user_id, general_filter.lower())
 
-            await show_image(update, labels, list_of_category_amounts, general_filter)
+            await show_image(
+                update,
+                list(amounts_by_category.keys()),
+                list(amounts_by_category.values()),
+                general_filter
+            )
 
         return ConversationHandler.END
 
-    (start_date, end_date) = update.message.text.split(' - ')
+    dates = [part.strip() for part in update.message.text.split(' - ')]
 
-    if not is_valid_date(start_date) or not is_valid_date(end_date):
-        await update.message.reply_text(
+    if len(dates) != 2 or not all(is_valid_date(part) for part in dates):
+        outbox.send_message(
+            update.effective_chat.id,
             'Invalid date. Please try again'
         )
 
         return SHOW_STATISTIC
 
-    if general_filter == GENERAL and specific_filter == DATE:
+    (start_date, end_date) = dates
+
+    if general_filter == TREND:
+        (labels, expenses, incomes) = get_trend(
+            user_id, specific_filter.lower(), (start_date, end_date)
+        )
+
+        if not labels or len(labels) > MAX_TREND_PERIODS:
+            outbox.send_message(
+                update.effective_chat.id,
+                f'Enter a period of 1 to {MAX_TREND_PERIODS} '
+                f'{specific_filter.lower()}s. Please try again'
+            )
+
+            return SHOW_STATISTIC
+
+        await show_trend(update, labels, expenses, incomes, f'{TREND} by {specific_filter.lower()}')
+    elif general_filter == GENERAL and specific_filter == DATE:
         labels = [EXPENSES, INCOMES]
-        amount_expenses = get_general_amount(data[EXPENSES.lower()], (start_date, end_date))
-        amount_incomes = get_general_amount(data[INCOMES.lower()], (start_date, end_date))
+        amount_expenses = get_general_amount(user_id, EXPENSES.lower(), (start_date, end_date))
+        amount_incomes = get_general_amount(user_id, INCOMES.lower(), (start_date, end_date))
 
         await show_image(update, labels, [amount_expenses, amount_incomes], GENERAL)
     elif general_filter == GENERAL and specific_filter == CATEGORY:
-        expenses = data[EXPENSES.lower()]
-        incomes = data[INCOMES.lower()]
+        expenses = get_amounts_by_category(user_id, EXPENSES.lower(), (start_date, end_date))
+        incomes = get_amounts_by_category(user_id, INCOMES.lower(), (start_date, end_date))
         labels = list(expenses.keys())
-        incomes_labels = list(incomes.keys())
-        amounts_by_category = get_amounts_by_category(expenses, start_date, end_date)
-        amounts_by_category_incomes = get_amounts_by_category(incomes, start_date, end_date)
-        labels.extend(incomes_labels)
-        amounts_by_category.extend(amounts_by_category_incomes)
+        amounts_by_category = list(expenses.values())
+        labels.extend(incomes.keys())
+        amounts_by_category.extend(incomes.values())
 
         await show_image(update, labels, amounts_by_category, GENERAL)
     elif specific_filter == DATE:
-        transactions = data[general_filter.lower()]
-        labels = list(transactions.keys())
-        amounts_by_category = get_amounts_by_category(transactions, start_date, end_date)
+        amounts_by_category = get_amounts_by_category(
+            user_id,
+            general_filter.lower(),
+            (start_date, end_date)
+        )
 
-        await show_image(update, labels, amounts_by_category, general_filter)
+        await show_image(
+            update,
+            list(amounts_by_category.keys()),
+            list(amounts_by_category.values()),
+            general_filter
+        )
 
     return ConversationHandler.END
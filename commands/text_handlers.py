@@ -1,9 +1,10 @@
 from telegram import Update
 from telegram.ext import CallbackContext
 
-from utils import save_data
+from utils import save_user
 from classes import User
 from constants import (
+    outbox,
     categories,
     commands,
     users,
@@ -35,18 +36,16 @@ def user_exist_decorator(func):
         user_name = update.message.from_user.first_name
         context.user_data['user_id'] = user_id
 
-        if user_id not in users:
-            user = User(user_name)
-            users[user_id] = user.__dict__
-            save_data(users)
-            context.user_data['current_user'] = users[user_id]
+        if users.get(user_id) is None:
+            users[user_id] = User(user_name)
+            save_user(user_id, user_name)
 
-            await update.message.reply_text(
+            outbox.send_message(
+                update.effective_chat.id,
                 f'Hello, {user_name}.\n'
                 'Enter the /start command'
             )
         else:
-            context.user_data['current_user'] = User(**users[user_id])
             return await func(update, context, *args, **kwargs)
 
     return wrapper
@@ -64,7 +63,8 @@ async def start(update: Update, context: CallbackContext) -> None:
     Returns:
     - None
     """
-    await update.message.reply_text(
+    outbox.send_message(
+        update.effective_chat.id,
         f'Hi {update.message.from_user.first_name}\n'
         'I Expense Tracker. I will help you monitor your expenses and income.\n'
         'These are the commands that I understand and that will help us cooperate:\n'
@@ -84,7 +84,8 @@ async def default_message(update: Update, context: CallbackContext) -> None:
     Returns:
     - None
     """
-    await update.message.reply_text(
+    outbox.send_message(
+        update.effective_chat.id,
         'Sorry, I don\'t understand you. Please try again.\n'
         'If you want to use a command - please use "/" before it.'
     )
@@ -102,7 +103,8 @@ async def unknown_command(update: Update, context: CallbackContext) -> None:
     Returns:
     - None
     """
-    await update.message.reply_text(
+    outbox.send_message(
+        update.effective_chat.id,
         'I don\'t know this command.\n'
         'Here are the commands I can execute: \n\n'
         f'{'\n'.join(commands)}'
@@ -123,7 +125,7 @@ async def get_categories(update: Update, context: CallbackContext) -> None:
     """
     result = "\n".join([f"{i + 1}. {c}" for i, c in enumerate(categories)])
 
-    await update.message.reply_text(result)
+    outbox.send_message(update.effective_chat.id, result)
 
 
 @user_exist_decorator
@@ -138,7 +140,8 @@ async def get_help(update: Update, context: CallbackContext) -> None:
     Returns:
     - None
     """
-    await update.message.reply_text(
+    outbox.send_message(
+        update.effective_chat.id,
         'These are commands that you can execute:\n\n'
         f'{'\n'.join(commands)}'
     )
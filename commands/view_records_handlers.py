@@ -1,26 +1,160 @@
 import logging
-
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
+import math
+import re
+
+from telegram import (
+    Update,
+    Message,
+    ReplyKeyboardMarkup,
+    ReplyKeyboardRemove,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+)
 from telegram.ext import (
     CallbackContext,
     ConversationHandler,
 )
 
-from utils import (
-    get_transaction_list,
-    get_category_records_by_date,
-)
+from utils import get_records_page
 from constants import (
-    users,
+    outbox,
     categories,
     records_filter,
     date_filter,
     GENERAL_FILTER,
     DATE_FILTER,
     CATEGORY_FILTER,
+    RECORDS_PAGE_SIZE,
+    MAX_MESSAGE_LENGTH,
+    MAX_FILTER_CATEGORY_BYTES,
 )
 from .text_handlers import user_exist_decorator
 
+PAGE_CALLBACK = re.compile(
+    rf'page:(?P<record_type>expenses|incomes):(?P<offset>\d+)'
+    rf':(?P<date_filter>{"|".join(date_filter)})?:(?P<category>.*)\Z'
+)
+
+
+def build_records_page(user_id: str, record_type: str, list_filter: tuple, offset: int) -> tuple:
+    """
+    Builds the text and the navigation buttons of one page of records.
+
+    The buttons carry the record type, the offset of the page and the filter,
+    so every listing pages through its own records, in the form
+    'page:<record type>:<offset>:<date filter>:<category>' within Telegram's 64 bytes.
+
+    Args:
+    - user_id (str): The user's ID.
+    - record_type (str): The type of records ('expenses' or 'incomes').
+    - list_filter (tuple): The date filter and the category, each of them may be None.
+    - offset (int): The number of records before the page.
+
+    Returns:
+    - tuple: The text of the page and its InlineKeyboardMarkup, None if there is one page.
+    """
+    (filter_date, category) = list_filter
+    title = 'Expenses' if record_type == 'expenses' else 'Incomes'
+    page, total = get_records_page(
+        user_id, record_type, filter_date, category, offset, RECORDS_PAGE_SIZE
+    )
+
+    if not page and total > 0:
+        offset = (total - 1) // RECORDS_PAGE_SIZE * RECORDS_PAGE_SIZE
+        page, total = get_records_page(
+            user_id, record_type, filter_date, category, offset, RECORDS_PAGE_SIZE
+        )
+
+    if not page:
+        return f'{title}:\nNo records', None
+
+    text = f'{title}:\n' + "\n".join(f"{offset + i + 1}. {record}" for i, record in enumerate(page))
+
+    if total > RECORDS_PAGE_SIZE:
+        text += (f'\n\nPage {offset // RECORDS_PAGE_SIZE + 1} '
+                 f'of {math.ceil(total / RECORDS_PAGE_SIZE)}')
+
+    if len(text) > MAX_MESSAGE_LENGTH:
+        text = text[:MAX_MESSAGE_LENGTH - 1] + '…'
+
+    buttons = []
+    page_filter = f'{filter_date or ""}:{category or ""}'
+
+    if offset > 0:
+        buttons.append(InlineKeyboardButton(
+            '◀ Previous',
+            callback_data=f'page:{record_type}:{max(offset - RECORDS_PAGE_SIZE, 0)}:{page_filter}'
+        ))
+
+    if offset + RECORDS_PAGE_SIZE < total:
+        buttons.append(InlineKeyboardButton(
+            'Next ▶',
+            callback_data=f'page:{record_type}:{offset + RECORDS_PAGE_SIZE}:{page_filter}'
+        ))
+
+    return text, InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+async def send_records(
+        message: Message,
+        context: CallbackContext,
+        record_types: list,
+        list_filter: tuple
+) -> None:
+    """
+    Sends the first page of each type of records.
+
+    Args:
+    - message (Message): The message to reply to.
+    - context (CallbackContext): The callback context.
+    - record_types (list): The types of records to send ('expenses' and/or 'incomes').
+    - list_filter (tuple): The date filter and the category, each of them may be None.
+
+    Returns:
+    - None
+    """
+    user_id = context.user_data['user_id']
+
+    for record_type in record_types:
+        text, markup = build_records_page(user_id, record_type, list_filter, 0)
+
+        outbox.send_message(message.chat_id, text, reply_markup=markup)
+
+
+async def turn_page(update: Update, context: CallbackContext) -> None:
+    """
+    Handles the navigation buttons of a list of records by showing the requested page.
+
+    The filter of the listing is read from the button, so pages of an older
+    listing keep their filter after another one was requested.
+
+    Args:
+    - update (Update): The update object from Telegram.
+    - context (CallbackContext): The callback context.
+
+    Returns:
+    - None
+    """
+    query = update.callback_query
+    await query.answer()
+
+    page = PAGE_CALLBACK.match(query.data)
+    record_type = page['record_type']
+    offset = int(page['offset'])
+    user_id = str(query.from_user.id)
+    list_filter = (page['date_filter'], page['category'] or None)
+    logging.info(f'Page {offset} of {record_type} was requested')
+
+    text, markup = build_records_page(user_id, record_type, list_filter, offset)
+
+    outbox.send(
+        query.message.chat.id,
+        'edit_message_text',
+        message_id=query.message.message_id,
+        text=text,
+        reply_markup=markup
+    )
+
 
 @user_exist_decorator
 async def view_records(update: Update, context: CallbackContext) -> None:
@@ -36,24 +170,7 @@ async def view_records(update: Update, context: CallbackContext) -> None:
     """
     logging.info('Command /list was triggered')
 
-    user_id = context.user_data['user_id']
-    expenses = get_transaction_list(users[user_id]['expenses'], True)
-    incomes = get_transaction_list(users[user_id]['incomes'], False)
-
-    await update.message.reply_text(
-        'Expenses:\n'
-        f'{
-            ("\n".join([f"{i + 1}. {expense}" for i, expense in enumerate(expenses)]))
-            if len(expenses) > 0 else 'No records'
-        }'
-    )
-    await update.message.reply_text(
-        'Incomes:\n'
-        f'{
-            ("\n".join([f"{i + 1}. {income}" for i, income in enumerate(incomes)]))
-            if len(incomes) > 0 else 'No records'
-        }'
-    )
+    await send_records(update.message, context, ['expenses', 'incomes'], (None, None))
 
 
 @user_exist_decorator
@@ -72,7 +189,11 @@ async def get_filter(update: Update, context: CallbackContext) -> int:
     keyboard = [records_filter[:2], records_filter[2:]]
 
     markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True)
-    await update.message.reply_text('Select the parameter to filter records:', reply_markup=markup)
+    outbox.send_message(
+        update.effective_chat.id,
+        'Select the parameter to filter records:',
+        reply_markup=markup
+    )
 
     return GENERAL_FILTER
 
@@ -95,7 +216,8 @@ async def get_records_by_filter(update: Update, context: CallbackContext) -> int
         keyboard = [records_filter[:2], records_filter[2:]]
 
         markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True)
-        await update.message.reply_text(
+        outbox.send_message(
+            update.effective_chat.id,
             'Please select one of the suggested categories.',
             reply_markup=markup
         )
@@ -109,7 +231,8 @@ async def get_records_by_filter(update: Update, context: CallbackContext) -> int
     ]
     markup = ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
 
-    await update.message.reply_text(
+    outbox.send_message(
+        update.effective_chat.id,
         'Choose a time period to filter by:', reply_markup=markup
     )
 
@@ -127,14 +250,14 @@ async def filter_by_date(update: Update, context: CallbackContext) -> int:
     Returns:
     - int: The state value for conversation handler.
     """
-    user_id = context.user_data['user_id']
     general_filter = context.user_data["filter"]
 
     if update.message.text not in date_filter:
         keyboard = [date_filter]
 
         markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True)
-        await update.message.reply_text(
+        outbox.send_message(
+            update.effective_chat.id,
             'Please select one of the suggested filters.',
             reply_markup=markup
         )
@@ -142,56 +265,33 @@ async def filter_by_date(update: Update, context: CallbackContext) -> int:
         return DATE_FILTER
 
     context.user_data['date_filter'] = update.message.text
-    expenses = get_transaction_list(users[user_id]['expenses'], True, update.message.text)
-    incomes = get_transaction_list(users[user_id]['incomes'], False, update.message.text)
+    list_filter = (update.message.text, None)
 
     match general_filter:
-        case 'Date':
-            await update.message.reply_text(
-                'Expenses:\n'
-                f'{
-                    ("\n".join([f"{i + 1}. {expense}" for i, expense in enumerate(expenses)]))
-                    if len(expenses) > 0 else 'No records'
-                }'
-            )
-            await update.message.reply_text(
-                'Incomes:\n'
-                f'{
-                    ("\n".join([f"{i + 1}. {income}" for i, income in enumerate(incomes)]))
-                    if len(incomes) > 0 else 'No records'
-                }',
-                reply_markup=ReplyKeyboardRemove()
-            )
-
-            return ConversationHandler.END
-        case 'Expenses':
-            await update.message.reply_text(
-                'Expenses:\n'
-                f'{
-                    ("\n".join([f"{i + 1}. {expense}" for i, expense in enumerate(expenses)]))
-                    if len(expenses) > 0 else 'No records'
-                }',
-                reply_markup=ReplyKeyboardRemove()
-            )
-
-            return ConversationHandler.END
-        case 'Incomes':
-            await update.message.reply_text(
-                'Incomes:\n'
-                f'{
-                    ("\n".join([f"{i + 1}. {income}" for i, income in enumerate(incomes)]))
-                    if len(incomes) > 0 else 'No records'
-                }',
+        case 'Date' | 'Expenses' | 'Incomes':
+            record_types = {
+                'Date': ['expenses', 'incomes'],
+                'Expenses': ['expenses'],
+                'Incomes': ['incomes'],
+            }[general_filter]
+
+            outbox.send_message(
+                update.effective_chat.id,
+                f'Records for the {update.message.text.lower()}:',
                 reply_markup=ReplyKeyboardRemove()
             )
+            await send_records(update.message, context, record_types, list_filter)
 
             return ConversationHandler.END
-
         case 'Category':
             reply_keyboard = [categories[i:i + 3] for i in range(0, len(categories), 3)]
             markup = ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True)
 
-            await update.message.reply_text('Choose a category: ', reply_markup=markup)
+            outbox.send_message(
+                update.effective_chat.id,
+                'Choose a category: ',
+                reply_markup=markup
+            )
 
             return CATEGORY_FILTER
 
@@ -209,28 +309,22 @@ async def filter_by_category(update: Update, context: CallbackContext) -> int:
     - int: The state value for conversation handler.
     """
     logging.info(f'Filtering by category {update.message.text}')
-    user_id = context.user_data['user_id']
     category = update.message.text.split()[0]
     filter_date = context.user_data['date_filter']
-    expenses = get_category_records_by_date(
-        True,
-        filter_date,
-        users[user_id]['expenses'].get(category)
-    )
-    incomes = get_category_records_by_date(
-        False,
-        filter_date,
-        users[user_id]['incomes'].get(category)
-    )
 
-    await update.message.reply_text(
-        'Expenses:\n'
-        f'{"\n".join(expenses) if len(expenses) > 0 else 'No records'}\n\n'
-    )
-    await update.message.reply_text(
-        'Incomes:\n'
-        f'{"\n".join(incomes) if len(incomes) > 0 else 'No records'}\n\n',
+    if len(category.encode()) > MAX_FILTER_CATEGORY_BYTES:
+        outbox.send_message(
+            update.effective_chat.id,
+            'The category name is too long to filter by. Please choose another category.'
+        )
+
+        return CATEGORY_FILTER
+
+    outbox.send_message(
+        update.effective_chat.id,
+        f'{category} records for the {filter_date.lower()}:',
         reply_markup=ReplyKeyboardRemove()
     )
+    await send_records(update.message, context, ['expenses', 'incomes'], (filter_date, category))
 
     return ConversationHandler.END
@@ -1,5 +1,6 @@
-import json
 from TOKEN import TOKEN_BOT
+from storage import JournalStorage, SqliteStorage
+from outbound import SendQueue
 
 # Constants for ConversationHandlers
 (
@@ -15,7 +16,16 @@ from TOKEN import TOKEN_BOT
     STAT_FILTER,
     SPECIFIC_FILTER,
     SHOW_STATISTIC,
-) = range(12)
+    IMPORT_FILE,
+    EXPORT_FILTER,
+    BUDGET_CATEGORY,
+    BUDGET_AMOUNT,
+) = range(16)
+# The names of the conversation states above by their value, e.g. for the metrics labels
+STATE_NAMES = {
+    state: name for (name, state) in list(globals().items())
+    if name.isupper() and isinstance(state, int)
+}
 
 # General constants
 DATE = 'Date'
@@ -23,9 +33,11 @@ CATEGORY = 'Category'
 EXPENSES = 'Expenses'
 INCOMES = 'Incomes'
 GENERAL = 'General'
+TREND = 'Trend'
 WEEK = 'Week'
 YEAR = 'Year'
 MONTH = 'Month'
+ALL_TIME = 'All time'
 categories = [
     'Home 🏘',
     'Transport 🚚',
@@ -39,12 +51,23 @@ categories = [
     'Other 📝',
 ]
 
+# Message limits
+MAX_MESSAGE_LENGTH = 4096
+RECORDS_PAGE_SIZE = 20
+MAX_FILTER_CATEGORY_BYTES = 32  # keeps the callback_data of page buttons within 64 bytes
+MAX_TREND_PERIODS = 260  # weeks or months on one trend chart
+
+# Budgets
+BUDGET_WARNING_SHARE = 0.8  # share of a monthly budget spent before the user is warned
+
 # Keyboard markups
 records_filter = [DATE, CATEGORY, EXPENSES, INCOMES]
 date_filter = [WEEK, MONTH, YEAR]
 delete_filter = [INCOMES, EXPENSES]
-stat_filter = [GENERAL, INCOMES, EXPENSES]
+stat_filter = [GENERAL, INCOMES, EXPENSES, TREND]
 transaction_filter = [CATEGORY, DATE]
+trend_filter = [WEEK, MONTH]
+export_filter = [WEEK, MONTH, YEAR, ALL_TIME]
 
 # List of available commands
 commands = [
@@ -56,9 +79,72 @@ commands = [
     'Show list of all records: /list',
     'Show filtered records: /list_by_filter',
     'Delete record: /delete_record',
-    'Show statistics: /get_statistics'
+    'Show statistics: /get_statistics',
+    'Import records from a CSV file: /import',
+    'Export records to a CSV file: /export',
+    'Set a monthly budget: /set_budget',
 ]
 
-# Data from JSON
-with open('./data.json', 'r') as data_file:
-    users = json.load(data_file)
+# Storage settings
+STORAGE_BACKEND = 'journal'  # 'journal' or 'sqlite'
+DATA_DIR = './data'
+DATA_FILE = './data.json'
+JOURNAL_FILE = './data.journal'
+JOURNAL_COMPACT_THRESHOLD = 1000
+SQLITE_FILE = './data.sqlite3'
+FLUSH_INTERVAL = 0.5
+USER_CACHE_SIZE = 1000
+USER_IDLE_TIMEOUT = 3600
+
+# CSV import settings
+IMPORT_MAX_FILE_SIZE = 20 * 1024 * 1024  # bytes, the largest file a bot can download
+IMPORT_MAX_ROWS = 200_000
+
+# CSV export settings
+EXPORT_SPOOL_SIZE = 1024 * 1024  # bytes of an export kept in memory before it spills to disk
+
+# Conversation persistence settings
+CONVERSATION_FILE = './conversations.sqlite3'
+PERSISTENCE_INTERVAL = 1  # seconds between two writes of the changed conversation states
+
+# Update processing settings
+MAX_CONCURRENT_UPDATES = 256
+SHARD_COUNT = 1  # number of worker processes the users are sharded across, 1 for a single process
+SHARD_QUEUE_SIZE = 10_000  # updates waiting for a shard worker before the dispatcher blocks
+
+# Outbound message settings
+OUTBOX_RATE = 30  # messages per second to all chats
+OUTBOX_CHAT_RATE = 1  # messages per second to one chat
+OUTBOX_CHAT_BURST = 3  # messages sent to one chat at once before OUTBOX_CHAT_RATE applies
+OUTBOX_MAX_RETRIES = 5  # retries of a message refused with RetryAfter
+
+# Chart settings
+CHART_WORKERS = None  # number of chart rendering processes, None for one per CPU
+CHART_CACHE_SIZE = 32 * 1024 * 1024  # bytes of rendered charts kept in memory
+
+# Metrics settings
+METRICS_PORT = None  # port of the Prometheus text endpoint, None to disable it
+METRICS_LOG_INTERVAL = 300  # seconds between two metrics dumps to the log, 0 to disable them
+
+# Users data, loaded one user at a time from the configured storage backend
+if STORAGE_BACKEND == 'sqlite':
+    storage = SqliteStorage(SQLITE_FILE, FLUSH_INTERVAL, USER_CACHE_SIZE, USER_IDLE_TIMEOUT)
+else:
+    storage = JournalStorage(
+        DATA_DIR,
+        JOURNAL_COMPACT_THRESHOLD,
+        FLUSH_INTERVAL,
+        USER_CACHE_SIZE,
+        USER_IDLE_TIMEOUT,
+    )
+
+users = storage.users
+
+# Outgoing messages, sent within Telegram's rate limits
+outbox = SendQueue(
+    OUTBOX_RATE,
+    OUTBOX_CHAT_RATE,
+    OUTBOX_CHAT_BURST,
+    OUTBOX_MAX_RETRIES,
+    MAX_MESSAGE_LENGTH,
+)
@@ -0,0 +1,94 @@
+import calendar
+from datetime import date, datetime, timedelta
+
+WINDOW_DAYS = {
+    'Week': 7,
+}
+WINDOW_MONTHS = {
+    'Month': 1,
+    'Year': 12,
+}
+
+
+def shift_months(day: date, months: int) -> date:
+    """
+    Moves a date by a number of calendar months, clamping the day to the length of the month.
+
+    Args:
+    - day (date): The date.
+    - months (int): The number of months, negative to move back.
+
+    Returns:
+    - date: The moved date, e.g. March 31 minus one month is February 28 or 29.
+    """
+    year, month_index = divmod(day.year * 12 + day.month - 1 + months, 12)
+    last_day = calendar.monthrange(year, month_index + 1)[1]
+
+    return date(year, month_index + 1, min(day.day, last_day))
+
+
+def get_rolling_window(days: int, today: date = None) -> tuple:
+    """
+    Computes the window of the last days days, today included.
+
+    Args:
+    - days (int): The length of the window in days.
+    - today (date, optional): The last day of the window. Defaults to today.
+
+    Returns:
+    - tuple: The date ordinals of the first and the last day of the window.
+    """
+    today = today or date.today()
+
+    return (today - timedelta(days=days - 1)).toordinal(), today.toordinal()
+
+
+def get_window(date_filter: str, today: date = None) -> tuple:
+    """
+    Computes the window of a date filter, ending today.
+
+    'Week' covers the last 7 days; 'Month' and 'Year' start on the day after
+    the same day one month or one year ago, clamped to the end of shorter months,
+    so no day of the month or of the year is counted twice.
+
+    Args:
+    - date_filter (str): The date filter ('Week', 'Month' or 'Year').
+    - today (date, optional): The last day of the window. Defaults to today.
+
+    Returns:
+    - tuple: The date ordinals of the first and the last day of the window.
+
+    Raises:
+    - ValueError: If the date filter is unknown.
+    """
+    today = today or date.today()
+
+    if date_filter in WINDOW_DAYS:
+        return get_rolling_window(WINDOW_DAYS[date_filter], today)
+
+    if date_filter in WINDOW_MONTHS:
+        start = shift_months(today, -WINDOW_MONTHS[date_filter]) + timedelta(days=1)
+
+        return start.toordinal(), today.toordinal()
+
+    raise ValueError(f'Unknown date filter {date_filter}')
+
+
+def parse_range(start_date: str, end_date: str) -> tuple:
+    """
+    Parses the first and the last day of a range in YYYY-MM-DD format.
+
+    Args:
+    - start_date (str): The first day of the range.
+    - end_date (str): The last day of the range.
+
+    Returns:
+    - tuple: The date ordinals of the first and the last day of the range.
+
+    Raises:
+    - ValueError: If a date is not in YYYY-MM-DD format.
+    """
+    return (
+        datetime.strptime(start_date, '%Y-%m-%d').toordinal(),
+        datetime.strptime(end_date, '%Y-%m-%d').toordinal(),
+    )
@@ -0,0 +1,336 @@
+import functools
+import logging
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Histogram:
+    """
+    Cumulative latency histogram with fixed buckets, in the Prometheus layout.
+
+    Methods:
+    - observe(self, value: float) -> None:
+                Counts a value in its bucket.
+    """
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS) -> None:
+        """
+        Initializes a new Histogram object.
+
+        Args:
+        - buckets (tuple, optional): The upper bounds of the buckets, in ascending order.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Counts a value in its bucket.
+
+        Args:
+        - value (float): The observed value.
+
+        Returns:
+        - None
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of counters and histograms keyed by name and labels.
+
+    Recording a value costs one lock and one dictionary lookup; everything
+    else is deferred to rendering, so it is cheap enough for every update.
+
+    Methods:
+    - increment(self, name: str, labels: tuple = (), value: float = 1) -> None:
+                Adds a value to a counter.
+    - observe(self, name: str, value: float, labels: tuple = ()) -> None:
+                Records a value in a histogram.
+    - time(self, name: str, labels: tuple = ()) -> Timer:
+                Returns a context manager recording its duration in a histogram.
+    - render(self) -> str:
+                Renders every metric in the Prometheus text format.
+    """
+    def __init__(self, prefix: str = 'bot') -> None:
+        """
+        Initializes a new MetricsRegistry object.
+
+        Args:
+        - prefix (str, optional): The prefix of every metric name. Defaults to 'bot'.
+        """
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def increment(self, name: str, labels: tuple = (), value: float = 1) -> None:
+        """
+        Adds a value to a counter.
+
+        Args:
+        - name (str): The name of the counter.
+        - labels (tuple, optional): The (label, value) pairs of the counter.
+        - value (float, optional): The value to add. Defaults to 1.
+
+        Returns:
+        - None
+        """
+        key = (name, labels)
+
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: tuple = ()) -> None:
+        """
+        Records a value in a histogram.
+
+        Args:
+        - name (str): The name of the histogram.
+        - value (float): The observed value.
+        - labels (tuple, optional): The (label, value) pairs of the histogram.
+
+        Returns:
+        - None
+        """
+        key = (name, labels)
+
+        with self._lock:
+            histogram = self._histograms.get(key)
+
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+
+            histogram.observe(value)
+
+    def time(self, name: str, labels: tuple = ()) -> 'Timer':
+        """
+        Returns a context manager recording its duration in a histogram.
+
+        Args:
+        - name (str): The name of the histogram.
+        - labels (tuple, optional): The (label, value) pairs of the histogram.
+
+        Returns:
+        - Timer: The context manager.
+        """
+        return Timer(self, name, labels)
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text format.
+
+        Returns:
+        - str: The metrics, one sample per line.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (histogram.buckets, list(histogram.counts), histogram.sum, histogram.count))
+                for key, histogram in self._histograms.items()
+            )
+
+        lines = []
+        declared = set()
+
+        for (name, labels), value in counters:
+            full_name = f'{self.prefix}_{name}'
+
+            if full_name not in declared:
+                declared.add(full_name)
+                lines.append(f'# TYPE {full_name} counter')
+
+            lines.append(f'{full_name}{format_labels(labels)} {value}')
+
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            full_name = f'{self.prefix}_{name}'
+
+            if full_name not in declared:
+                declared.add(full_name)
+                lines.append(f'# TYPE {full_name} histogram')
+
+            cumulative = 0
+
+            for bound, bucket_count in zip((*buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                lines.append(
+                    f'{full_name}_bucket{format_labels((*labels, ("le", str(bound))))} {cumulative}'
+                )
+
+            lines.append(f'{full_name}_sum{format_labels(labels)} {total}')
+            lines.append(f'{full_name}_count{format_labels(labels)} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class Timer:
+    """
+    Context manager recording the time spent inside it in a histogram.
+    """
+    __slots__ = ('registry', 'name', 'labels', 'started')
+
+    def __init__(self, registry: MetricsRegistry, name: str, labels: tuple) -> None:
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self) -> 'Timer':
+        self.started = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.registry.observe(self.name, time.perf_counter() - self.started, self.labels)
+
+
+def format_labels(labels: tuple) -> str:
+    """
+    Formats (label, value) pairs as Prometheus labels.
+
+    Args:
+    - labels (tuple): The (label, value) pairs.
+
+    Returns:
+    - str: The labels in braces, an empty string if there are none.
+    """
+    if not labels:
+        return ''
+
+    pairs = []
+
+    for label, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{label}="{value}"')
+
+    return '{' + ','.join(pairs) + '}'
+
+
+registry = MetricsRegistry()
+
+
+def instrument(callback, labels: tuple):
+    """
+    Wraps a handler callback to count its calls and errors and record its latency.
+
+    Args:
+    - callback (function): The async handler callback.
+    - labels (tuple): The (label, value) pairs identifying the handler.
+
+    Returns:
+    - function: The wrapped callback.
+    """
+    @functools.wraps(callback)
+    async def wrapper(update, context, *args, **kwargs):
+        started = time.perf_counter()
+
+        try:
+            return await callback(update, context, *args, **kwargs)
+        except Exception:
+            registry.increment('handler_errors_total', labels)
+            raise
+        finally:
+            registry.observe('handler_latency_seconds', time.perf_counter() - started, labels)
+
+    return wrapper
+
+
+def instrument_conversation(conversation, state_names: dict = None) -> None:
+    """
+    Instruments every handler of a ConversationHandler in place.
+
+    The handlers are labelled with their callback, the state they serve
+    ('entry' for entry points) and the command for command handlers.
+
+    Args:
+    - conversation (ConversationHandler): The conversation handler.
+    - state_names (dict, optional): The names the states are labelled with, by state.
+                                States without a name are labelled with their value.
+
+    Returns:
+    - None
+    """
+    state_names = state_names or {}
+    groups = [('entry', conversation.entry_points), ('fallback', conversation.fallbacks)]
+    groups.extend(
+        (state_names.get(state, str(state)), handlers)
+        for state, handlers in conversation.states.items()
+    )
+
+    for state, handlers in groups:
+        for handler in handlers:
+            labels = (('handler', handler.callback.__name__), ('state', state))
+            commands = getattr(handler, 'commands', None)
+
+            if commands:
+                labels += (('command', '/' + min(commands)),)
+
+            handler.callback = instrument(handler.callback, labels)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves the metrics of the registry in the Prometheus text format.
+    """
+    def do_GET(self) -> None:
+        body = registry.render().encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def start_http_server(port: int, address: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """
+    Serves the metrics on http://address:port/ from a daemon thread.
+
+    Args:
+    - port (int): The port to listen on.
+    - address (str, optional): The address to listen on. Defaults to '0.0.0.0'.
+
+    Returns:
+    - ThreadingHTTPServer: The running server.
+    """
+    server = ThreadingHTTPServer((address, port), MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logging.info(f'Metrics are served on port {port}')
+
+    return server
+
+
+def start_log_dump(interval: float) -> threading.Event:
+    """
+    Logs the metrics every interval seconds from a daemon thread.
+
+    Args:
+    - interval (float): The number of seconds between two dumps.
+
+    Returns:
+    - threading.Event: The event stopping the dumps once set.
+    """
+    stopped = threading.Event()
+
+    def dump() -> None:
+        while not stopped.wait(interval):
+            logging.info(f'Metrics:\n{registry.render()}')
+
+    threading.Thread(target=dump, name='metrics-log-dump', daemon=True).start()
+
+    return stopped
@@ -1,6 +1,9 @@
+import argparse
 import logging
 from telegram.ext import (
+    Application,
     ApplicationBuilder,
+    CallbackQueryHandler,
     CommandHandler,
     ConversationHandler,
     MessageHandler,
@@ -23,16 +26,47 @@ from commands import (
     get_records_by_filter,
     filter_by_date,
     filter_by_category,
+    turn_page,
+    PAGE_CALLBACK,
     delete_record,
     select_item,
     delete_item,
+    import_records,
+    import_file,
+    export_records,
+    send_export,
+    set_budget,
+    get_budget_category,
+    get_budget_amount,
     get_data_for_stat,
     get_filter_for_stat,
     get_filter_date,
     show_statistics,
 )
+from commands.build_chart import shutdown_chart_pool
+from update_processor import PerChatUpdateProcessor
+from persistence import SqlitePersistence
+from sharding import run_dispatcher
+from instrumentation import (
+    instrument,
+    instrument_conversation,
+    start_http_server,
+    start_log_dump,
+)
 from constants import (
+    storage,
+    outbox,
+    STORAGE_BACKEND,
+    DATA_FILE,
+    JOURNAL_FILE,
     TOKEN_BOT,
+    MAX_CONCURRENT_UPDATES,
+    CONVERSATION_FILE,
+    PERSISTENCE_INTERVAL,
+    METRICS_PORT,
+    METRICS_LOG_INTERVAL,
+    SHARD_COUNT,
+    STATE_NAMES,
     ASKING_CATEGORY,
     ASKING_TITLE,
     ASKING_PRICE,
@@ -45,6 +79,10 @@ from constants import (
     STAT_FILTER,
     SPECIFIC_FILTER,
     SHOW_STATISTIC,
+    IMPORT_FILE,
+    EXPORT_FILTER,
+    BUDGET_CATEGORY,
+    BUDGET_AMOUNT,
 )
 
 logging.basicConfig(
@@ -53,8 +91,63 @@ logging.basicConfig(
 )
 
 
-def run():
-    app = ApplicationBuilder().token(TOKEN_BOT).build()
+async def start_outbox(app: Application) -> None:
+    """
+    Binds the send queue to the application's bot once it is initialized.
+
+    Args:
+    - app (Application): The application.
+
+    Returns:
+    - None
+    """
+    outbox.bind(app.bot)
+
+
+async def stop_outbox(app: Application) -> None:
+    """
+    Sends the queued messages once the application stopped taking updates.
+
+    Args:
+    - app (Application): The application.
+
+    Returns:
+    - None
+    """
+    await outbox.stop()
+
+
+def build_application(updater: bool = True, shard: int = None) -> Application:
+    """
+    Builds the application with the conversation and the page handlers.
+
+    Updates are processed concurrently, updates of one chat in the order they came.
+    The conversation states and user_data survive a restart. Replies go through
+    the send queue, so handlers never wait for Telegram. Every handler is instrumented.
+
+    Args:
+    - updater (bool, optional): Whether the application fetches updates itself.
+                                Shard workers receive them from the dispatcher. Defaults to True.
+    - shard (int, optional): The index of the shard the application serves. A shard keeps
+                                its conversation states in its own file. Defaults to None.
+
+    Returns:
+    - Application: The application.
+    """
+    conversation_file = CONVERSATION_FILE if shard is None else f'{CONVERSATION_FILE}.shard{shard}'
+    builder = (
+        ApplicationBuilder()
+        .token(TOKEN_BOT)
+        .concurrent_updates(PerChatUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        .persistence(SqlitePersistence(conversation_file, PERSISTENCE_INTERVAL))
+        .post_init(start_outbox)
+        .post_stop(stop_outbox)
+    )
+
+    if not updater:
+        builder = builder.updater(None)
+
+    app = builder.build()
     logging.info("Application build successfully!")
 
     conv_handler = ConversationHandler(
@@ -68,6 +161,9 @@ def run():
             CommandHandler('list_by_filter', get_filter),
             CommandHandler('delete_record', delete_record),
             CommandHandler('get_statistics', get_data_for_stat),
+            CommandHandler('import', import_records),
+            CommandHandler('export', export_records),
+            CommandHandler('set_budget', set_budget),
             MessageHandler(filters.TEXT & ~filters.COMMAND, default_message),
             MessageHandler(filters.COMMAND, unknown_command),
         ],
@@ -85,15 +181,112 @@ def run():
             DELETE_CHOSEN_ITEM: [MessageHandler(filters.TEXT & ~filters.COMMAND, delete_item)],
             STAT_FILTER: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_filter_for_stat)],
             SPECIFIC_FILTER: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_filter_date)],
-            SHOW_STATISTIC: [MessageHandler(filters.TEXT & ~filters.COMMAND, show_statistics)]
+            SHOW_STATISTIC: [MessageHandler(filters.TEXT & ~filters.COMMAND, show_statistics)],
+            IMPORT_FILE: [MessageHandler(~filters.COMMAND, import_file)],
+            EXPORT_FILTER: [MessageHandler(filters.TEXT & ~filters.COMMAND, send_export)],
+            BUDGET_CATEGORY: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_budget_category)],
+            BUDGET_AMOUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_budget_amount)],
         },
-        fallbacks=[]
+        fallbacks=[],
+        name='expenses',
+        persistent=True,
     )
 
+    instrument_conversation(conv_handler, STATE_NAMES)
     app.add_handler(conv_handler)
+    app.add_handler(CallbackQueryHandler(
+        instrument(turn_page, (('handler', 'turn_page'), ('state', 'callback'))),
+        pattern=PAGE_CALLBACK
+    ))
+
+    return app
+
+
+def run(
+        webhook_url: str = None,
+        listen: str = '0.0.0.0',
+        port: int = 8443,
+        url_path: str = '',
+        secret_token: str = None,
+        metrics_port: int = METRICS_PORT,
+        shards: int = SHARD_COUNT,
+) -> None:
+    """
+    Serves updates by polling or through a webhook.
+
+    With more than one shard the updates are dispatched to shard worker
+    processes, each serving its own slice of the users. The metrics are served
+    in the Prometheus text format and/or dumped to the log periodically.
+
+    Args:
+    - webhook_url (str, optional): The public URL of the webhook. Polling is used if not set.
+    - listen (str, optional): The address the webhook server listens on. Defaults to '0.0.0.0'.
+    - port (int, optional): The port the webhook server listens on. Defaults to 8443.
+    - url_path (str, optional): The path the webhook server accepts updates on. Defaults to ''.
+    - secret_token (str, optional): The secret token Telegram sends with every webhook request.
+    - metrics_port (int, optional): The port of the metrics endpoint. Disabled if not set.
+                                Shard workers serve theirs on this and the following ports.
+    - shards (int, optional): The number of shard worker processes, 1 to serve in this process.
+
+    Returns:
+    - None
+    """
+    if STORAGE_BACKEND == 'journal':
+        storage.import_legacy(DATA_FILE, JOURNAL_FILE)
 
-    app.run_polling()
+    if shards > 1:
+        run_dispatcher(
+            build_application, shards, metrics_port,
+            webhook_url, listen, port, url_path, secret_token
+        )
+        return
+
+    app = build_application()
+
+    if metrics_port:
+        start_http_server(metrics_port)
+
+    if METRICS_LOG_INTERVAL:
+        start_log_dump(METRICS_LOG_INTERVAL)
+
+    storage.start()
+
+    try:
+        if webhook_url:
+            app.run_webhook(
+                listen=listen,
+                port=port,
+                url_path=url_path,
+                webhook_url=webhook_url,
+                secret_token=secret_token,
+            )
+        else:
+            app.run_polling()
+    finally:
+        shutdown_chart_pool()
+        storage.close()
+        logging.info("Data was saved")
 
 
 if __name__ == '__main__':
-    run()
+    parser = argparse.ArgumentParser(description='Expense Tracker Telegram bot.')
+    parser.add_argument('--webhook-url', help='serve updates through a webhook at this public URL')
+    parser.add_argument('--listen', default='0.0.0.0', help='address of the webhook server')
+    parser.add_argument('--port', type=int, default=8443, help='port of the webhook server')
+    parser.add_argument('--url-path', default='', help='path of the webhook server')
+    parser.add_argument('--secret-token', help='secret token of the webhook requests')
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT,
+                        help='port of the Prometheus text metrics endpoint')
+    parser.add_argument('--shards', type=int, default=SHARD_COUNT,
+                        help='number of worker processes the users are sharded across')
+    args = parser.parse_args()
+
+    run(
+        args.webhook_url,
+        args.listen,
+        args.port,
+        args.url_path,
+        args.secret_token,
+        args.metrics_port,
+        args.shards,
+    )
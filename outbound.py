@@ -0,0 +1,494 @@
+import asyncio
+import heapq
+import logging
+import time
+from collections import deque
+from datetime import timedelta
+
+from telegram.error import RetryAfter
+
+from instrumentation import registry
+
+MESSAGE_SEPARATOR = '\n\n'
+
+
+class RateLimit:
+    """
+    Token bucket allowing rate calls per second on average and burst calls at once.
+
+    Methods:
+    - delay(self, now: float) -> float:
+                Returns the number of seconds until a call is allowed.
+    - take(self, now: float) -> None:
+                Counts a call.
+    - is_full(self, now: float) -> bool:
+                Returns whether the bucket has been refilled completely.
+    """
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """
+        Initializes a new RateLimit object.
+
+        Args:
+        - rate (float): The number of calls allowed per second on average.
+        - burst (int, optional): The number of calls allowed at once. Defaults to 1.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """
+        Returns the number of seconds until a call is allowed.
+
+        Args:
+        - now (float): The current time.monotonic() time.
+
+        Returns:
+        - float: The number of seconds, 0 if a call is allowed now.
+        """
+        self._refill(now)
+
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        """
+        Counts a call.
+
+        Args:
+        - now (float): The current time.monotonic() time.
+
+        Returns:
+        - None
+        """
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        """
+        Returns whether the bucket has been refilled completely.
+
+        Args:
+        - now (float): The current time.monotonic() time.
+
+        Returns:
+        - bool: True if the bucket is in its initial state.
+        """
+        self._refill(now)
+
+        return self.tokens >= self.burst
+
+
+class Job:
+    """
+    One Bot API call waiting in a chat's queue, with the futures of the sends it stands for.
+    """
+    __slots__ = ('method', 'kwargs', 'futures', 'attempts', 'queued')
+
+    def __init__(self, method: str, kwargs: dict, futures: list) -> None:
+        """
+        Initializes a new Job object.
+
+        Args:
+        - method (str): The name of the Bot method.
+        - kwargs (dict): The arguments of the call, except the chat ID.
+        - futures (list): The futures resolved with the result of the call.
+        """
+        self.method = method
+        self.kwargs = kwargs
+        self.futures = futures
+        self.attempts = 0
+        self.queued = time.monotonic()
+
+    def get_options(self) -> dict:
+        """
+        Returns the arguments of a send_message call other than the text and the keyboard.
+
+        Returns:
+        - dict: The options.
+        """
+        return {key: value for key, value in self.kwargs.items()
+                if key not in ('text', 'reply_markup')}
+
+    def can_merge(self, other: 'Job', max_length: int) -> bool:
+        """
+        Returns whether the text of the next job can be appended to this one's.
+
+        Only texts without a keyboard of their own are extended, with texts
+        sent with the same options, as long as the result fits into one message.
+
+        Args:
+        - other (Job): The next job of the chat.
+        - max_length (int): The maximum length of a message.
+
+        Returns:
+        - bool: True if the two texts can be sent as one message.
+        """
+        if self.method != 'send_message' or other.method != 'send_message':
+            return False
+
+        if self.kwargs.get('reply_markup') is not None or self.get_options() != other.get_options():
+            return False
+
+        length = len(self.kwargs['text']) + len(MESSAGE_SEPARATOR) + len(other.kwargs['text'])
+
+        return length <= max_length
+
+    def merge(self, other: 'Job') -> None:
+        """
+        Appends the text of the next job to this one's, taking over its keyboard and futures.
+
+        Args:
+        - other (Job): The next job of the chat.
+
+        Returns:
+        - None
+        """
+        self.kwargs = {
+            **other.kwargs,
+            'text': self.kwargs['text'] + MESSAGE_SEPARATOR + other.kwargs['text'],
+        }
+        self.futures += other.futures
+
+
+class SendQueue:
+    """
+    Central queue of outgoing Bot API calls, sent within Telegram's rate limits.
+
+    Handlers queue their messages and return at once; a background task sends
+    them. Calls to one chat are sent one at a time in the order they were queued,
+    and within the global and the per-chat limits. Consecutive texts to a chat
+    that fit into one message are sent as one. A call refused with RetryAfter
+    is retried once the chat's wait is over, without blocking other chats.
+
+    Methods:
+    - bind(self, bot) -> None:
+                Sets the bot the calls are sent with.
+    - send(self, chat_id: int, method: str, **kwargs) -> asyncio.Future:
+                Queues a Bot API call to a chat.
+    - send_message(self, chat_id: int, text: str, **kwargs) -> asyncio.Future:
+                Queues a text message to a chat.
+    - join(self) -> None:
+                Waits until every queued call has been sent.
+    - stop(self) -> None:
+                Sends the queued calls and stops the background task.
+    """
+    def __init__(
+            self,
+            rate: float = None,
+            chat_rate: float = None,
+            chat_burst: int = 1,
+            max_retries: int = 5,
+            max_message_length: int = 4096,
+            bot=None,
+    ) -> None:
+        """
+        Initializes a new SendQueue object.
+
+        Args:
+        - rate (float, optional): The number of calls per second to all chats. Unlimited if not set.
+        - chat_rate (float, optional): The number of calls per second to one chat.
+                                    Unlimited if not set.
+        - chat_burst (int, optional): The number of calls sent to one chat at once
+                                    before chat_rate applies. Defaults to 1.
+        - max_retries (int, optional): The number of times a call refused with RetryAfter
+                                    is retried. Defaults to 5.
+        - max_message_length (int, optional): The maximum length of a merged message.
+                                    Defaults to 4096, Telegram's limit.
+        - bot (Bot, optional): The bot the calls are sent with. Can be set later with bind.
+        """
+        self.rate = rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_message_length = max_message_length
+        self.bot = bot
+        self._limit = RateLimit(rate, 1) if rate else None
+        self._chat_limits = {}
+        self._paused = {}
+        self._chats = {}
+        self._schedule = []
+        self._order = 0
+        self._deliveries = set()
+        self._task = None
+        self._wakeup = None
+        self._idle = None
+
+    def bind(self, bot) -> None:
+        """
+        Sets the bot the calls are sent with.
+
+        Args:
+        - bot (Bot): The bot.
+
+        Returns:
+        - None
+        """
+        self.bot = bot
+
+    def _start(self) -> None:
+        """
+        Starts the background task in the running event loop, if it is not running there yet.
+
+        Calls left by a stopped task, e.g. of an event loop that was closed, are dropped.
+
+        Returns:
+        - None
+        """
+        loop = asyncio.get_running_loop()
+
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._chats = {}
+            self._schedule = []
+            self._wakeup = asyncio.Event()
+            self._idle = asyncio.Event()
+            self._task = loop.create_task(self._run(), name='send-queue')
+
+    def _get_chat_limit(self, chat_id: int) -> RateLimit | None:
+        """
+        Returns the rate limit of a chat.
+
+        Args:
+        - chat_id (int): The chat ID.
+
+        Returns:
+        - RateLimit | None: The chat's rate limit, None if chats are unlimited.
+        """
+        if not self.chat_rate:
+            return None
+
+        if chat_id not in self._chat_limits:
+            self._chat_limits[chat_id] = RateLimit(self.chat_rate, self.chat_burst)
+
+        return self._chat_limits[chat_id]
+
+    def _schedule_chat(self, chat_id: int) -> None:
+        """
+        Schedules the next call to a chat for the time its limit and its RetryAfter wait allow.
+
+        Args:
+        - chat_id (int): The chat ID.
+
+        Returns:
+        - None
+        """
+        now = time.monotonic()
+        limit = self._get_chat_limit(chat_id)
+        ready = max(now + (limit.delay(now) if limit else 0), self._paused.get(chat_id, 0))
+        self._order += 1
+        heapq.heappush(self._schedule, (ready, self._order, chat_id))
+        self._wakeup.set()
+
+    def send(self, chat_id: int, method: str, **kwargs) -> asyncio.Future:
+        """
+        Queues a Bot API call to a chat and returns at once.
+
+        Args:
+        - chat_id (int): The chat ID.
+        - method (str): The name of the Bot method, e.g. 'send_photo'.
+        - **kwargs: The arguments of the call, except the chat ID.
+
+        Returns:
+        - asyncio.Future: Resolved with the result of the call once it is sent.
+                        Awaiting it is optional; failures are logged either way.
+        """
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        jobs = self._chats.get(chat_id)
+
+        if jobs is None:
+            jobs = self._chats[chat_id] = deque()
+            self._schedule_chat(chat_id)
+
+        jobs.append(Job(method, kwargs, [future]))
+        self._idle.clear()
+
+        return future
+
+    def send_message(self, chat_id: int, text: str, **kwargs) -> asyncio.Future:
+        """
+        Queues a text message to a chat and returns at once.
+
+        Args:
+        - chat_id (int): The chat ID.
+        - text (str): The text of the message.
+        - **kwargs: The other arguments of Bot.send_message.
+
+        Returns:
+        - asyncio.Future: Resolved with the sent message.
+        """
+        return self.send(chat_id, 'send_message', text=text, **kwargs)
+
+    async def join(self) -> None:
+        """
+        Waits until every queued call has been sent.
+
+        Returns:
+        - None
+        """
+        if self._chats:
+            await self._idle.wait()
+
+    async def stop(self) -> None:
+        """
+        Sends the queued calls and stops the background task.
+
+        Returns:
+        - None
+        """
+        if self._task is None:
+            return
+
+        await self.join()
+        self._task.cancel()
+        self._task = None
+
+    def _next_job(self, chat_id: int) -> Job:
+        """
+        Takes the next call of a chat, merging the texts that follow it into one message.
+
+        Args:
+        - chat_id (int): The chat ID.
+
+        Returns:
+        - Job: The call to send.
+        """
+        jobs = self._chats[chat_id]
+        job = jobs.popleft()
+
+        while jobs and job.can_merge(jobs[0], self.max_message_length):
+            job.merge(jobs.popleft())
+            registry.increment('outbox_merged_total')
+
+        return job
+
+    def _prune(self, now: float) -> None:
+        """
+        Forgets the limits of idle chats whose buckets are full again.
+
+        Args:
+        - now (float): The current time.monotonic() time.
+
+        Returns:
+        - None
+        """
+        for chat_id in [chat_id for chat_id, limit in self._chat_limits.items()
+                        if chat_id not in self._chats and limit.is_full(now)]:
+            del self._chat_limits[chat_id]
+
+        for chat_id in [chat_id for chat_id, until in self._paused.items() if until <= now]:
+            del self._paused[chat_id]
+
+    async def _run(self) -> None:
+        """
+        Sends the scheduled calls as soon as the limits allow.
+
+        Returns:
+        - None
+        """
+        while True:
+            now = time.monotonic()
+            timeout = None
+
+            if self._schedule:
+                timeout = max(self._schedule[0][0] - now, 0)
+
+                if timeout == 0 and self._limit:
+                    timeout = self._limit.delay(now)
+
+            if timeout != 0:
+                if timeout is None:
+                    self._prune(now)
+
+                self._wakeup.clear()
+
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+                continue
+
+            (_, _, chat_id) = heapq.heappop(self._schedule)
+
+            if self._limit:
+                self._limit.take(now)
+
+            if limit := self._get_chat_limit(chat_id):
+                limit.take(now)
+
+            delivery = asyncio.create_task(self._deliver(chat_id, self._next_job(chat_id)))
+            self._deliveries.add(delivery)
+            delivery.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, chat_id: int, job: Job) -> None:
+        """
+        Sends a call, then schedules the next call of the chat.
+
+        Args:
+        - chat_id (int): The chat ID.
+        - job (Job): The call.
+
+        Returns:
+        - None
+        """
+        try:
+            result = await getattr(self.bot, job.method)(chat_id=chat_id, **job.kwargs)
+        except RetryAfter as error:
+            retry_after = error.retry_after
+
+            if isinstance(retry_after, timedelta):
+                retry_after = retry_after.total_seconds()
+
+            registry.increment('outbox_retry_after_total')
+            job.attempts += 1
+
+            if job.attempts > self.max_retries:
+                logging.warning(f'Giving up {job.method} to chat {chat_id} after {job.attempts} attempts')
+                self._fail(job, error)
+            else:
+                logging.info(f'Flood limit in chat {chat_id}, retrying in {retry_after}s')
+                self._paused[chat_id] = time.monotonic() + retry_after
+                self._chats[chat_id].appendleft(job)
+        except Exception as error:
+            registry.increment('outbox_errors_total', (('method', job.method),))
+            logging.exception(f'Failed to {job.method} to chat {chat_id}')
+            self._fail(job, error)
+        else:
+            registry.increment('outbox_sent_total', (('method', job.method),))
+            registry.observe('outbox_wait_seconds', time.monotonic() - job.queued)
+
+            for future in job.futures:
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            if self._chats[chat_id]:
+                self._schedule_chat(chat_id)
+            else:
+                del self._chats[chat_id]
+
+                if not self._chats:
+                    self._idle.set()
+
+    @staticmethod
+    def _fail(job: Job, error: Exception) -> None:
+        """
+        Fails the futures of a call.
+
+        Args:
+        - job (Job): The call.
+        - error (Exception): The error of the call.
+
+        Returns:
+        - None
+        """
+        for future in job.futures:
+            if not future.done():
+                future.set_exception(error)
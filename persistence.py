@@ -0,0 +1,216 @@
+import json
+import logging
+import sqlite3
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS user_data (
+    user_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (user_id, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (name, key)
+) WITHOUT ROWID;
+'''
+
+
+class SqlitePersistence(BasePersistence):
+    """
+    Persists the conversation states and user_data in an SQLite database.
+
+    Every user_data key is its own JSON-encoded row, and only the keys
+    changed since the last write are upserted or deleted, so a handler
+    changing one value costs one small row instead of a pickle of everything.
+    Chat data, bot data and callback data are not used by the bot and not stored.
+
+    Methods:
+    - get_user_data(self) -> dict:
+                Loads the user_data of every user.
+    - update_user_data(self, user_id: int, data: dict) -> None:
+                Writes the changed keys of a user's user_data.
+    - get_conversations(self, name: str) -> dict:
+                Loads the states of the open conversations.
+    - update_conversation(self, name: str, key: tuple, new_state) -> None:
+                Writes or removes the state of a conversation.
+    - flush(self) -> None:
+                Closes the database.
+    """
+    def __init__(self, path: str, update_interval: float = 1) -> None:
+        """
+        Initializes a new SqlitePersistence object.
+
+        Args:
+        - path (str): The path to the SQLite database.
+        - update_interval (float, optional): The number of seconds between two writes
+                                    of the changed data. Defaults to 1.
+        """
+        super().__init__(
+            PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval,
+        )
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(SCHEMA)
+        self._user_data = {}
+
+    async def get_user_data(self) -> dict:
+        """
+        Loads the user_data of every user.
+
+        Returns:
+        - dict: The user_data keyed by user ID.
+        """
+        user_data = {}
+
+        for user_id, key, value in self._connection.execute(
+                'SELECT user_id, key, value FROM user_data'
+        ):
+            self._user_data.setdefault(user_id, {})[key] = value
+            user_data.setdefault(user_id, {})[key] = json.loads(value)
+
+        return user_data
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        """
+        Writes the keys of a user's user_data that changed since the last write.
+
+        Args:
+        - user_id (int): The user's ID.
+        - data (dict): The user's user_data.
+
+        Returns:
+        - None
+        """
+        stored = self._user_data.setdefault(user_id, {})
+        changed = []
+
+        for key, value in data.items():
+            try:
+                encoded = json.dumps(value, separators=(',', ':'))
+            except TypeError:
+                logging.warning(f'user_data key {key} of user {user_id} is not serializable')
+                continue
+
+            if stored.get(key) != encoded:
+                stored[key] = encoded
+                changed.append((user_id, key, encoded))
+
+        removed = [(user_id, key) for key in stored.keys() - data.keys()]
+
+        for (_, key) in removed:
+            del stored[key]
+
+        if not changed and not removed:
+            return
+
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO user_data (user_id, key, value) VALUES (?, ?, ?)', changed
+            )
+            self._connection.executemany(
+                'DELETE FROM user_data WHERE user_id = ? AND key = ?', removed
+            )
+
+    async def drop_user_data(self, user_id: int) -> None:
+        """
+        Removes the user_data of a user.
+
+        Args:
+        - user_id (int): The user's ID.
+
+        Returns:
+        - None
+        """
+        self._user_data.pop(user_id, None)
+
+        with self._connection:
+            self._connection.execute('DELETE FROM user_data WHERE user_id = ?', (user_id,))
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def get_conversations(self, name: str) -> dict:
+        """
+        Loads the states of the open conversations.
+
+        Args:
+        - name (str): The name of the conversation handler.
+
+        Returns:
+        - dict: The states keyed by the conversation key.
+        """
+        return {
+            tuple(json.loads(key)): json.loads(state)
+            for key, state in self._connection.execute(
+                'SELECT key, state FROM conversations WHERE name = ?', (name,)
+            )
+        }
+
+    async def update_conversation(self, name: str, key: tuple, new_state) -> None:
+        """
+        Writes the state of a conversation, removing it once the conversation ends.
+
+        Args:
+        - name (str): The name of the conversation handler.
+        - key (tuple): The key of the conversation.
+        - new_state: The new state, None once the conversation ended.
+
+        Returns:
+        - None
+        """
+        encoded_key = json.dumps(key, separators=(',', ':'))
+
+        with self._connection:
+            if new_state is None:
+                self._connection.execute(
+                    'DELETE FROM conversations WHERE name = ? AND key = ?', (name, encoded_key)
+                )
+            else:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)',
+                    (name, encoded_key, json.dumps(new_state))
+                )
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def update_bot_data(self, data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """
+        Closes the database; every change is already committed.
+
+        Returns:
+        - None
+        """
+        self._connection.close()
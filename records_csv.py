@@ -0,0 +1,335 @@
+import csv
+import heapq
+import math
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import islice
+from typing import Iterator, TextIO
+
+from classes import Expense, Income, User
+from constants import (
+    categories,
+    storage,
+    IMPORT_MAX_ROWS,
+)
+
+COLUMN_ALIASES = {
+    'date': ('date', 'transaction date', 'operation date', 'booking date'),
+    'type': ('type', 'kind', 'record type'),
+    'category': ('category',),
+    'title': ('title', 'name', 'description', 'details', 'merchant'),
+    'amount': ('amount', 'sum', 'value', 'price'),
+}
+EXPENSE_TYPES = ('expense', 'expenses', 'debit')
+INCOME_TYPES = ('income', 'incomes', 'credit')
+EXPENSE_CATEGORIES = {category.split()[0].lower(): category.split()[0] for category in categories}
+DEFAULT_CATEGORY = 'Other'
+EXPORT_COLUMNS = ['date', 'type', 'category', 'description', 'amount']
+
+
+def iter_csv_rows(file: TextIO) -> Iterator[tuple]:
+    """
+    Reads a CSV file row by row, mapping its columns to the known names.
+
+    The delimiter is detected from the beginning of the file. Column names
+    are matched case-insensitively against COLUMN_ALIASES.
+
+    Args:
+    - file (TextIO): The CSV file opened in text mode with newline=''.
+
+    Returns:
+    - Iterator[tuple]: The line number and the row keyed by the known column names.
+
+    Raises:
+    - ValueError: If the file has no date or amount column.
+    """
+    sample = file.read(4096)
+    file.seek(0)
+
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.reader(file, dialect)
+    header = [name.strip().lower() for name in next(reader, [])]
+    columns = {}
+
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in header:
+                columns[column] = header.index(alias)
+                break
+
+    if 'date' not in columns or 'amount' not in columns:
+        raise ValueError('the file must have a date and an amount column')
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+
+        yield reader.line_num, {
+            column: row[position].strip() if position < len(row) else ''
+            for column, position in columns.items()
+        }
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value: str) -> int:
+    """
+    Parses a date with the rules of is_valid_date: YYYY-MM-DD and not in the future.
+
+    Statements repeat the same dates on many rows, so parsed dates are cached.
+
+    Args:
+    - value (str): The date as written in the file.
+
+    Returns:
+    - int: The date ordinal.
+
+    Raises:
+    - ValueError: If the date is invalid or in the future.
+    """
+    parsed_date = datetime.strptime(value, '%Y-%m-%d').date()
+
+    if parsed_date > date.today():
+        raise ValueError(f'date "{value}" is in the future')
+
+    return parsed_date.toordinal()
+
+
+def parse_amount(value: str) -> float:
+    """
+    Parses an amount, accepting spaces, commas or dots as thousands separators and a decimal comma.
+
+    With both a comma and a dot the last one is the decimal separator and the other
+    one must group the digits by three, as in "1,234.56" and "1.234,56". A single
+    comma is a decimal comma unless it is followed by exactly three digits: "1,234"
+    may mean either number, so it is rejected rather than guessed.
+
+    Args:
+    - value (str): The amount as written in the file.
+
+    Returns:
+    - float: The amount, negative for a debit in a signed column.
+
+    Raises:
+    - ValueError: If the value is not a finite number or its separators are ambiguous.
+    """
+    value = value.replace(' ', '').replace('\u00a0', '')
+    (commas, dots) = (value.count(','), value.count('.'))
+
+    if commas and dots:
+        (group, decimal) = ('.', ',') if value.rfind(',') > value.rfind('.') else (',', '.')
+    elif commas > 1 or dots > 1:
+        (group, decimal) = (',' if commas else '.', None)
+    elif commas and re.search(r',\d{3}$', value):
+        raise ValueError(f'ambiguous amount "{value}"')
+    else:
+        (group, decimal) = (None, ',' if commas else '.')
+
+    if group is not None:
+        integer_part = value.rpartition(decimal)[0] if decimal else value
+
+        if not re.fullmatch(rf'[-+]?\d{{1,3}}(?:{re.escape(group)}\d{{3}})+', integer_part):
+            raise ValueError(f'ambiguous amount "{value}"')
+
+        value = value.replace(group, '')
+
+    amount = float(value.replace(',', '.'))
+
+    if not math.isfinite(amount):
+        raise ValueError(f'amount "{value}" is not a finite number')
+
+    return amount
+
+
+def parse_csv_row(row: dict) -> tuple:
+    """
+    Validates a CSV row and converts it to a transaction.
+
+    The rules are the ones of the /add_expense and /add_income conversation:
+    the date must be a valid YYYY-MM-DD date not in the future and the amount
+    must be greater than 0. Without a type column negative amounts are
+    expenses and positive ones incomes, like on a bank statement. Expense
+    categories are mapped to the known categories, falling back to 'Other'.
+
+    Args:
+    - row (dict): The row keyed by the known column names.
+
+    Returns:
+    - tuple: The type of the record ('expenses' or 'incomes') and the transaction.
+
+    Raises:
+    - ValueError: If the row is invalid.
+    """
+    try:
+        date_ordinal = parse_date(row['date'])
+    except ValueError:
+        raise ValueError(f'invalid date "{row["date"]}"') from None
+
+    try:
+        amount = parse_amount(row['amount'])
+    except ValueError:
+        raise ValueError(f'invalid amount "{row["amount"]}"') from None
+
+    record_type = row.get('type', '').lower()
+
+    if record_type in EXPENSE_TYPES:
+        record_type = 'expenses'
+    elif record_type in INCOME_TYPES:
+        record_type = 'incomes'
+    elif not record_type:
+        record_type = 'expenses' if amount < 0 else 'incomes'
+        amount = abs(amount)
+    else:
+        raise ValueError(f'unknown type "{row["type"]}"')
+
+    if amount <= 0:
+        raise ValueError('amount should be greater than 0.00')
+
+    category = row.get('category', '')
+
+    if record_type == 'expenses':
+        category = EXPENSE_CATEGORIES.get(category.split()[0].lower() if category else '',
+                                          DEFAULT_CATEGORY)
+        title = row.get('title') or category
+
+        return record_type, Expense(amount, title, category, date_ordinal)
+
+    return record_type, Income(category or DEFAULT_CATEGORY, amount, date_ordinal)
+
+
+def import_csv(user_id: str, file: TextIO, max_rows: int = IMPORT_MAX_ROWS) -> tuple:
+    """
+    Reads and validates the transactions of a CSV file without changing the user's data.
+
+    The whole file is parsed before anything is imported, so a file that
+    cannot be read imports nothing. Invalid rows are skipped and reported.
+    It blocks, so it runs in a worker thread while the user's chat waits;
+    the transactions are added by apply_import on the event loop.
+
+    Args:
+    - user_id (str): The user's ID.
+    - file (TextIO): The CSV file opened in text mode with newline=''.
+    - max_rows (int, optional): The maximum number of rows imported.
+
+    Returns:
+    - tuple: The numbers of imported expenses and incomes and of skipped rows with
+            the first errors, the transactions keyed by record type and their journal entries.
+
+    Raises:
+    - ValueError: If the file has no date or amount column or is not valid UTF-8.
+    - csv.Error: If the file is not a valid CSV file.
+    """
+    summary = {'expenses': 0, 'incomes': 0, 'skipped': 0, 'errors': []}
+    records = {'expenses': [], 'incomes': []}
+    entries = []
+
+    for line_number, row in iter_csv_rows(file):
+        if summary['expenses'] + summary['incomes'] >= max_rows:
+            summary['skipped'] += 1
+            continue
+
+        try:
+            (record_type, record) = parse_csv_row(row)
+        except ValueError as error:
+            summary['skipped'] += 1
+
+            if len(summary['errors']) < 5:
+                summary['errors'].append(f'line {line_number}: {error}')
+
+            continue
+
+        summary[record_type] += 1
+        records[record_type].append(record)
+        entries.append({
+            'op': 'add',
+            'user_id': user_id,
+            'record_type': record_type,
+            'category': record.category,
+            'record': record.to_dict(),
+        })
+
+    return summary, records, entries
+
+
+def apply_import(user: User, records: dict, entries: list) -> None:
+    """
+    Adds the transactions read by import_csv to the user's data and queues their journal entries.
+
+    Called on the event loop, so the handlers reading the user never see
+    a half-imported file. The entries are submitted as one batch, which SQLite
+    commits in one transaction and the journal appends with one write; a batch
+    that fails is retried whole by the storage's writer.
+
+    Args:
+    - user (User): The user.
+    - records (dict): The transactions keyed by record type.
+    - entries (list): The journal entries of the transactions.
+
+    Returns:
+    - None
+    """
+    for record_type, type_records in records.items():
+        user.add_records(record_type, type_records)
+
+    storage.submit_many(entries)
+
+
+def iter_export_rows(user: User, start: int = None, end: int = None) -> Iterator[list]:
+    """
+    Yields the user's expenses and incomes within the date range as CSV rows, ordered by date.
+
+    The rows are read from the date-sorted indexes one at a time,
+    so no list of the records is built.
+
+    Args:
+    - user (User): The user.
+    - start (int, optional): The date ordinal of the first day of the range.
+    - end (int, optional): The date ordinal of the last day of the range.
+
+    Returns:
+    - Iterator[list]: The rows in the EXPORT_COLUMNS order.
+    """
+    def iter_records(record_type: str) -> Iterator[tuple]:
+        index = user.index[record_type]
+        (first, last) = index.bounds(start, end)
+
+        for record in islice(index.records, first, last):
+            yield record.date, record_type, record
+
+    for _, record_type, record in heapq.merge(
+            iter_records('expenses'), iter_records('incomes'), key=lambda item: item[0]
+    ):
+        if record_type == 'expenses':
+            yield [record.date_string, 'expense', record.category, record.title, record.amount]
+        else:
+            yield [record.date_string, 'income', record.category, '', record.amount]
+
+
+def export_csv(user: User, file: TextIO, start: int = None, end: int = None) -> int:
+    """
+    Writes the user's expenses and incomes within the date range to a CSV file.
+
+    The rows are written one at a time, in the format /import reads.
+
+    Args:
+    - user (User): The user.
+    - file (TextIO): The file opened in text mode with newline=''.
+    - start (int, optional): The date ordinal of the first day of the range.
+    - end (int, optional): The date ordinal of the last day of the range.
+
+    Returns:
+    - int: The number of exported records.
+    """
+    writer = csv.writer(file)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+
+    for row in iter_export_rows(user, start, end):
+        writer.writerow(row)
+        count += 1
+
+    return count
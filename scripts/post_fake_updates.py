@@ -0,0 +1,76 @@
+import argparse
+import json
+import time
+import urllib.request
+
+
+def make_update(update_id: int, user_id: int, text: str) -> dict:
+    """
+    Builds a fake Telegram update with a text message.
+
+    Args:
+    - update_id (int): The ID of the update.
+    - user_id (int): The ID of the user and of their private chat.
+    - text (str): The text of the message.
+
+    Returns:
+    - dict: The update in the Bot API format.
+    """
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private', 'first_name': f'User {user_id}'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'User {user_id}'},
+            'text': text,
+            'entities': (
+                [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+                if text.startswith('/') else []
+            ),
+        },
+    }
+
+
+def post_update(url: str, update: dict, secret_token: str = None) -> int:
+    """
+    Posts an update to the webhook like Telegram does.
+
+    Args:
+    - url (str): The URL of the webhook.
+    - update (dict): The update.
+    - secret_token (str, optional): The secret token of the webhook.
+
+    Returns:
+    - int: The HTTP status of the response.
+    """
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(update).encode(),
+        headers={'Content-Type': 'application/json'},
+    )
+
+    if secret_token:
+        request.add_header('X-Telegram-Bot-Api-Secret-Token', secret_token)
+
+    with urllib.request.urlopen(request) as response:
+        return response.status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Post fake updates to a locally running webhook.')
+    parser.add_argument('--url', default='http://127.0.0.1:8443/')
+    parser.add_argument('--secret-token')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--texts', nargs='+', default=['/start', '/list', '/help'])
+    args = parser.parse_args()
+
+    update_id = 1
+    started = time.perf_counter()
+
+    for text in args.texts:
+        for user_id in range(1, args.users + 1):
+            post_update(args.url, make_update(update_id, user_id, text), args.secret_token)
+            update_id += 1
+
+    print(f'Posted {update_id - 1} updates in {time.perf_counter() - started:.3f}s')
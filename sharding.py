@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+from typing import Callable
+
+from telegram import Update
+from telegram.ext import (
+    Application,
+    ApplicationBuilder,
+    ApplicationHandlerStop,
+    CallbackContext,
+    TypeHandler,
+)
+
+from commands.build_chart import shutdown_chart_pool
+from instrumentation import start_http_server, start_log_dump
+from constants import (
+    storage,
+    TOKEN_BOT,
+    METRICS_LOG_INTERVAL,
+    SHARD_QUEUE_SIZE,
+)
+
+
+def get_shard(update: Update, shards: int) -> int:
+    """
+    Returns the shard serving an update.
+
+    Updates are routed by the ID of their user, so all the updates of a user,
+    and therefore the user's data and conversations, stay on one shard.
+
+    Args:
+    - update (Update): The update.
+    - shards (int): The number of shards.
+
+    Returns:
+    - int: The index of the shard, 0 for updates without a user or a chat.
+    """
+    if update.effective_user is not None:
+        return update.effective_user.id % shards
+
+    if update.effective_chat is not None:
+        return update.effective_chat.id % shards
+
+    return 0
+
+
+async def serve_shard(app: Application, updates: multiprocessing.Queue) -> None:
+    """
+    Feeds the updates received from the dispatcher to a shard's application.
+
+    The application's post_init and post_stop hooks are called here the way
+    run_polling and run_webhook call them, so the send queue is bound to the
+    shard's bot and the queued replies are sent before the shard stops.
+
+    Args:
+    - app (Application): The shard's application, built without an updater.
+    - updates (multiprocessing.Queue): The updates as dicts, None to stop.
+
+    Returns:
+    - None
+    """
+    async with app:
+        if app.post_init:
+            await app.post_init(app)
+
+        await app.start()
+
+        try:
+            while (data := await asyncio.to_thread(updates.get)) is not None:
+                await app.update_queue.put(Update.de_json(data, app.bot))
+        finally:
+            await app.stop()
+
+            if app.post_stop:
+                await app.post_stop(app)
+
+
+def run_shard(
+        build_application: Callable[..., Application],
+        shard: int,
+        updates: multiprocessing.Queue,
+        metrics_port: int = None,
+) -> None:
+    """
+    Runs a shard worker process until the dispatcher stops it.
+
+    The worker ignores SIGINT, so on Ctrl+C it keeps processing the updates
+    already dispatched to it and stops once the dispatcher says so.
+
+    Args:
+    - build_application (Callable[..., Application]): The function building the application.
+    - shard (int): The index of the shard.
+    - updates (multiprocessing.Queue): The updates as dicts, None to stop.
+    - metrics_port (int, optional): The port of the shard's metrics endpoint. Disabled if not set.
+
+    Returns:
+    - None
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.info(f'Shard {shard} started')
+
+    if metrics_port:
+        start_http_server(metrics_port)
+
+    if METRICS_LOG_INTERVAL:
+        start_log_dump(METRICS_LOG_INTERVAL)
+
+    storage.start()
+
+    try:
+        asyncio.run(serve_shard(build_application(updater=False, shard=shard), updates))
+    finally:
+        shutdown_chart_pool()
+        storage.close()
+        logging.info(f'Shard {shard} stopped, data was saved')
+
+
+def run_dispatcher(
+        build_application: Callable[..., Application],
+        shards: int,
+        metrics_port: int = None,
+        webhook_url: str = None,
+        listen: str = '0.0.0.0',
+        port: int = 8443,
+        url_path: str = '',
+        secret_token: str = None,
+) -> None:
+    """
+    Starts the shard workers and dispatches the updates to them by user.
+
+    The dispatcher fetches updates by polling or through a webhook and forwards
+    each one to the queue of its shard. Updates are forwarded one at a time in
+    the order they came and every worker keeps the order of each chat, so the
+    updates of a user are processed in order. Forwarding waits in a thread while
+    a shard is SHARD_QUEUE_SIZE updates behind, so the event loop keeps receiving
+    updates in the meantime. The workers share the storage,
+    each of them reading and writing only the users of its shard. Each worker
+    keeps the conversation states and user_data of its users in its own
+    persistence file, so the workers never overwrite each other's states;
+    changing the number of shards moves users to files without their states.
+
+    Args:
+    - build_application (Callable[..., Application]): The function building a shard's application.
+    - shards (int): The number of shard worker processes.
+    - metrics_port (int, optional): The port of the first shard's metrics endpoint,
+                                the other shards use the following ports. Disabled if not set.
+    - webhook_url (str, optional): The public URL of the webhook. Polling is used if not set.
+    - listen (str, optional): The address the webhook server listens on. Defaults to '0.0.0.0'.
+    - port (int, optional): The port the webhook server listens on. Defaults to 8443.
+    - url_path (str, optional): The path the webhook server accepts updates on. Defaults to ''.
+    - secret_token (str, optional): The secret token Telegram sends with every webhook request.
+
+    Returns:
+    - None
+    """
+    spawn = multiprocessing.get_context('spawn')
+    queues = [spawn.Queue(SHARD_QUEUE_SIZE) for _ in range(shards)]
+    workers = [
+        spawn.Process(
+            target=run_shard,
+            args=(build_application, shard, queues[shard], metrics_port and metrics_port + shard),
+            name=f'shard-{shard}',
+        )
+        for shard in range(shards)
+    ]
+
+    for worker in workers:
+        worker.start()
+
+    async def dispatch(update: Update, context: CallbackContext) -> None:
+        await asyncio.to_thread(queues[get_shard(update, shards)].put, update.to_dict())
+        raise ApplicationHandlerStop
+
+    app = ApplicationBuilder().token(TOKEN_BOT).build()
+    app.add_handler(TypeHandler(Update, dispatch))
+    logging.info(f'Dispatching updates to {shards} shards')
+
+    try:
+        if webhook_url:
+            app.run_webhook(
+                listen=listen,
+                port=port,
+                url_path=url_path,
+                webhook_url=webhook_url,
+                secret_token=secret_token,
+            )
+        else:
+            app.run_polling()
+    finally:
+        for updates in queues:
+            updates.put(None)
+
+        for worker in workers:
+            worker.join()
+
+        logging.info('Shards stopped')
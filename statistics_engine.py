@@ -0,0 +1,284 @@
+import weakref
+from itertools import islice
+from operator import attrgetter
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the statistics fall back to the storage queries
+    np = None
+
+from classes import User
+
+
+class RecordColumns:
+    """
+    Columnar copy of one type of a user's transactions, sorted by date.
+
+    Attributes:
+    - version (int): The version of the user's transactions the columns are up to date with.
+    - dates (np.ndarray): The date ordinals of the transactions.
+    - amounts (np.ndarray): The amounts of the transactions.
+    - codes (np.ndarray): The position of each transaction's category in categories.
+    - categories (list): The categories the transactions had since the columns were built.
+    - category_codes (dict): The positions in categories keyed by category.
+
+    Methods:
+    - update(self, user: User, record_type: str) -> bool:
+                Applies the changes to the user's transactions since the columns' version.
+    - slice(self, start: int = None, end: int = None) -> slice:
+                Finds the positions of the transactions within the date range.
+    """
+    __slots__ = ('version', 'dates', 'amounts', 'codes', 'categories', 'category_codes')
+
+    def __init__(self, user: User, record_type: str) -> None:
+        """
+        Builds the columns from the date-sorted index of the user.
+
+        Args:
+        - user (User): The user.
+        - record_type (str): The type of the transactions ('expenses' or 'incomes').
+        """
+        index = user.index[record_type]
+        self.category_codes = {
+            category: code for code, category in enumerate(getattr(user, record_type))
+        }
+        count = len(index)
+
+        self.version = user.versions[record_type]
+        self.dates = np.array(index.ordinals, dtype=np.int64)
+        self.amounts = np.fromiter((record.amount for record in index.records), np.float64, count)
+        self.codes = np.fromiter(
+            (self.category_codes[record.category] for record in index.records), np.int64, count
+        )
+        self.categories = list(self.category_codes)
+
+    def update(self, user: User, record_type: str) -> bool:
+        """
+        Applies the changes to the user's transactions made since the columns' version.
+
+        The changes are read from the user's change log. Deleted transactions
+        are removed and added ones inserted at their dates with one NumPy call
+        per column, so only the changed transactions are touched in Python.
+
+        Args:
+        - user (User): The user.
+        - record_type (str): The type of the transactions ('expenses' or 'incomes').
+
+        Returns:
+        - bool: False if the change log no longer reaches back to the columns' version
+                or a deleted transaction has no row, and the columns have to be rebuilt.
+        """
+        missed = user.versions[record_type] - self.version
+        changes = user.changes[record_type]
+
+        if missed > len(changes):
+            return False
+
+        added = {}
+        deleted = []
+
+        for record, is_added in islice(changes, len(changes) - missed, None):
+            if is_added:
+                added[id(record)] = record
+            elif added.pop(id(record), None) is None:
+                deleted.append(record)
+
+        if deleted:
+            positions = self._find(deleted)
+
+            if positions is None:
+                return False
+
+            self.dates = np.delete(self.dates, positions)
+            self.amounts = np.delete(self.amounts, positions)
+            self.codes = np.delete(self.codes, positions)
+
+        if added:
+            records = sorted(added.values(), key=attrgetter('date'))
+            dates = np.fromiter((record.date for record in records), np.int64, len(records))
+            positions = np.searchsorted(self.dates, dates, 'right')
+            self.dates = np.insert(self.dates, positions, dates)
+            self.amounts = np.insert(
+                self.amounts, positions, [record.amount for record in records]
+            )
+            self.codes = np.insert(
+                self.codes, positions, [self._code(record.category) for record in records]
+            )
+
+        self.version = user.versions[record_type]
+
+        return True
+
+    def _find(self, records: list) -> list | None:
+        """
+        Finds a distinct row with the date, amount and category of each transaction.
+
+        Rows with the same values are interchangeable in every sum,
+        so any of them stands for the transaction.
+
+        Args:
+        - records (list): The transactions.
+
+        Returns:
+        - list | None: The positions of the rows, None if a transaction has no row left.
+        """
+        positions = set()
+
+        for record in records:
+            low = int(np.searchsorted(self.dates, record.date, 'left'))
+            high = int(np.searchsorted(self.dates, record.date, 'right'))
+            matches = np.flatnonzero(
+                (self.amounts[low:high] == record.amount)
+                & (self.codes[low:high] == self.category_codes.get(record.category, -1))
+            )
+            position = next(
+                (low + int(match) for match in matches if low + int(match) not in positions), None
+            )
+
+            if position is None:
+                return None
+
+            positions.add(position)
+
+        return sorted(positions)
+
+    def _code(self, category: str) -> int:
+        """
+        Returns the position of a category in categories, adding it if it is new.
+
+        Args:
+        - category (str): The category.
+
+        Returns:
+        - int: The position of the category.
+        """
+        code = self.category_codes.get(category)
+
+        if code is None:
+            code = self.category_codes[category] = len(self.categories)
+            self.categories.append(category)
+
+        return code
+
+    def slice(self, start: int = None, end: int = None) -> slice:
+        """
+        Finds the positions of the transactions within the date range.
+
+        Args:
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+
+        Returns:
+        - slice: The positions of the transactions within the range.
+        """
+        low = 0 if start is None else int(np.searchsorted(self.dates, start, 'left'))
+        high = len(self.dates) if end is None else int(np.searchsorted(self.dates, end, 'right'))
+
+        return slice(low, max(low, high))
+
+
+class StatisticsEngine:
+    """
+    Computes range sums and per-category sums over NumPy columns of the users' transactions.
+
+    The columns of a user are built on first use and updated with the changes
+    to the user's transactions since, rebuilt only when the user's change log
+    no longer covers them; they are dropped together with the User object.
+
+    Methods:
+    - get_columns(self, user: User, record_type: str) -> RecordColumns:
+                Returns the up-to-date columns of the user's transactions.
+    - get_total_amount(self, user: User, record_type: str, start=None, end=None) -> float:
+                Calculates the total amount within the date range.
+    - get_amounts_by_category(self, user: User, record_type: str, start=None, end=None) -> dict:
+                Calculates the total amounts by category within the date range.
+    """
+    def __init__(self) -> None:
+        """
+        Initializes a new StatisticsEngine object.
+        """
+        self._columns = weakref.WeakKeyDictionary()
+
+    def get_columns(self, user: User, record_type: str) -> RecordColumns:
+        """
+        Returns the up-to-date columns of the user's transactions.
+
+        Args:
+        - user (User): The user.
+        - record_type (str): The type of the transactions ('expenses' or 'incomes').
+
+        Returns:
+        - RecordColumns: The columns.
+        """
+        user_columns = self._columns.setdefault(user, {})
+        columns = user_columns.get(record_type)
+
+        if columns is None or not columns.update(user, record_type):
+            columns = user_columns[record_type] = RecordColumns(user, record_type)
+
+        return columns
+
+    def get_total_amount(
+            self,
+            user: User,
+            record_type: str,
+            start: int = None,
+            end: int = None,
+    ) -> float:
+        """
+        Calculates the total amount of the user's transactions within the date range.
+
+        Args:
+        - user (User): The user.
+        - record_type (str): The type of the transactions ('expenses' or 'incomes').
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+
+        Returns:
+        - float: The total amount.
+        """
+        columns = self.get_columns(user, record_type)
+
+        return float(columns.amounts[columns.slice(start, end)].sum())
+
+    def get_amounts_by_category(
+            self,
+            user: User,
+            record_type: str,
+            start: int = None,
+            end: int = None,
+    ) -> dict:
+        """
+        Calculates the total amounts of the user's transactions by category within the date range.
+
+        Every category of the user is present, in the user's order, with 0 if it has
+        no transactions within the range.
+
+        Args:
+        - user (User): The user.
+        - record_type (str): The type of the transactions ('expenses' or 'incomes').
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+
+        Returns:
+        - dict: The total amounts keyed by category.
+        """
+        columns = self.get_columns(user, record_type)
+        positions = columns.slice(start, end)
+        sums = np.bincount(
+            columns.codes[positions],
+            weights=columns.amounts[positions],
+            minlength=len(columns.categories),
+        )
+        categories = getattr(user, record_type)
+        amounts = dict.fromkeys(categories, 0)
+        amounts.update(
+            (category, amount)
+            for category, amount in zip(columns.categories, sums.tolist())
+            if category in categories
+        )
+
+        return amounts
+
+
+engine = StatisticsEngine() if np is not None else None
@@ -0,0 +1,5 @@
+from .base import Storage
+from .journal import JournalStorage
+from .sqlite import SqliteStorage
+
+__all__ = ['Storage', 'JournalStorage', 'SqliteStorage']
@@ -0,0 +1,379 @@
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from itertools import islice
+
+from classes import Expense, Income, User
+from .repository import UserRepository
+from .worker import PersistenceWorker
+
+
+def apply_to_user(user: User | None, entry: dict) -> User | None:
+    """
+    Applies a journal entry to a loaded user.
+
+    Applying the entries in order on top of data that already contains some
+    of them gives the same user, so they can be applied to data read while
+    they were being written.
+
+    Args:
+    - user (User | None): The user, None if the user is unknown.
+    - entry (dict): The journal entry.
+
+    Returns:
+    - User | None: The user with the entry applied.
+    """
+    match entry['op']:
+        case 'user':
+            return user or User(entry['name'])
+        case 'add' if entry['record']['id'] not in user.records_by_id[entry['record_type']]:
+            record_class = Expense if entry['record_type'] == 'expenses' else Income
+            user.add_records(entry['record_type'], [record_class.from_dict(entry['record'])])
+        case 'delete':
+            user.delete_records(entry['record_type'], entry['ids'])
+        case 'budget':
+            user.set_budget(entry['category'], entry['limit'])
+
+    return user
+
+
+class Storage(ABC):
+    """
+    Abstract base class for the storage backends of the users data.
+
+    Users are loaded one at a time into a bounded UserRepository on first access
+    and kept there as User objects; records are converted from and to
+    the data.json layout only when they are loaded and written.
+    Changes are submitted as journal entries and written by a PersistenceWorker.
+    The entries of a user still queued for writing are kept, so a user loaded
+    meanwhile gets them applied on top of the data read, without waiting for the writer.
+    The query methods work on the loaded users, using their date-sorted indexes
+    and running totals; backends able to answer them natively override them.
+
+    Journal entries:
+    - {'op': 'user', 'user_id', 'name'}: a new user.
+    - {'op': 'add', 'user_id', 'record_type', 'category', 'record'}: a new record.
+    - {'op': 'delete', 'user_id', 'record_type', 'ids'}: deleted records.
+    - {'op': 'budget', 'user_id', 'category', 'limit'}: a set or, with limit None, removed budget.
+    """
+    def __init__(
+            self,
+            flush_interval: float = 0.5,
+            cache_size: int = 1000,
+            idle_timeout: float = 3600,
+    ) -> None:
+        """
+        Initializes the storage.
+
+        Args:
+        - flush_interval (float, optional): The number of seconds submitted entries
+                                    are coalesced for. Defaults to 0.5.
+        - cache_size (int, optional): The maximum number of users kept in memory.
+                                    Defaults to 1000.
+        - idle_timeout (float, optional): The number of seconds after which
+                                    an idle user is evicted from memory. Defaults to 3600.
+        """
+        self.users = UserRepository(self._load_user, self.write_back, cache_size, idle_timeout)
+        self._worker = PersistenceWorker(self._write_entries, flush_interval)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+    @abstractmethod
+    def load_user(self, user_id: str) -> User | None:
+        """
+        Loads the data of one user.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - User | None: The user, None if the user is unknown.
+        """
+
+    @abstractmethod
+    def write(self, entries: list) -> None:
+        """
+        Writes a batch of journal entries.
+
+        A backend that fails after writing some of the entries removes those
+        from the list before it raises, so only the rest is written again.
+
+        Args:
+        - entries (list): The journal entries.
+
+        Returns:
+        - None
+        """
+
+    def write_back(self, user_id: str) -> None:
+        """
+        Saves a user evicted from memory with changes since the last write-back.
+
+        Every change is already written as a journal entry, so backends only
+        override it to fold those entries into a more compact form.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - None
+        """
+
+    def _load_user(self, user_id: str) -> User | None:
+        """
+        Loads the written data of one user and applies their entries still queued for writing.
+
+        The queued entries are taken before the data is read, so an entry
+        written meanwhile is both read and applied, which apply_to_user allows.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - User | None: The user, None if the user is unknown.
+        """
+        with self._pending_lock:
+            pending = list(self._pending.get(user_id, ()))
+
+        user = self.load_user(user_id)
+
+        for entry in pending:
+            user = apply_to_user(user, entry)
+
+        return user
+
+    def has_pending(self, user_id: str) -> bool:
+        """
+        Checks if some entries of the user are still queued for writing.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - bool: True if some entries of the user are not written yet.
+        """
+        return user_id in self._pending
+
+    def _add_pending(self, entries: list) -> None:
+        """
+        Keeps entries until they are written.
+
+        Args:
+        - entries (list): The journal entries.
+
+        Returns:
+        - None
+        """
+        with self._pending_lock:
+            for entry in entries:
+                self.users.mark_dirty(entry['user_id'])
+                self._pending.setdefault(entry['user_id'], deque()).append(entry)
+
+    def _write_entries(self, entries: list) -> None:
+        """
+        Writes a batch of journal entries and forgets the written ones.
+
+        Args:
+        - entries (list): The journal entries.
+
+        Returns:
+        - None
+        """
+        written = list(entries)
+        remaining = set()
+
+        try:
+            self.write(entries)
+        except Exception:
+            remaining = {id(entry) for entry in entries}
+            raise
+        finally:
+            with self._pending_lock:
+                for entry in written:
+                    if id(entry) in remaining or entry['user_id'] not in self._pending:
+                        continue
+
+                    pending = self._pending[entry['user_id']]
+
+                    if pending and pending[0] is entry:
+                        pending.popleft()
+
+                    if not pending:
+                        del self._pending[entry['user_id']]
+
+    def start(self) -> None:
+        """
+        Starts writing submitted entries in the background.
+
+        Returns:
+        - None
+        """
+        self._worker.start()
+
+    def submit(self, entry: dict) -> None:
+        """
+        Queues a journal entry and returns immediately.
+
+        Args:
+        - entry (dict): The journal entry.
+
+        Returns:
+        - None
+        """
+        self._add_pending([entry])
+        self._worker.submit(entry)
+
+    def submit_many(self, entries: list) -> None:
+        """
+        Queues journal entries to be written together in one batch and returns immediately.
+
+        Args:
+        - entries (list): The journal entries.
+
+        Returns:
+        - None
+        """
+        self._add_pending(entries)
+        self._worker.submit_many(entries)
+
+    def flush(self) -> None:
+        """
+        Writes every queued entry.
+
+        Returns:
+        - None
+        """
+        self._worker.flush()
+
+    def close(self) -> None:
+        """
+        Writes every queued entry and stops the background writer.
+
+        Returns:
+        - None
+        """
+        self._worker.stop()
+
+    def get_records(
+            self,
+            user_id: str,
+            record_type: str,
+            start: int = None,
+            end: int = None,
+            category: str = None,
+            offset: int = 0,
+            limit: int = None,
+    ) -> list:
+        """
+        Returns the records of the user within the specified date range.
+
+        Only the records from offset to offset + limit are returned; without
+        a category they are sliced from the date-sorted index directly.
+
+        Args:
+        - user_id (str): The user's ID.
+        - record_type (str): The type of records ('expenses' or 'incomes').
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+        - category (str, optional): The category of the records.
+        - offset (int, optional): The number of records skipped. Defaults to 0.
+        - limit (int, optional): The maximum number of records returned. Defaults to all of them.
+
+        Returns:
+        - list: The transactions.
+        """
+        user = self.users[user_id]
+        stop = None if limit is None else offset + limit
+
+        if category and start is None and end is None:
+            return list(islice(getattr(user, record_type).get(category, {}).values(), offset, stop))
+
+        index = user.index[record_type]
+        (first, last) = index.bounds(start, end)
+
+        if category:
+            records = (record for record in islice(index.records, first, last)
+                       if record.category == category)
+
+            return list(islice(records, offset, stop))
+
+        return index.records[first + offset:last if stop is None else min(last, first + stop)]
+
+    def count_records(
+            self,
+            user_id: str,
+            record_type: str,
+            start: int = None,
+            end: int = None,
+            category: str = None,
+    ) -> int:
+        """
+        Counts the records of the user within the specified date range.
+
+        Without a category the count is the distance between the range's bounds
+        in the date-sorted index.
+
+        Args:
+        - user_id (str): The user's ID.
+        - record_type (str): The type of records ('expenses' or 'incomes').
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+        - category (str, optional): The category of the records.
+
+        Returns:
+        - int: The number of records.
+        """
+        user = self.users[user_id]
+
+        if category and start is None and end is None:
+            return len(getattr(user, record_type).get(category, {}))
+
+        index = user.index[record_type]
+        (first, last) = index.bounds(start, end)
+
+        if category:
+            return sum(record.category == category for record in islice(index.records, first, last))
+
+        return last - first
+
+    def get_total_amount(
+            self,
+            user_id: str,
+            record_type: str,
+            start: int = None,
+            end: int = None,
+    ) -> float:
+        """
+        Calculates the total amount of the user's records within the specified date range.
+
+        Args:
+        - user_id (str): The user's ID.
+        - record_type (str): The type of records ('expenses' or 'incomes').
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+
+        Returns:
+        - float: The total amount.
+        """
+        return sum(self.get_amounts_by_category(user_id, record_type, start, end).values())
+
+    def get_amounts_by_category(
+            self,
+            user_id: str,
+            record_type: str,
+            start: int = None,
+            end: int = None,
+    ) -> dict:
+        """
+        Calculates the total amounts of the user's records by category within the date range.
+
+        Args:
+        - user_id (str): The user's ID.
+        - record_type (str): The type of records ('expenses' or 'incomes').
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+
+        Returns:
+        - dict: The total amounts keyed by category.
+        """
+        return self.users[user_id].get_amounts_by_category(record_type, start, end)
@@ -0,0 +1,417 @@
+import json
+import os
+import threading
+
+from classes import User
+from .base import Storage
+
+USER_LOCKS = 64  # locks the users' files are spread over
+
+
+def apply_entry(users: dict, entry: dict) -> None:
+    """
+    Applies a single journal entry to the users data.
+
+    Args:
+    - users (dict): The users data in the data.json layout.
+    - entry (dict): The journal entry to apply.
+
+    Returns:
+    - None
+    """
+    user_id = entry['user_id']
+
+    match entry['op']:
+        case 'user':
+            users[user_id] = {'name': entry['name'], 'expenses': {}, 'incomes': {}}
+        case 'add':
+            records = users[user_id][entry['record_type']]
+            records.setdefault(entry['category'], []).append(entry['record'])
+        case 'delete':
+            records = users[user_id][entry['record_type']]
+            record_ids = set(entry['ids'])
+
+            for category in list(records):
+                records[category] = [
+                    record for record in records[category] if record.get('id') not in record_ids
+                ]
+
+                if not records[category]:
+                    del records[category]
+        case 'budget':
+            budgets = users[user_id].setdefault('budgets', {})
+
+            if entry['limit'] is None:
+                budgets.pop(entry['category'], None)
+            else:
+                budgets[entry['category']] = entry['limit']
+
+            if not budgets:
+                del users[user_id]['budgets']
+
+
+def assign_legacy_ids(user: dict) -> None:
+    """
+    Gives IDs to the records saved before records had IDs.
+
+    The IDs depend only on the position of the record in the snapshot,
+    so they are the same every time the snapshot is read, until a fold
+    writes them into the snapshot.
+
+    Args:
+    - user (dict): The user's data in the data.json layout.
+
+    Returns:
+    - None
+    """
+    for record_type in ('expenses', 'incomes'):
+        position = 0
+
+        for records in user[record_type].values():
+            for record in records:
+                if 'id' not in record:
+                    record['id'] = f'{record_type[0]}{position}'
+
+                position += 1
+
+
+def replay(users: dict, path: str) -> int:
+    """
+    Replays every entry of a journal file on top of the users data.
+
+    A torn last line (left by a crash in the middle of an append) is skipped.
+
+    Args:
+    - users (dict): The users data in the data.json layout.
+    - path (str): The path to the journal file.
+
+    Returns:
+    - int: The number of applied entries.
+    """
+    if not os.path.exists(path):
+        return 0
+
+    applied = 0
+
+    with open(path, 'r') as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+
+            apply_entry(users, entry)
+            applied += 1
+
+    return applied
+
+
+def load_legacy(snapshot_path: str, journal_path: str) -> dict:
+    """
+    Loads the users data from a single data.json snapshot and its journal.
+
+    The snapshot records get their legacy IDs before the journal is replayed,
+    so deletes journalled by ID find them.
+
+    Args:
+    - snapshot_path (str): The path to the data.json snapshot.
+    - journal_path (str): The path to the journal file.
+
+    Returns:
+    - dict: The users data.
+    """
+    users = {}
+
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path, 'r') as file:
+            users = json.load(file)
+
+    for user in users.values():
+        assign_legacy_ids(user)
+
+    replay(users, journal_path + '.compacting')
+    replay(users, journal_path)
+
+    return users
+
+
+class JournalStorage(Storage):
+    """
+    Journaled storage for the users data, sharded into one snapshot and journal per user.
+
+    Every change is appended as one compact JSON line to the user's journal,
+    so the write cost of a transaction does not depend on the amount of stored data.
+    Entries are written by a PersistenceWorker, so handlers never wait for the disk.
+    A journal is folded into the user's snapshot once it grows past the threshold
+    or the user is evicted from memory with unsaved changes. A user's files are
+    read and changed under the user's lock, so a user is never read in the middle
+    of a fold.
+
+    Files in data_dir:
+    - <user_id>.json: the user's snapshot in the data.json layout.
+    - <user_id>.journal: the user's journal.
+    - <user_id>.json.tmp: the new snapshot, committed once the journal is removed.
+
+    Methods:
+    - load_user(self, user_id: str) -> User | None:
+                Loads the user's snapshot and replays their journal on top of it.
+    - write(self, entries: list) -> None:
+                Appends a batch of entries to the users' journals.
+    - write_back(self, user_id: str) -> None:
+                Queues folding the user's journal into their snapshot.
+    - import_legacy(self, snapshot_path: str, journal_path: str) -> None:
+                Splits a single data.json snapshot into per-user shards.
+    """
+    def __init__(
+            self,
+            data_dir: str,
+            compact_threshold: int = 1000,
+            flush_interval: float = 0.5,
+            cache_size: int = 1000,
+            idle_timeout: float = 3600,
+    ) -> None:
+        """
+        Initializes a new JournalStorage object.
+
+        Args:
+        - data_dir (str): The path to the directory with the users' shards.
+        - compact_threshold (int, optional): The number of journal entries
+                                    that triggers folding a user's journal. Defaults to 1000.
+                                    A journal is only folded once it also holds as many
+                                    entries as the snapshot has records, so bulk writes
+                                    to a large user cost amortized linear time.
+        - flush_interval (float, optional): The number of seconds submitted entries
+                                    are coalesced for. Defaults to 0.5.
+        - cache_size (int, optional): The maximum number of users kept in memory.
+                                    Defaults to 1000.
+        - idle_timeout (float, optional): The number of seconds after which
+                                    an idle user is evicted from memory. Defaults to 3600.
+        """
+        super().__init__(flush_interval, cache_size, idle_timeout)
+        self.data_dir = data_dir
+        self.compact_threshold = compact_threshold
+        self.entries = {}
+        self.snapshot_records = {}
+        self._locks = [threading.RLock() for _ in range(USER_LOCKS)]
+
+    def _lock(self, user_id: str) -> threading.RLock:
+        """
+        Returns the lock guarding the user's files.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - threading.RLock: The lock.
+        """
+        return self._locks[hash(user_id) % USER_LOCKS]
+
+    def _path(self, user_id: str, extension: str) -> str:
+        """
+        Builds the path to one of the user's files.
+
+        Args:
+        - user_id (str): The user's ID.
+        - extension (str): The file extension.
+
+        Returns:
+        - str: The path to the file.
+        """
+        return os.path.join(self.data_dir, f'{user_id}{extension}')
+
+    def _read_user(self, user_id: str) -> dict:
+        """
+        Reads the user's snapshot and replays their journal on top of it.
+
+        Finishes or rolls back a fold interrupted by a crash:
+        a new snapshot is committed only once the journal has been removed.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - dict: The users data containing only this user, empty if the user is unknown.
+        """
+        snapshot_path = self._path(user_id, '.json')
+        journal_path = self._path(user_id, '.journal')
+        tmp_path = self._path(user_id, '.json.tmp')
+
+        with self._lock(user_id):
+            if os.path.exists(journal_path):
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            elif os.path.exists(tmp_path):
+                os.replace(tmp_path, snapshot_path)
+
+            users = {}
+
+            if os.path.exists(snapshot_path):
+                with open(snapshot_path, 'r') as file:
+                    users[user_id] = json.load(file)
+
+                assign_legacy_ids(users[user_id])
+
+            self.entries[user_id] = replay(users, journal_path)
+
+        return users
+
+    def load_user(self, user_id: str) -> User | None:
+        """
+        Loads the user's snapshot and replays their journal on top of it.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - User | None: The user, None if the user is unknown.
+        """
+        data = self._read_user(user_id).get(user_id)
+
+        return None if data is None else User.from_dict(data)
+
+    def write(self, entries: list) -> None:
+        """
+        Appends a batch of entries to the users' journals, syncing each journal once.
+
+        When a journal cannot be written, the entries already written are removed
+        from the list before the error is raised, so a retry does not repeat them.
+
+        Args:
+        - entries (list): The journal entries.
+
+        Returns:
+        - None
+        """
+        batches = {}
+        written = set()
+
+        for entry in entries:
+            batches.setdefault(entry['user_id'], []).append(entry)
+
+        try:
+            for user_id, user_entries in batches.items():
+                unwritten = []
+
+                for entry in user_entries:
+                    if entry['op'] == 'compact':
+                        self._append(user_id, unwritten)
+                        written.update(map(id, unwritten))
+                        unwritten = []
+                        self._fold(user_id)
+                        written.add(id(entry))
+                    else:
+                        unwritten.append(entry)
+
+                self._append(user_id, unwritten)
+                written.update(map(id, unwritten))
+
+                threshold = max(self.compact_threshold, self.snapshot_records.get(user_id, 0))
+
+                if self.entries.get(user_id, 0) >= threshold:
+                    self._fold(user_id)
+        finally:
+            entries[:] = [entry for entry in entries if id(entry) not in written]
+
+    def _append(self, user_id: str, entries: list) -> None:
+        """
+        Appends entries to the user's journal and syncs it to disk.
+
+        A failed append is cut off the journal, so it never leaves a partial line.
+
+        Args:
+        - user_id (str): The user's ID.
+        - entries (list): The journal entries.
+
+        Returns:
+        - None
+        """
+        if not entries:
+            return
+
+        os.makedirs(self.data_dir, exist_ok=True)
+        lines = ''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries)
+
+        with self._lock(user_id), open(self._path(user_id, '.journal'), 'a') as file:
+            size = file.tell()
+
+            try:
+                file.write(lines)
+                file.flush()
+                os.fsync(file.fileno())
+            except OSError:
+                file.truncate(size)
+                raise
+
+            self.entries[user_id] = self.entries.get(user_id, 0) + len(entries)
+
+    def _fold(self, user_id: str) -> None:
+        """
+        Folds the user's journal into a new snapshot.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - None
+        """
+        journal_path = self._path(user_id, '.journal')
+        tmp_path = self._path(user_id, '.json.tmp')
+
+        with self._lock(user_id):
+            if not os.path.exists(journal_path):
+                return
+
+            users = self._read_user(user_id)
+
+            with open(tmp_path, 'w') as file:
+                json.dump(users[user_id], file, separators=(',', ':'))
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.remove(journal_path)
+            os.replace(tmp_path, self._path(user_id, '.json'))
+
+        self.entries[user_id] = 0
+        self.snapshot_records[user_id] = sum(
+            len(records)
+            for record_type in ('expenses', 'incomes')
+            for records in users[user_id][record_type].values()
+        )
+
+    def write_back(self, user_id: str) -> None:
+        """
+        Queues folding the user's journal into their snapshot.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - None
+        """
+        self._worker.submit({'op': 'compact', 'user_id': user_id})
+
+    def import_legacy(self, snapshot_path: str, journal_path: str) -> None:
+        """
+        Splits a single data.json snapshot and its journal into per-user shards.
+
+        Does nothing when the shards directory already exists or there is nothing to import.
+
+        Args:
+        - snapshot_path (str): The path to the data.json snapshot.
+        - journal_path (str): The path to the journal file.
+
+        Returns:
+        - None
+        """
+        if os.path.exists(self.data_dir) or not os.path.exists(snapshot_path):
+            return
+
+        users = load_legacy(snapshot_path, journal_path)
+        tmp_dir = self.data_dir + '.tmp'
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        for user_id, user in users.items():
+            with open(os.path.join(tmp_dir, f'{user_id}.json'), 'w') as file:
+                json.dump(user, file, separators=(',', ':'))
+
+        os.rename(tmp_dir, self.data_dir)
@@ -0,0 +1,66 @@
+import argparse
+
+from .journal import load_legacy
+from .sqlite import SqliteStorage
+
+
+def migrate_json_to_sqlite(snapshot_path: str, journal_path: str, database_path: str) -> int:
+    """
+    Copies the users data from the JSON snapshot and its journal into an SQLite database.
+
+    Args:
+    - snapshot_path (str): The path to the data.json snapshot.
+    - journal_path (str): The path to the journal file.
+    - database_path (str): The path to the SQLite database.
+
+    Returns:
+    - int: The number of migrated users.
+
+    Raises:
+    - ValueError: If the database already contains users.
+    """
+    database = SqliteStorage(database_path)
+
+    if database.has_users():
+        database.close()
+        raise ValueError(f'{database_path} already contains users')
+
+    users = load_legacy(snapshot_path, journal_path)
+    entries = []
+
+    for user_id, user in users.items():
+        entries.append({'op': 'user', 'user_id': user_id, 'name': user['name']})
+
+        for record_type in ('expenses', 'incomes'):
+            for category, records in user[record_type].items():
+                entries.extend(
+                    {
+                        'op': 'add',
+                        'user_id': user_id,
+                        'record_type': record_type,
+                        'category': category,
+                        'record': record,
+                    }
+                    for record in records
+                )
+
+        entries.extend(
+            {'op': 'budget', 'user_id': user_id, 'category': category, 'limit': limit}
+            for category, limit in user.get('budgets', {}).items()
+        )
+
+    database.write(entries)
+    database.close()
+
+    return len(users)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Migrate data.json to an SQLite database.')
+    parser.add_argument('snapshot', nargs='?', default='./data.json')
+    parser.add_argument('database', nargs='?', default='./data.sqlite3')
+    parser.add_argument('--journal', default='./data.journal')
+    args = parser.parse_args()
+
+    migrated = migrate_json_to_sqlite(args.snapshot, args.journal, args.database)
+    print(f'Migrated {migrated} users to {args.database}')
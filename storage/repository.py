@@ -0,0 +1,152 @@
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable
+
+from classes import User
+
+
+class UserRepository:
+    """
+    Bounded LRU cache of the users data, loaded one user at a time.
+
+    A user is loaded on first access and kept while they stay active.
+    The least recently used users are evicted once the cache is full, and
+    users idle for longer than the timeout are evicted as other users come in.
+    Evicting a user with unsaved changes hands them to the write-back callback.
+    An evicted user who is still referenced elsewhere (e.g. by a handler that
+    is running) is kept in a weak map, so the same live User object is handed
+    out again instead of a second copy being loaded.
+
+    Methods:
+    - get(self, user_id: str) -> User | None:
+                Returns the user, loading them on first access.
+    - mark_dirty(self, user_id: str) -> None:
+                Marks the user as changed since the last write-back.
+    - evict(self, user_id: str) -> None:
+                Removes the user from the cache.
+    """
+    def __init__(
+            self,
+            load: Callable[[str], User | None],
+            write_back: Callable[[str], None],
+            capacity: int = 1000,
+            idle_timeout: float = 3600,
+    ) -> None:
+        """
+        Initializes a new UserRepository object.
+
+        Args:
+        - load (Callable[[str], User | None]): The function loading a user,
+                                    returning None for an unknown user.
+        - write_back (Callable[[str], None]): The function saving a dirty user on eviction.
+        - capacity (int, optional): The maximum number of cached users. Defaults to 1000.
+        - idle_timeout (float, optional): The number of seconds after which
+                                    an idle user is evicted. Defaults to 3600.
+        """
+        self.capacity = capacity
+        self.idle_timeout = idle_timeout
+        self._load = load
+        self._write_back = write_back
+        self._users = OrderedDict()
+        self._live = weakref.WeakValueDictionary()
+        self._last_access = {}
+        self._dirty = set()
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.get(user_id) is not None
+
+    def __getitem__(self, user_id: str) -> User:
+        user = self.get(user_id)
+
+        if user is None:
+            raise KeyError(user_id)
+
+        return user
+
+    def __setitem__(self, user_id: str, user: User) -> None:
+        self._users[user_id] = user
+        self._live[user_id] = user
+        self._touch(user_id)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def get(self, user_id: str) -> User | None:
+        """
+        Returns the user, loading them on first access.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - User | None: The user, None if the user is unknown.
+        """
+        user = self._users.get(user_id)
+
+        if user is None:
+            user = self._live.get(user_id) or self._load(user_id)
+
+            if user is None:
+                return None
+
+            self._users[user_id] = user
+            self._live[user_id] = user
+
+        self._touch(user_id)
+
+        return user
+
+    def mark_dirty(self, user_id: str) -> None:
+        """
+        Marks the user as changed since the last write-back.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - None
+        """
+        self._dirty.add(user_id)
+
+    def evict(self, user_id: str) -> None:
+        """
+        Removes the user from the cache, writing them back if they are dirty.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - None
+        """
+        self._users.pop(user_id, None)
+        self._last_access.pop(user_id, None)
+
+        if user_id in self._dirty:
+            self._dirty.discard(user_id)
+            self._write_back(user_id)
+
+    def _touch(self, user_id: str) -> None:
+        """
+        Moves the user to the most recently used end and evicts idle and excess users.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - None
+        """
+        now = time.monotonic()
+        self._users.move_to_end(user_id)
+        self._last_access[user_id] = now
+
+        while len(self._users) > self.capacity:
+            self.evict(next(iter(self._users)))
+
+        while self._users:
+            oldest = next(iter(self._users))
+
+            if oldest == user_id or now - self._last_access[oldest] < self.idle_timeout:
+                break
+
+            self.evict(oldest)
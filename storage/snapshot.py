@@ -0,0 +1,432 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+from datetime import date
+from typing import Iterator
+
+from classes import Expense, Income, User
+MAGIC = b'ETBS'
+VERSION = 1
+NO_STRING = 0xFFFFFFFF
+RECORD_TYPES = ('expenses', 'incomes')
+
+# magic, version, reserved, numbers of users, groups, records, strings and budgets,
+# offsets of the user, group, record, string and budget tables
+HEADER = struct.Struct('<4sHHIIIIIQQQQQ')
+# user ID, name, first group, number of groups, first budget, number of budgets
+USER = struct.Struct('<IIIIII')
+# record type, category, first record, number of records
+GROUP = struct.Struct('<B3xIII')
+# record ID, title, date ordinal, amount
+RECORD = struct.Struct('<IIId')
+# category, monthly limit
+BUDGET = struct.Struct('<Id')
+STRING_OFFSET = struct.Struct('<I')
+
+
+def write_snapshot(users: dict, path: str) -> None:
+    """
+    Writes the users data to a binary snapshot.
+
+    The snapshot is made of fixed-width tables, each row pointing into the next one:
+    a user row holds the range of their groups and of their budgets, a group
+    row (a category of expenses or incomes) the range of its records. Every string is stored
+    once in a string table and referred to by its index. Records without IDs
+    are written with the IDs assign_legacy_ids gives them, without changing
+    the data passed in. The file is written to a temporary path and moved
+    into place once it is on disk.
+
+    Args:
+    - users (dict): The users data in the data.json layout.
+    - path (str): The path to the snapshot.
+
+    Returns:
+    - None
+
+    Raises:
+    - ValueError: If the strings do not fit into the string table.
+    """
+    strings = {}
+    user_rows = bytearray()
+    group_rows = bytearray()
+    record_rows = bytearray()
+    budget_rows = bytearray()
+    (group_count, record_count, budget_count) = (0, 0, 0)
+
+    def intern(value: str) -> int:
+        return strings.setdefault(value, len(strings))
+
+    for user_id, user in users.items():
+        first_group = group_count
+
+        for kind, record_type in enumerate(RECORD_TYPES):
+            position = 0
+
+            for category, records in user[record_type].items():
+                group_rows += GROUP.pack(kind, intern(category), record_count, len(records))
+                group_count += 1
+
+                for record in records:
+                    record_rows += RECORD.pack(
+                        intern(record.get('id', f'{record_type[0]}{position}')),
+                        intern(record['title']) if 'title' in record else NO_STRING,
+                        date.fromisoformat(record['date']).toordinal(),
+                        record['amount'],
+                    )
+                    record_count += 1
+                    position += 1
+
+        budgets = user.get('budgets', {})
+
+        for category, limit in budgets.items():
+            budget_rows += BUDGET.pack(intern(category), limit)
+
+        user_rows += USER.pack(intern(user_id), intern(user['name']), first_group,
+                               group_count - first_group, budget_count, len(budgets))
+        budget_count += len(budgets)
+
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = [0]
+
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+
+    if offsets[-1] >= NO_STRING:
+        raise ValueError('the strings do not fit into the string table')
+
+    users_offset = HEADER.size
+    groups_offset = users_offset + len(user_rows)
+    records_offset = groups_offset + len(group_rows)
+    budgets_offset = records_offset + len(record_rows)
+    strings_offset = budgets_offset + len(budget_rows)
+    tmp_path = path + '.tmp'
+
+    with open(tmp_path, 'wb') as file:
+        file.write(HEADER.pack(
+            MAGIC, VERSION, 0, len(users), group_count, record_count, len(strings), budget_count,
+            users_offset, groups_offset, records_offset, strings_offset, budgets_offset,
+        ))
+        file.write(user_rows)
+        file.write(group_rows)
+        file.write(record_rows)
+        file.write(budget_rows)
+        file.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        file.write(b''.join(encoded))
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """
+    Read-only view of a binary snapshot, memory-mapped and read on demand.
+
+    Opening a snapshot reads only the header and the user table; the records
+    of a user and the strings they refer to are read from the mapping when
+    the user is loaded, so the memory used depends on the users read,
+    not on the size of the file.
+
+    Methods:
+    - user_ids(self) -> list:
+                Returns the IDs of the users in the snapshot.
+    - iter_groups(self, user_id: str) -> Iterator[tuple]:
+                Yields the record type, the category and the record rows of each group.
+    - get_budgets(self, user_id: str) -> dict:
+                Reads the monthly budgets of a user.
+    - load_user(self, user_id: str) -> User | None:
+                Loads a user.
+    - get_user(self, user_id: str) -> dict | None:
+                Reads a user in the data.json layout.
+    - close(self) -> None:
+                Closes the mapping and the file.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Opens a binary snapshot.
+
+        Args:
+        - path (str): The path to the snapshot.
+
+        Raises:
+        - ValueError: If the file is not a snapshot or has an unsupported version.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            (
+                magic, version, _, user_count, self.group_count, self.record_count, string_count,
+                self.budget_count, self._users_offset, self._groups_offset, self._records_offset,
+                strings_offset, self._budgets_offset,
+            ) = HEADER.unpack_from(self._map)
+        except struct.error:
+            self.close()
+            raise ValueError(f'{path} is not a snapshot') from None
+
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not a snapshot')
+
+        if version != VERSION:
+            self.close()
+            raise ValueError(f'{path} has the unsupported snapshot version {version}')
+
+        self._strings_offset = strings_offset
+        self._blob_offset = strings_offset + STRING_OFFSET.size * (string_count + 1)
+        users_end = self._users_offset + USER.size * user_count
+        self._users = {
+            self._string(row[0]): position
+            for position, row in enumerate(
+                USER.iter_unpack(self._map[self._users_offset:users_end])
+            )
+        }
+
+    def __enter__(self) -> 'Snapshot':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._users
+
+    def _string(self, index: int) -> str | None:
+        """
+        Reads a string from the string table.
+
+        Args:
+        - index (int): The index of the string, NO_STRING for none.
+
+        Returns:
+        - str | None: The string, None for NO_STRING.
+        """
+        if index == NO_STRING:
+            return None
+
+        (start, end) = struct.unpack_from('<II', self._map,
+                                          self._strings_offset + STRING_OFFSET.size * index)
+
+        return self._map[self._blob_offset + start:self._blob_offset + end].decode('utf-8')
+
+    def _user_row(self, user_id: str) -> tuple | None:
+        """
+        Reads the row of a user.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - tuple | None: The user's row in the USER layout, None if the user is unknown.
+        """
+        position = self._users.get(user_id)
+
+        if position is None:
+            return None
+
+        return USER.unpack_from(self._map, self._users_offset + USER.size * position)
+
+    def user_ids(self) -> list:
+        """
+        Returns the IDs of the users in the snapshot.
+
+        Returns:
+        - list: The users' IDs in the order of the snapshot.
+        """
+        return list(self._users)
+
+    def iter_groups(self, user_id: str) -> Iterator[tuple]:
+        """
+        Yields the record type, the category and the record rows of each of the user's groups.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - Iterator[tuple]: The record type, the category and the list of
+                        (record ID, title, date ordinal, amount) rows with decoded strings.
+        """
+        (_, _, first_group, group_count, _, _) = self._user_row(user_id)
+        start = self._groups_offset + GROUP.size * first_group
+        groups = self._map[start:start + GROUP.size * group_count]
+        strings = {}
+
+        def read(index: int) -> str | None:
+            if index not in strings:
+                strings[index] = self._string(index)
+
+            return strings[index]
+
+        for kind, category, first_record, record_count in GROUP.iter_unpack(groups):
+            start = self._records_offset + RECORD.size * first_record
+            rows = self._map[start:start + RECORD.size * record_count]
+
+            yield RECORD_TYPES[kind], read(category), [
+                (self._string(record_id), read(title), date_ordinal, amount)
+                for record_id, title, date_ordinal, amount in RECORD.iter_unpack(rows)
+            ]
+
+    def get_budgets(self, user_id: str) -> dict:
+        """
+        Reads the monthly budgets of a user.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - dict: The monthly limits keyed by expense category.
+        """
+        (_, _, _, _, first_budget, budget_count) = self._user_row(user_id)
+        start = self._budgets_offset + BUDGET.size * first_budget
+        end = start + BUDGET.size * budget_count
+
+        return {
+            self._string(category): limit
+            for category, limit in BUDGET.iter_unpack(self._map[start:end])
+        }
+
+    def load_user(self, user_id: str) -> User | None:
+        """
+        Loads a user, building the records straight from the rows.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - User | None: The user, None if the user is unknown.
+        """
+        row = self._user_row(user_id)
+
+        if row is None:
+            return None
+
+        records = {'expenses': {}, 'incomes': {}}
+
+        for record_type, category, rows in self.iter_groups(user_id):
+            if record_type == 'expenses':
+                transactions = (
+                    Expense(amount, title, category, date_ordinal, record_id)
+                    for record_id, title, date_ordinal, amount in rows
+                )
+            else:
+                transactions = (
+                    Income(category, amount, date_ordinal, record_id)
+                    for record_id, _, date_ordinal, amount in rows
+                )
+
+            records[record_type][category] = {record.id: record for record in transactions}
+
+        return User(self._string(row[1]), records['expenses'], records['incomes'],
+                    self.get_budgets(user_id))
+
+    def get_user(self, user_id: str) -> dict | None:
+        """
+        Reads a user in the data.json layout.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - dict | None: The user's data, None if the user is unknown.
+        """
+        row = self._user_row(user_id)
+
+        if row is None:
+            return None
+
+        user = {'name': self._string(row[1]), 'expenses': {}, 'incomes': {}}
+
+        for record_type, category, rows in self.iter_groups(user_id):
+            records = user[record_type][category] = []
+
+            for record_id, title, date_ordinal, amount in rows:
+                record = {'id': record_id, 'category': category}
+
+                if title is not None:
+                    record['title'] = title
+
+                record['amount'] = amount
+                record['date'] = date.fromordinal(date_ordinal).isoformat()
+                records.append(record)
+
+        if budgets := self.get_budgets(user_id):
+            user['budgets'] = budgets
+
+        return user
+
+    def close(self) -> None:
+        """
+        Closes the mapping and the file.
+
+        Returns:
+        - None
+        """
+        self._map.close()
+        self._file.close()
+
+
+def json_to_snapshot(json_path: str, snapshot_path: str) -> int:
+    """
+    Converts a snapshot in the data.json layout to a binary snapshot.
+
+    Records without IDs get the IDs JournalStorage gives them when loading.
+
+    Args:
+    - json_path (str): The path to the JSON snapshot.
+    - snapshot_path (str): The path to the binary snapshot.
+
+    Returns:
+    - int: The number of converted users.
+    """
+    with open(json_path, 'r') as file:
+        users = json.load(file)
+
+    write_snapshot(users, snapshot_path)
+
+    return len(users)
+
+
+def snapshot_to_json(snapshot_path: str, json_path: str, indent: int = 4) -> int:
+    """
+    Converts a binary snapshot to the data.json layout.
+
+    Args:
+    - snapshot_path (str): The path to the binary snapshot.
+    - json_path (str): The path to the JSON snapshot.
+    - indent (int, optional): The indentation of the JSON. Defaults to 4, as in data.json.
+
+    Returns:
+    - int: The number of converted users.
+    """
+    with Snapshot(snapshot_path) as snapshot:
+        users = {user_id: snapshot.get_user(user_id) for user_id in snapshot.user_ids()}
+
+    tmp_path = json_path + '.tmp'
+
+    with open(tmp_path, 'w') as file:
+        json.dump(users, file, indent=indent)
+
+    os.replace(tmp_path, json_path)
+
+    return len(users)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert between data.json and a binary snapshot.')
+    parser.add_argument('direction', choices=['to-binary', 'to-json'])
+    parser.add_argument('source')
+    parser.add_argument('target')
+    args = parser.parse_args()
+
+    if args.direction == 'to-binary':
+        converted = json_to_snapshot(args.source, args.target)
+    else:
+        converted = snapshot_to_json(args.source, args.target)
+
+    print(f'Converted {converted} users to {args.target}')
@@ -0,0 +1,421 @@
+import sqlite3
+import threading
+from datetime import date
+
+from classes import Expense, Income, User
+from .base import Storage
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    record_id TEXT,
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    category TEXT NOT NULL,
+    title TEXT,
+    amount REAL NOT NULL,
+    date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_by_date ON transactions (user_id, kind, date);
+CREATE INDEX IF NOT EXISTS transactions_by_category ON transactions (user_id, kind, category);
+CREATE TABLE IF NOT EXISTS budgets (
+    user_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL,
+    PRIMARY KEY (user_id, category)
+);
+'''
+
+RECORD_ID_SCHEMA = '''
+CREATE INDEX IF NOT EXISTS transactions_by_record_id ON transactions (user_id, record_id);
+UPDATE transactions SET record_id = 'row' || id WHERE record_id IS NULL;
+'''
+
+
+def get_range_condition(start: int = None, end: int = None) -> tuple:
+    """
+    Builds the SQL condition and parameters for a date range.
+
+    Args:
+    - start (int, optional): The date ordinal of the first day of the range.
+    - end (int, optional): The date ordinal of the last day of the range.
+
+    Returns:
+    - tuple: The SQL condition and the list of its parameters.
+    """
+    condition = ''
+    params = []
+
+    if start is not None:
+        condition += ' AND date >= ?'
+        params.append(date.fromordinal(start).isoformat())
+
+    if end is not None:
+        condition += ' AND date <= ?'
+        params.append(date.fromordinal(end).isoformat())
+
+    return condition, params
+
+
+def to_record(
+        record_id: str,
+        category: str,
+        title: str,
+        amount: float,
+        record_date: str
+) -> Expense | Income:
+    """
+    Converts a row of the transactions table to a transaction.
+
+    Args:
+    - record_id (str): The ID of the record.
+    - category (str): The category of the record.
+    - title (str): The title of the record, None for incomes.
+    - amount (float): The amount of the record.
+    - record_date (str): The date of the record in YYYY-MM-DD format.
+
+    Returns:
+    - Expense | Income: The transaction.
+    """
+    date_ordinal = date.fromisoformat(record_date).toordinal()
+
+    if title is None:
+        return Income(category, amount, date_ordinal, record_id)
+
+    return Expense(amount, title, category, date_ordinal, record_id)
+
+
+class SqliteStorage(Storage):
+    """
+    SQLite storage for the users data.
+
+    Transactions are kept in one table indexed on (user_id, kind, date) and
+    (user_id, kind, category), so date range filters, sums and per-category
+    totals are answered by SQLite instead of Python loops.
+    The database runs in WAL mode and queries read the written data. Queries
+    about a user whose entries are still queued for writing are answered from
+    the loaded user instead, so a user always sees their own changes without
+    waiting for the writer.
+
+    Methods:
+    - load_user(self, user_id: str) -> User | None:
+                Loads the data of one user from the database.
+    - write(self, entries: list) -> None:
+                Applies a batch of journal entries in one transaction.
+    - close(self) -> None:
+                Flushes the queued entries and closes the database.
+    """
+    def __init__(
+            self,
+            path: str,
+            flush_interval: float = 0.5,
+            cache_size: int = 1000,
+            idle_timeout: float = 3600,
+    ) -> None:
+        """
+        Initializes a new SqliteStorage object.
+
+        Args:
+        - path (str): The path to the database file.
+        - flush_interval (float, optional): The number of seconds submitted entries
+                                    are coalesced for. Defaults to 0.5.
+        - cache_size (int, optional): The maximum number of users kept in memory.
+                                    Defaults to 1000.
+        - idle_timeout (float, optional): The number of seconds after which
+                                    an idle user is evicted from memory. Defaults to 3600.
+        """
+        super().__init__(flush_interval, cache_size, idle_timeout)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(SCHEMA)
+        columns = [row[1] for row in self._connection.execute('PRAGMA table_info(transactions)')]
+
+        if 'record_id' not in columns:
+            self._connection.execute('ALTER TABLE transactions ADD COLUMN record_id TEXT')
+
+        self._connection.executescript(RECORD_ID_SCHEMA)
+
+    def _query(self, sql: str, params: list) -> list:
+        """
+        Runs a query on the written data.
+
+        Args:
+        - sql (str): The SQL query.
+        - params (list): The parameters of the query.
+
+        Returns:
+        - list: The fetched rows.
+        """
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def has_users(self) -> bool:
+        """
+        Checks if the database contains any user.
+
+        Returns:
+        - bool: True if there is at least one user, False otherwise.
+        """
+        return bool(self._query('SELECT 1 FROM users LIMIT 1', []))
+
+    def load_user(self, user_id: str) -> User | None:
+        """
+        Loads the data of one user from the database.
+
+        Args:
+        - user_id (str): The user's ID.
+
+        Returns:
+        - User | None: The user, None if the user is unknown.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT name FROM users WHERE user_id = ?', (user_id,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            records = {'expenses': {}, 'incomes': {}}
+            rows = self._connection.execute(
+                'SELECT kind, record_id, category, title, amount, date FROM transactions '
+                'WHERE user_id = ? ORDER BY id',
+                (user_id,)
+            )
+
+            for kind, *columns in rows:
+                record = to_record(*columns)
+                records[kind].setdefault(record.category, {})[record.id] = record
+
+            budgets = dict(self._connection.execute(
+                'SELECT category, amount FROM budgets WHERE user_id = ?', (user_id,)
+            ))
+
+        return User(row[0], records['expenses'], records['incomes'], budgets)
+
+    def write(self, entries: list) -> None:
+        """
+        Applies a batch of journal entries in one transaction.
+
+        Args:
+        - entries (list): The journal entries.
+
+        Returns:
+        - None
+        """
+        with self._lock, self._connection:
+            for entry in entries:
+                match entry['op']:
+                    case 'user':
+                        self._connection.execute(
+                            'INSERT OR REPLACE INTO users (user_id, name) VALUES (?, ?)',
+                            (entry['user_id'], entry['name'])
+                        )
+                    case 'add':
+                        record = entry['record']
+                        self._connection.execute(
+                            'INSERT INTO transactions '
+                            '(record_id, user_id, kind, category, title, amount, date) '
+                            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (
+                                record.get('id'),
+                                entry['user_id'],
+                                entry['record_type'],
+                                entry['category'],
+                                record.get('title'),
+                                record['amount'],
+                                record['date'],
+                            )
+                        )
+                    case 'delete':
+                        self._connection.executemany(
+                            'DELETE FROM transactions '
+                            'WHERE user_id = ? AND kind = ? AND record_id = ?',
+                            [
+                                (entry['user_id'], entry['record_type'], record_id)
+                                for record_id in entry['ids']
+                            ]
+                        )
+                    case 'budget' if entry['limit'] is None:
+                        self._connection.execute(
+                            'DELETE FROM budgets WHERE user_id = ? AND category = ?',
+                            (entry['user_id'], entry['category'])
+                        )
+                    case 'budget':
+                        self._connection.execute(
+                            'INSERT OR REPLACE INTO budgets (user_id, category, amount) '
+                            'VALUES (?, ?, ?)',
+                            (entry['user_id'], entry['category'], entry['limit'])
+                        )
+
+    def close(self) -> None:
+        """
+        Flushes the queued entries and closes the database.
+
+        Returns:
+        - None
+        """
+        super().close()
+
+        with self._lock:
+            self._connection.close()
+
+    def get_records(
+            self,
+            user_id: str,
+            record_type: str,
+            start: int = None,
+            end: int = None,
+            category: str = None,
+            offset: int = 0,
+            limit: int = None,
+    ) -> list:
+        """
+        Returns the records of the user within the specified date range.
+
+        The records are ordered by date and ID, or in the order they were added
+        when only the category is given, like the loaded user's. The page
+        is cut by SQLite with LIMIT and OFFSET.
+
+        Args:
+        - user_id (str): The user's ID.
+        - record_type (str): The type of records ('expenses' or 'incomes').
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+        - category (str, optional): The category of the records.
+        - offset (int, optional): The number of records skipped. Defaults to 0.
+        - limit (int, optional): The maximum number of records returned. Defaults to all of them.
+
+        Returns:
+        - list: The transactions.
+        """
+        if self.has_pending(user_id):
+            return super().get_records(
+                user_id, record_type, start, end, category, offset, limit
+            )
+
+        condition, params = get_range_condition(start, end)
+        order = 'id' if category and start is None and end is None else 'date, record_id'
+
+        if category:
+            condition += ' AND category = ?'
+            params.append(category)
+
+        rows = self._query(
+            'SELECT record_id, category, title, amount, date FROM transactions '
+            f'WHERE user_id = ? AND kind = ?{condition} ORDER BY {order} LIMIT ? OFFSET ?',
+            [user_id, record_type, *params, -1 if limit is None else limit, offset]
+        )
+
+        return [to_record(*row) for row in rows]
+
+    def count_records(
+            self,
+            user_id: str,
+            record_type: str,
+            start: int = None,
+            end: int = None,
+            category: str = None,
+    ) -> int:
+        """
+        Counts the records of the user within the specified date range.
+
+        Args:
+        - user_id (str): The user's ID.
+        - record_type (str): The type of records ('expenses' or 'incomes').
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+        - category (str, optional): The category of the records.
+
+        Returns:
+        - int: The number of records.
+        """
+        if self.has_pending(user_id):
+            return super().count_records(user_id, record_type, start, end, category)
+
+        condition, params = get_range_condition(start, end)
+
+        if category:
+            condition += ' AND category = ?'
+            params.append(category)
+
+        rows = self._query(
+            f'SELECT COUNT(*) FROM transactions WHERE user_id = ? AND kind = ?{condition}',
+            [user_id, record_type, *params]
+        )
+
+        return rows[0][0]
+
+    def get_total_amount(
+            self,
+            user_id: str,
+            record_type: str,
+            start: int = None,
+            end: int = None,
+    ) -> float:
+        """
+        Calculates the total amount of the user's records within the specified date range.
+
+        Args:
+        - user_id (str): The user's ID.
+        - record_type (str): The type of records ('expenses' or 'incomes').
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+
+        Returns:
+        - float: The total amount.
+        """
+        if self.has_pending(user_id):
+            return super().get_total_amount(user_id, record_type, start, end)
+
+        condition, params = get_range_condition(start, end)
+        rows = self._query(
+            'SELECT COALESCE(SUM(amount), 0) FROM transactions '
+            f'WHERE user_id = ? AND kind = ?{condition}',
+            [user_id, record_type, *params]
+        )
+
+        return rows[0][0]
+
+    def get_amounts_by_category(
+            self,
+            user_id: str,
+            record_type: str,
+            start: int = None,
+            end: int = None,
+    ) -> dict:
+        """
+        Calculates the total amounts of the user's records by category within the date range.
+
+        Every category of the user is present, in the user's order, with 0 if it has
+        no records within the range, like the answer of the loaded user.
+
+        Args:
+        - user_id (str): The user's ID.
+        - record_type (str): The type of records ('expenses' or 'incomes').
+        - start (int, optional): The date ordinal of the first day of the range.
+        - end (int, optional): The date ordinal of the last day of the range.
+
+        Returns:
+        - dict: The total amounts keyed by category.
+        """
+        if self.has_pending(user_id):
+            return super().get_amounts_by_category(user_id, record_type, start, end)
+
+        condition, params = get_range_condition(start, end)
+        rows = self._query(
+            'SELECT category, SUM(amount) FROM transactions '
+            f'WHERE user_id = ? AND kind = ?{condition} GROUP BY category',
+            [user_id, record_type, *params]
+        )
+        amounts = dict.fromkeys(getattr(self.users[user_id], record_type), 0)
+        amounts.update(rows)
+
+        return amounts
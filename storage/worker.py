@@ -0,0 +1,255 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable
+
+from instrumentation import registry
+
+_STOP = object()
+RETRY_INTERVAL = 1  # seconds before a failed batch is written again, doubled on every failure
+MAX_RETRY_INTERVAL = 60
+
+
+def add_to_batch(batch: list, item: dict | list) -> None:
+    """
+    Adds a queued entry, or a list of entries queued together, to a batch.
+
+    Args:
+    - batch (list): The batch of journal entries.
+    - item (dict | list): The queued item.
+
+    Returns:
+    - None
+    """
+    if isinstance(item, list):
+        batch.extend(item)
+    else:
+        batch.append(item)
+
+
+class PersistenceWorker(threading.Thread):
+    """
+    Background thread writing journal entries off the asyncio event loop.
+
+    Entries submitted within one flush window are coalesced into a single batch,
+    so a burst of changes from many chats costs one write and one fsync.
+    A batch that fails to be written is kept and written again, before the entries
+    submitted after it, until it succeeds; flush and stop raise while it is not written.
+
+    Methods:
+    - submit(self, entry: dict) -> None:
+                Queues an entry for writing and returns immediately.
+    - submit_many(self, entries: list) -> None:
+                Queues entries to be written together in one batch.
+    - flush(self) -> None:
+                Writes every queued entry and waits until it is on disk.
+    - stop(self) -> None:
+                Flushes the queue and stops the thread.
+
+    The write function may remove the entries it wrote from the batch before it raises,
+    so only the rest is written again.
+    """
+    def __init__(self, write: Callable[[list], None], flush_interval: float = 0.5) -> None:
+        """
+        Initializes a new PersistenceWorker object.
+
+        Args:
+        - write (Callable[[list], None]): The function writing a batch of entries.
+        - flush_interval (float, optional): The number of seconds entries are coalesced for.
+                                    Defaults to 0.5.
+        """
+        super().__init__(name='persistence-worker', daemon=True)
+        self.flush_interval = flush_interval
+        self._write = write
+        self._queue = queue.Queue()
+        self._failed = []
+        self._error = None
+        self._retry_interval = RETRY_INTERVAL
+
+    def submit(self, entry: dict) -> None:
+        """
+        Queues an entry for writing and returns immediately.
+
+        Args:
+        - entry (dict): The journal entry.
+
+        Returns:
+        - None
+        """
+        self._queue.put(entry)
+
+    def submit_many(self, entries: list) -> None:
+        """
+        Queues entries to be written together in one batch and returns immediately.
+
+        Args:
+        - entries (list): The journal entries.
+
+        Returns:
+        - None
+        """
+        self._queue.put(list(entries))
+
+    def flush(self) -> None:
+        """
+        Writes every queued entry and waits until it is on disk.
+
+        Returns at once when nothing is queued.
+        Writes in the calling thread when the worker is not running.
+
+        Returns:
+        - None
+
+        Raises:
+        - RuntimeError: If some entries could not be written; they are kept and retried.
+        """
+        if self._queue.unfinished_tasks == 0 and not self._failed:
+            return
+
+        if self.is_alive():
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+        else:
+            batch = []
+            items = 0
+
+            while not self._queue.empty():
+                add_to_batch(batch, self._queue.get_nowait())
+                items += 1
+
+            self._write_batch(batch)
+            self._task_done(items)
+
+        self._raise_failed()
+
+    def stop(self) -> None:
+        """
+        Flushes the queue and stops the thread.
+
+        Returns:
+        - None
+
+        Raises:
+        - RuntimeError: If some entries could not be written.
+        """
+        if self.is_alive():
+            self._queue.put(_STOP)
+            self.join()
+            self._raise_failed()
+        else:
+            self.flush()
+
+    def _raise_failed(self) -> None:
+        """
+        Raises the error of the last write if some entries are still not written.
+
+        Returns:
+        - None
+
+        Raises:
+        - RuntimeError: If some entries could not be written.
+        """
+        if self._failed:
+            raise RuntimeError(
+                f'{len(self._failed)} journal entries could not be written'
+            ) from self._error
+
+    def _task_done(self, count: int) -> None:
+        """
+        Marks the given number of queued items as processed.
+
+        Args:
+        - count (int): The number of processed items.
+
+        Returns:
+        - None
+        """
+        for _ in range(count):
+            self._queue.task_done()
+
+    def _write_batch(self, batch: list) -> None:
+        """
+        Writes the entries of a failed batch followed by a new batch.
+
+        A failure is logged instead of killing the thread, and the entries
+        that were not written are kept for the next attempt.
+
+        Args:
+        - batch (list): The journal entries.
+
+        Returns:
+        - None
+        """
+        batch = self._failed + batch
+
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        count = len(batch)
+
+        try:
+            self._write(batch)
+        except Exception as error:
+            registry.increment('storage_write_errors_total')
+            logging.exception(
+                f'Failed to persist {len(batch)} journal entries, they will be written again'
+            )
+            registry.increment('storage_entries_total', value=count - len(batch))
+            (self._failed, self._error) = (batch, error)
+            self._retry_interval = min(self._retry_interval * 2, MAX_RETRY_INTERVAL)
+        else:
+            registry.increment('storage_entries_total', value=count)
+            (self._failed, self._error) = ([], None)
+            self._retry_interval = RETRY_INTERVAL
+        finally:
+            registry.observe('storage_write_seconds', time.perf_counter() - started)
+
+    def run(self) -> None:
+        """
+        Collects entries for one flush window at a time and writes them as a batch.
+
+        While a failed batch is kept, it is written again once the retry interval
+        passes without new entries.
+
+        Returns:
+        - None
+        """
+        stopped = False
+
+        while not stopped:
+            batch = []
+            items = 0
+            waiters = []
+
+            try:
+                item = self._queue.get(timeout=self._retry_interval if self._failed else None)
+            except queue.Empty:
+                item = None
+
+            deadline = time.monotonic() + self.flush_interval
+
+            while item is not None:
+                if item is _STOP:
+                    stopped = True
+                    break
+
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+
+                add_to_batch(batch, item)
+                items += 1
+
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+
+            self._write_batch(batch)
+            self._task_done(items + len(waiters) + stopped)
+
+            for waiter in waiters:
+                waiter.set()
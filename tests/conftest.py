@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeBot  # noqa: E402
+from outbound import SendQueue  # noqa: E402
+from storage import JournalStorage, SqliteStorage  # noqa: E402
+
+BOUND_MODULES = (
+    'constants', 'utils', 'records_csv',
+    'commands.text_handlers', 'commands.add_expense_income_handler',
+    'commands.delete_handlers', 'commands.view_records_handlers',
+    'commands.statistic_handlers', 'commands.budget_handlers',
+    'commands.import_handlers', 'commands.export_handlers', 'commands.build_chart',
+)
+
+
+@pytest.fixture
+def bind(monkeypatch):
+    """
+    Points the modules that imported names from constants at other objects for one test.
+    """
+    def bind_values(values: dict) -> None:
+        for name in BOUND_MODULES:
+            module = sys.modules.get(name)
+
+            for attribute, value in values.items():
+                if module is not None and hasattr(module, attribute):
+                    monkeypatch.setattr(module, attribute, value)
+
+    return bind_values
+
+
+@pytest.fixture(params=['journal', 'sqlite'])
+def open_storage(request, tmp_path):
+    """
+    Opens a storage of the parametrized backend in the test's directory, closing it afterwards.
+
+    Called again it reopens the same files, like a restart.
+    """
+    opened = []
+
+    def open_backend():
+        if request.param == 'sqlite':
+            storage = SqliteStorage(str(tmp_path / 'data.sqlite3'))
+        else:
+            storage = JournalStorage(str(tmp_path / 'data'))
+
+        storage.start()
+        opened.append(storage)
+
+        return storage
+
+    yield open_backend
+
+    for storage in opened:
+        storage.close()
+
+
+@pytest.fixture
+def bot():
+    return FakeBot()
+
+
+@pytest.fixture
+def outbox(bot, bind):
+    """
+    A send queue without rate limits sending to the fake Bot API, bound to the handlers.
+    """
+    queue = SendQueue(bot=bot)
+    bind({'outbox': queue})
+
+    return queue
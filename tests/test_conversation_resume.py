@@ -0,0 +1,57 @@
+import asyncio
+
+from benchmarks.fakes import FakeContext, FakeUpdate
+from commands.add_expense_income_handler import get_date, get_price, get_title, get_transaction
+from constants import ASKING_DATE, ASKING_PRICE, ASKING_TITLE
+from persistence import SqlitePersistence
+from utils import save_user
+
+CONVERSATION = 'expenses'
+
+
+def test_expense_conversation_resumes_after_reload(open_storage, bind, outbox, bot, tmp_path):
+    storage = open_storage()
+    bind({'storage': storage, 'users': storage.users})
+    save_user('1', 'Benchmark')
+    context = FakeContext()
+    context.user_data.update({'user_id': '1', 'current_command': '/add_expense'})
+    persistence_path = str(tmp_path / 'conversations.sqlite3')
+
+    async def start_conversation() -> None:
+        assert await get_transaction(FakeUpdate('Food 🍽', 1), context) == ASKING_TITLE
+        assert await get_title(FakeUpdate('Lunch', 1), context) == ASKING_PRICE
+        assert await get_price(FakeUpdate('12.5', 1), context) == ASKING_DATE
+
+        persistence = SqlitePersistence(persistence_path)
+        await persistence.update_user_data(1, context.user_data)
+        await persistence.update_conversation(CONVERSATION, (1, 1), ASKING_DATE)
+        await persistence.flush()
+        await outbox.stop()
+
+    asyncio.run(start_conversation())
+
+    # The category was created only in memory; the restart drops it.
+    storage.close()
+    storage = open_storage()
+    bind({'storage': storage, 'users': storage.users})
+    assert 'Food' not in storage.users['1'].expenses
+
+    async def resume_conversation() -> int:
+        persistence = SqlitePersistence(persistence_path)
+        assert await persistence.get_conversations(CONVERSATION) == {(1, 1): ASKING_DATE}
+        restored = FakeContext()
+        restored.user_data.update((await persistence.get_user_data())[1])
+        await persistence.flush()
+
+        state = await get_date(FakeUpdate('2024-01-15', 1), restored)
+        await outbox.stop()
+
+        return state
+
+    asyncio.run(resume_conversation())
+
+    storage.close()
+    storage = open_storage()
+    (expense,) = storage.users['1'].expenses['Food'].values()
+    assert (expense.title, expense.amount, expense.date_string) == ('Lunch', 12.5, '2024-01-15')
+    assert 'was added!' in bot.calls[-1][2]['text']
@@ -0,0 +1,125 @@
+import calendar
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from date_windows import WINDOW_DAYS, WINDOW_MONTHS, get_window, parse_range, shift_months
+
+FIRST_DAY = date(2019, 1, 1)
+LAST_DAY = date(2028, 12, 31)
+DAYS = [FIRST_DAY + timedelta(days=offset) for offset in range((LAST_DAY - FIRST_DAY).days + 1)]
+
+
+def month_number(day: date) -> int:
+    return day.year * 12 + day.month - 1
+
+
+@pytest.mark.parametrize('day, months, expected', [
+    (date(2024, 3, 31), -1, date(2024, 2, 29)),
+    (date(2023, 3, 31), -1, date(2023, 2, 28)),
+    (date(2024, 2, 29), 12, date(2025, 2, 28)),
+    (date(2024, 2, 29), -12, date(2023, 2, 28)),
+    (date(2024, 2, 29), 48, date(2028, 2, 29)),
+    (date(2024, 1, 31), 1, date(2024, 2, 29)),
+    (date(2024, 5, 31), -1, date(2024, 4, 30)),
+    (date(2024, 1, 15), -1, date(2023, 12, 15)),
+    (date(2023, 12, 15), 1, date(2024, 1, 15)),
+    (date(2024, 6, 10), 0, date(2024, 6, 10)),
+])
+def test_shift_months_examples(day, months, expected):
+    assert shift_months(day, months) == expected
+
+
+@pytest.mark.parametrize('months', [-25, -12, -11, -1, 1, 2, 11, 12, 13, 25])
+def test_shift_months_moves_by_calendar_months(months):
+    for day in DAYS:
+        shifted = shift_months(day, months)
+        last_day = calendar.monthrange(shifted.year, shifted.month)[1]
+
+        assert month_number(shifted) - month_number(day) == months
+        assert shifted.day == min(day.day, last_day)
+
+
+def test_shift_months_is_reversible_up_to_the_clamped_day():
+    rng = random.Random(0)
+
+    for _ in range(2000):
+        day = rng.choice(DAYS)
+        months = rng.randint(-60, 60)
+        shifted = shift_months(day, months)
+
+        if shifted.day == day.day:
+            assert shift_months(shifted, -months) == day
+        else:
+            assert shifted.day < day.day
+
+
+def test_week_window_covers_seven_days():
+    for today in DAYS:
+        (start, end) = get_window('Week', today)
+
+        assert end == today.toordinal()
+        assert end - start + 1 == WINDOW_DAYS['Week'] == 7
+
+
+@pytest.mark.parametrize('date_filter, shortest, longest', [
+    ('Month', 28, 31),
+    ('Year', 365, 366),
+])
+def test_month_windows_start_the_day_after_the_same_day_months_ago(date_filter, shortest, longest):
+    for today in DAYS:
+        (start, end) = get_window(date_filter, today)
+        start_day = date.fromordinal(start)
+
+        assert end == today.toordinal()
+        assert start_day == shift_months(today, -WINDOW_MONTHS[date_filter]) + timedelta(days=1)
+        assert shortest <= end - start + 1 <= longest
+
+
+@pytest.mark.parametrize('date_filter, today, expected_start', [
+    ('Month', date(2024, 3, 31), date(2024, 3, 1)),
+    ('Month', date(2024, 3, 15), date(2024, 2, 16)),
+    ('Month', date(2024, 1, 10), date(2023, 12, 11)),
+    ('Month', date(2024, 1, 1), date(2023, 12, 2)),
+    ('Year', date(2024, 2, 29), date(2023, 3, 1)),
+    ('Year', date(2025, 1, 1), date(2024, 1, 2)),
+    ('Year', date(2024, 12, 31), date(2024, 1, 1)),
+    ('Week', date(2025, 1, 3), date(2024, 12, 28)),
+    ('Week', date(2024, 3, 2), date(2024, 2, 25)),
+])
+def test_windows_cross_month_and_year_boundaries(date_filter, today, expected_start):
+    assert get_window(date_filter, today) == (expected_start.toordinal(), today.toordinal())
+
+
+def test_get_window_defaults_to_today():
+    assert get_window('Week')[1] == date.today().toordinal()
+
+
+def test_get_window_rejects_unknown_filter():
+    with pytest.raises(ValueError):
+        get_window('Decade', date(2024, 1, 1))
+
+
+def test_parse_range_matches_iso_dates():
+    rng = random.Random(1)
+
+    for _ in range(2000):
+        (first, last) = sorted(rng.sample(DAYS, 2))
+
+        assert parse_range(first.isoformat(), last.isoformat()) == (
+            first.toordinal(),
+            last.toordinal(),
+        )
+
+
+@pytest.mark.parametrize('start_date, end_date', [
+    ('2024-02-30', '2024-03-01'),
+    ('2023-02-29', '2023-03-01'),
+    ('2024-01-01', '01.02.2024'),
+    ('2024-13-01', '2024-12-31'),
+    ('', '2024-01-01'),
+])
+def test_parse_range_rejects_invalid_dates(start_date, end_date):
+    with pytest.raises(ValueError):
+        parse_range(start_date, end_date)
@@ -0,0 +1,166 @@
+import json
+import os
+
+import pytest
+
+from storage import JournalStorage, SqliteStorage
+from storage.journal import load_legacy, replay
+from storage.migrate import migrate_json_to_sqlite
+
+LEGACY_USERS = {
+    '1': {
+        'name': 'Benchmark',
+        'expenses': {
+            'Home': [
+                {'category': 'Home', 'title': 'Chair', 'amount': 52.0, 'date': '2024-02-10'},
+                {'category': 'Home', 'title': 'Lamp', 'amount': 20.0, 'date': '2024-02-11'},
+            ],
+            'Food': [
+                {'category': 'Food', 'title': 'Lunch', 'amount': 12.5, 'date': '2024-02-12'},
+            ],
+        },
+        'incomes': {
+            'Job': [{'category': 'Job', 'amount': 2000.0, 'date': '2024-02-01'}],
+        },
+        'budgets': {'Food': 300.0},
+    },
+    '2': {'name': 'Other', 'expenses': {}, 'incomes': {}},
+}
+LEGACY_JOURNAL = [
+    {'op': 'user', 'user_id': '3', 'name': 'New'},
+    {'op': 'add', 'user_id': '3', 'record_type': 'expenses', 'category': 'Food',
+     'record': {'id': 'a', 'category': 'Food', 'title': 'Tea', 'amount': 2.0,
+                'date': '2024-03-01'}},
+    {'op': 'delete', 'user_id': '1', 'record_type': 'expenses', 'ids': ['e2']},
+    {'op': 'budget', 'user_id': '1', 'category': 'Food', 'limit': None},
+]
+
+
+def write_legacy(tmp_path) -> tuple:
+    snapshot_path = str(tmp_path / 'data.json')
+    journal_path = str(tmp_path / 'data.journal')
+
+    with open(snapshot_path, 'w') as file:
+        json.dump(LEGACY_USERS, file)
+
+    with open(journal_path, 'w') as file:
+        file.writelines(json.dumps(entry) + '\n' for entry in LEGACY_JOURNAL)
+        # A crash in the middle of an append leaves a torn last line.
+        file.write('{"op": "add", "user_id": "3", "rec')
+
+    return (snapshot_path, journal_path)
+
+
+def describe(user) -> dict:
+    return {
+        'name': user.name,
+        'budgets': user.budgets,
+        **{
+            record_type: sorted(
+                (record.id, record.category, getattr(record, 'title', None), record.amount,
+                 record.date_string)
+                for record in user.records_by_id[record_type].values()
+            )
+            for record_type in ('expenses', 'incomes')
+        },
+    }
+
+
+def test_replay_applies_the_entries_and_skips_a_torn_line(tmp_path):
+    (snapshot_path, journal_path) = write_legacy(tmp_path)
+    users = json.loads(json.dumps(LEGACY_USERS))
+
+    assert replay(users, journal_path) == len(LEGACY_JOURNAL)
+    assert 'budgets' not in users['1']
+    assert users['3']['expenses']['Food'][0]['title'] == 'Tea'
+
+    # The snapshot records have no IDs yet, the delete by ID finds nothing.
+    assert len(users['1']['expenses']['Food']) == 1
+
+    users = load_legacy(snapshot_path, journal_path)
+
+    assert sorted(users) == ['1', '2', '3']
+    assert 'Food' not in users['1']['expenses']
+    assert replay({}, str(tmp_path / 'missing.journal')) == 0
+
+
+def test_journals_are_folded_into_snapshots(tmp_path):
+    (snapshot_path, journal_path) = write_legacy(tmp_path)
+    data_dir = str(tmp_path / 'data')
+    storage = JournalStorage(data_dir, compact_threshold=3)
+    storage.import_legacy(snapshot_path, journal_path)
+    storage.start()
+    user = storage.users['1']
+    before = describe(user)
+
+    # The records of the snapshot got IDs by their position, e1 is the lamp.
+    assert 'Food' not in user.expenses
+    storage.submit({'op': 'delete', 'user_id': '1', 'record_type': 'expenses', 'ids': ['e1']})
+    storage.flush()
+    assert os.path.exists(os.path.join(data_dir, '1.journal'))
+
+    storage.submit_many([
+        {'op': 'budget', 'user_id': '1', 'category': 'Home', 'limit': float(limit)}
+        for limit in range(3)
+    ])
+    storage.flush()
+
+    assert not os.path.exists(os.path.join(data_dir, '1.journal'))
+    with open(os.path.join(data_dir, '1.json')) as file:
+        snapshot = json.load(file)
+    assert [record['title'] for record in snapshot['expenses']['Home']] == ['Chair']
+    assert all('id' in record for record in snapshot['expenses']['Home'])
+    storage.close()
+
+    user = JournalStorage(data_dir).load_user('1')
+
+    assert describe(user) == {
+        **before,
+        'budgets': {'Home': 2.0},
+        'expenses': [record for record in before['expenses'] if record[0] != 'e1'],
+    }
+
+
+def test_an_interrupted_fold_is_finished_or_rolled_back(tmp_path):
+    data_dir = str(tmp_path / 'data')
+    storage = JournalStorage(data_dir)
+    storage.start()
+    storage.submit({'op': 'user', 'user_id': '1', 'name': 'Benchmark'})
+    storage.close()
+    journal_path = os.path.join(data_dir, '1.journal')
+    folded_path = os.path.join(data_dir, '1.json.tmp')
+
+    # Crashed before the journal was removed: the new snapshot is dropped.
+    with open(folded_path, 'w') as file:
+        json.dump({'name': 'Half written', 'expenses': {}, 'incomes': {}}, file)
+
+    assert JournalStorage(data_dir).load_user('1').name == 'Benchmark'
+    assert not os.path.exists(folded_path)
+
+    # Crashed after the journal was removed: the new snapshot is committed.
+    with open(folded_path, 'w') as file:
+        json.dump({'name': 'Folded', 'expenses': {}, 'incomes': {}}, file)
+    os.remove(journal_path)
+
+    assert JournalStorage(data_dir).load_user('1').name == 'Folded'
+    assert os.path.exists(os.path.join(data_dir, '1.json'))
+
+
+def test_migration_to_sqlite_keeps_every_user(tmp_path):
+    (snapshot_path, journal_path) = write_legacy(tmp_path)
+    database_path = str(tmp_path / 'data.sqlite3')
+    journal = JournalStorage(str(tmp_path / 'data'))
+    journal.import_legacy(snapshot_path, journal_path)
+
+    assert migrate_json_to_sqlite(snapshot_path, journal_path, database_path) == 3
+
+    database = SqliteStorage(database_path)
+
+    for user_id in ('1', '2', '3'):
+        assert describe(database.load_user(user_id)) == describe(journal.load_user(user_id))
+
+    assert database.load_user('4') is None
+    database.close()
+
+    with pytest.raises(ValueError):
+        migrate_json_to_sqlite(snapshot_path, journal_path, database_path)
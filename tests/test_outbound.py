@@ -0,0 +1,186 @@
+import asyncio
+import time
+
+import pytest
+from telegram.error import RetryAfter
+
+from benchmarks.fakes import FakeBot
+from outbound import SendQueue
+
+
+class TimedBot(FakeBot):
+    """
+    FakeBot that also records when every call was accepted.
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.times = []
+
+    def _call(self, method: str, chat_id: int, **kwargs):
+        message = super()._call(method, chat_id, **kwargs)
+        self.times.append(time.monotonic())
+
+        return message
+
+
+def texts(bot: FakeBot, chat_id: int = None) -> list:
+    return [kwargs.get('text') for (_, chat, kwargs) in bot.calls
+            if chat_id is None or chat == chat_id]
+
+
+def test_consecutive_texts_are_sent_as_one_message():
+    bot = FakeBot()
+    queue = SendQueue(bot=bot, max_message_length=20)
+
+    async def send() -> list:
+        futures = [
+            queue.send_message(1, 'one'),
+            queue.send_message(1, 'two', reply_markup='keyboard'),
+            queue.send_message(1, 'three'),
+            queue.send_message(1, 'four', parse_mode='HTML'),
+            queue.send(1, 'send_photo', photo='chart'),
+            queue.send_message(1, 'five'),
+            queue.send_message(1, 'x' * 15),
+        ]
+        await queue.stop()
+
+        return await asyncio.gather(*futures)
+
+    results = asyncio.run(send())
+
+    # A keyboard ends a message, other options and the length limit keep texts apart.
+    assert [(method, kwargs) for (method, _, kwargs) in bot.calls] == [
+        ('send_message', {'text': 'one\n\ntwo', 'reply_markup': 'keyboard'}),
+        ('send_message', {'text': 'three'}),
+        ('send_message', {'text': 'four', 'parse_mode': 'HTML'}),
+        ('send_photo', {'photo': 'chart'}),
+        ('send_message', {'text': 'five'}),
+        ('send_message', {'text': 'x' * 15}),
+    ]
+    assert results[0] is results[1]
+    assert [result.message_id for result in results[1:]] == [1, 2, 3, 4, 5, 6]
+
+
+def test_chat_and_global_rates_pace_the_calls():
+    bot = TimedBot()
+    queue = SendQueue(bot=bot, chat_rate=20, chat_burst=2)
+
+    async def send() -> None:
+        for _ in range(6):
+            queue.send(1, 'send_photo', photo='chart')
+
+        await queue.stop()
+
+    asyncio.run(send())
+    gaps = [later - earlier for (earlier, later) in zip(bot.times, bot.times[1:])]
+
+    # The burst goes out at once, the rest one per 1/20 s.
+    assert gaps[0] < 0.03
+    assert all(gap >= 0.04 for gap in gaps[2:])
+
+    bot = TimedBot()
+    queue = SendQueue(bot=bot, rate=20)
+
+    async def send_to_many_chats() -> None:
+        for chat_id in range(5):
+            queue.send_message(chat_id, 'hello')
+
+        await queue.stop()
+
+    asyncio.run(send_to_many_chats())
+
+    assert bot.times[-1] - bot.times[0] >= 4 / 20 - 0.01
+    assert len(bot.calls) == 5
+
+
+def test_flood_limited_calls_are_retried_in_order_without_blocking_other_chats():
+    bot = TimedBot(chat_limit=2, retry_after=0.2)
+    queue = SendQueue(bot=bot)
+
+    async def send() -> list:
+        futures = []
+
+        for number in range(3):
+            futures.append(queue.send(1, 'send_photo', photo=number))
+            futures.append(queue.send(2, 'send_document', document=number))
+
+        futures.append(queue.send_message(3, 'free'))
+        await queue.join()
+
+        return await asyncio.gather(*futures)
+
+    started = time.monotonic()
+    results = asyncio.run(send())
+
+    assert bot.refused >= 2
+    assert [kwargs['photo'] for (_, chat, kwargs) in bot.calls if chat == 1] == list(range(3))
+    assert [kwargs['document'] for (_, chat, kwargs) in bot.calls if chat == 2] == list(range(3))
+    assert all(result is not None for result in results)
+    # The chat without a flood was served before the others waited their turn.
+    (free_call,) = [index for (index, (_, chat, _)) in enumerate(bot.calls) if chat == 3]
+    assert bot.times[free_call] - started < 0.1
+
+
+def test_calls_are_given_up_after_max_retries():
+    bot = FakeBot(chat_limit=1, retry_after=0.01)
+    queue = SendQueue(bot=bot, max_retries=2)
+
+    async def send() -> tuple:
+        first = queue.send(1, 'send_photo', photo='first')
+        second = queue.send(1, 'send_photo', photo='second')
+        await queue.stop()
+
+        return (await first, second)
+
+    (first, second) = asyncio.run(send())
+
+    assert first.message_id == 1
+    assert isinstance(second.exception(), RetryAfter)
+    assert bot.refused == 3
+
+
+def test_stop_sends_everything_queued_and_the_queue_restarts():
+    bot = FakeBot()
+    queue = SendQueue(bot=bot, chat_rate=50)
+
+    async def send(start: int) -> None:
+        sent = len(bot.calls)
+
+        for number in range(start, start + 3):
+            for chat_id in (1, 2):
+                queue.send(chat_id, 'send_photo', photo=number)
+
+        await queue.join()
+        assert len(bot.calls) == sent + 6
+        queue.send_message(1, 'last')
+        await queue.stop()
+        await queue.stop()
+
+    asyncio.run(send(0))
+    asyncio.run(send(3))
+
+    assert texts(bot, 1)[-1] == 'last'
+    assert [kwargs.get('photo') for (_, chat, kwargs) in bot.calls if chat == 2] == \
+        list(range(6))
+
+
+@pytest.mark.parametrize('error', [ValueError('bad request'), RetryAfter(0)])
+def test_failed_calls_fail_their_futures_only(error):
+    class FailingBot(FakeBot):
+        async def send_document(self, chat_id: int, document, **kwargs):
+            raise error
+
+    bot = FailingBot()
+    queue = SendQueue(bot=bot, max_retries=0)
+
+    async def send() -> tuple:
+        failed = queue.send(1, 'send_document', document='file')
+        sent = queue.send_message(1, 'after')
+        await queue.stop()
+
+        return (failed, await sent)
+
+    (failed, sent) = asyncio.run(send())
+
+    assert failed.exception() is error
+    assert sent.text == 'after'
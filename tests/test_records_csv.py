@@ -0,0 +1,94 @@
+import io
+import math
+
+import pytest
+
+from records_csv import apply_import, export_csv, import_csv, parse_amount, parse_csv_row
+from utils import save_user
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('12', 12.0),
+    ('12.5', 12.5),
+    ('12,5', 12.5),
+    ('-12,50', -12.5),
+    ('1.234', 1.234),
+    ('1 234,56', 1234.56),
+    ('1 234.56', 1234.56),
+    ('1,234.56', 1234.56),
+    ('1.234,56', 1234.56),
+    ('1,234,567', 1234567.0),
+    ('1.234.567', 1234567.0),
+    ('-1,234,567.8', -1234567.8),
+])
+def test_parse_amount(value, expected):
+    assert math.isclose(parse_amount(value), expected)
+
+
+@pytest.mark.parametrize('value', [
+    'nan', 'NaN', 'inf', '-inf', 'Infinity', '1e999',
+    '1,234',
+    '12,34.5', '1.23,4', '1,2,3', '1.2.3', '1,234.567,8',
+    '', 'abc',
+])
+def test_parse_amount_rejects(value):
+    with pytest.raises(ValueError):
+        parse_amount(value)
+
+
+def test_parse_csv_row_signs_and_categories():
+    (record_type, record) = parse_csv_row({'date': '2024-01-02', 'amount': '-12,50',
+                                           'category': 'food', 'title': 'Lunch'})
+    assert (record_type, record.category, record.title, record.amount) == (
+        'expenses', 'Food', 'Lunch', 12.5
+    )
+
+    (record_type, record) = parse_csv_row({'date': '2024-01-02', 'amount': '100'})
+    assert (record_type, record.category, record.amount) == ('incomes', 'Other', 100.0)
+
+
+@pytest.mark.parametrize('row', [
+    {'date': '2024-01-02', 'amount': 'nan'},
+    {'date': '2024-01-02', 'amount': '0'},
+    {'date': '2024-01-02', 'amount': '5', 'type': 'transfer'},
+    {'date': '02.01.2024', 'amount': '5'},
+    {'date': '2999-01-01', 'amount': '5'},
+])
+def test_parse_csv_row_rejects(row):
+    with pytest.raises(ValueError):
+        parse_csv_row(row)
+
+
+def test_import_is_applied_at_once_and_exports_back(open_storage, bind):
+    storage = open_storage()
+    bind({'storage': storage, 'users': storage.users})
+    save_user('1', 'Benchmark')
+    file = io.StringIO(
+        'Date;Amount;Category;Description\n'
+        '2024-01-03;-10,50;Food;Lunch\n'
+        '2024-01-01;2 000,00;Job;\n'
+        '2024-01-02;nan;Food;Broken\n'
+        '2024-01-02;-1,234;Food;Ambiguous\n'
+        '\n'
+        '2024-01-02;-5;Transport;Bus\n',
+        newline='',
+    )
+
+    (summary, records, entries) = import_csv('1', file)
+
+    assert (summary['expenses'], summary['incomes'], summary['skipped']) == (2, 1, 2)
+    assert len(summary['errors']) == 2
+    assert not storage.users['1'].records_by_id['expenses']
+
+    apply_import(storage.users['1'], records, entries)
+    storage.close()
+    user = open_storage().users['1']
+    exported = io.StringIO(newline='')
+
+    assert export_csv(user, exported) == 3
+    assert exported.getvalue().splitlines() == [
+        'date,type,category,description,amount',
+        '2024-01-01,income,Job,,2000.0',
+        '2024-01-02,expense,Transport,Bus,5.0',
+        '2024-01-03,expense,Food,Lunch,10.5',
+    ]
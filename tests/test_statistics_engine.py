@@ -0,0 +1,89 @@
+import math
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from classes import Expense, User  # noqa: E402
+from statistics_engine import RecordColumns, StatisticsEngine  # noqa: E402
+
+FIRST_DAY = 738000
+CATEGORIES = ['Food', 'Home', 'Transport', 'Other']
+
+
+def add_random_expense(user: User, rng: random.Random) -> None:
+    category = rng.choice(CATEGORIES)
+    user.add_expense(category, Expense(rng.randint(1, 400) / 4, 'Item', category,
+                                       FIRST_DAY + rng.randint(0, 400)))
+
+
+def assert_same_amounts(engine_amounts: dict, user_amounts: dict) -> None:
+    assert list(engine_amounts) == list(user_amounts)
+
+    for category, amount in user_amounts.items():
+        assert math.isclose(engine_amounts[category], amount, abs_tol=1e-6)
+
+
+def test_columns_follow_adds_and_deletes_without_rebuilding(monkeypatch):
+    rng = random.Random(0)
+    user = User('Benchmark')
+
+    for _ in range(500):
+        add_random_expense(user, rng)
+
+    engine = StatisticsEngine()
+    engine.get_columns(user, 'expenses')
+    # Building the columns again fails from here on.
+    monkeypatch.setattr(RecordColumns, '__init__', None)
+
+    for _ in range(200):
+        for _ in range(rng.randint(0, 4)):
+            if rng.random() < 0.5:
+                add_random_expense(user, rng)
+            elif rng.random() < 0.1:
+                category = rng.choice(CATEGORIES)
+                user.delete_records('expenses', list(user.expenses.get(category, {})))
+            elif user.records_by_id['expenses']:
+                user.delete_records('expenses', [rng.choice(list(user.records_by_id['expenses']))])
+
+        (start, end) = sorted(rng.randint(FIRST_DAY - 10, FIRST_DAY + 410) for _ in range(2))
+
+        assert_same_amounts(engine.get_amounts_by_category(user, 'expenses', start, end),
+                            user.get_amounts_by_category('expenses', start, end))
+        assert math.isclose(engine.get_total_amount(user, 'expenses', start, end),
+                            sum(user.get_amounts_by_category('expenses', start, end).values()),
+                            abs_tol=1e-6)
+
+
+def test_columns_are_rebuilt_when_a_deleted_row_is_missing():
+    user = User('Benchmark')
+    user.add_expense('Food', Expense(10.0, 'Lunch', 'Food', FIRST_DAY))
+    engine = StatisticsEngine()
+    columns = engine.get_columns(user, 'expenses')
+
+    # A deletion the columns never saw the transaction of.
+    ghost = Expense(5.0, 'Ghost', 'Unknown', FIRST_DAY)
+    user.changes['expenses'].append((ghost, False))
+    user.versions['expenses'] += 1
+
+    rebuilt = engine.get_columns(user, 'expenses')
+
+    assert rebuilt is not columns
+    assert rebuilt.version == user.versions['expenses']
+    assert engine.get_amounts_by_category(user, 'expenses') == {'Food': 10.0}
+
+
+def test_columns_are_rebuilt_past_the_change_log():
+    rng = random.Random(1)
+    user = User('Benchmark')
+    add_random_expense(user, rng)
+    engine = StatisticsEngine()
+    columns = engine.get_columns(user, 'expenses')
+
+    for _ in range(len(user.changes['expenses']) + user.changes['expenses'].maxlen):
+        add_random_expense(user, rng)
+
+    assert engine.get_columns(user, 'expenses') is not columns
+    assert_same_amounts(engine.get_amounts_by_category(user, 'expenses'),
+                        user.get_amounts_by_category('expenses'))
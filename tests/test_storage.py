@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from classes import Expense
+from utils import save_user
+
+TODAY = 739000
+
+
+def add_expenses(storage, user_id: str, records: list) -> None:
+    storage.users[user_id].add_records('expenses', records)
+    storage.submit_many([
+        {'op': 'add', 'user_id': user_id, 'record_type': 'expenses',
+         'category': record.category, 'record': record.to_dict()}
+        for record in records
+    ])
+
+
+def snapshot_queries(storage, user_id: str) -> dict:
+    answers = {}
+
+    for (start, end) in [(None, None), (TODAY - 30, TODAY), (TODAY - 5, TODAY - 5)]:
+        for category in [None, 'Food']:
+            key = (start, end, category)
+            answers[key] = (
+                [record.id for record in storage.get_records(
+                    user_id, 'expenses', start, end, category)],
+                [record.id for record in storage.get_records(
+                    user_id, 'expenses', start, end, category, 7, 5)],
+                storage.count_records(user_id, 'expenses', start, end, category),
+            )
+
+        answers[(start, end)] = storage.get_amounts_by_category(user_id, 'expenses', start, end)
+
+    return answers
+
+
+def test_queued_and_written_answers_are_the_same(open_storage, bind):
+    rng = random.Random(0)
+    storage = open_storage()
+    bind({'storage': storage, 'users': storage.users})
+    save_user('1', 'Benchmark')
+    storage.flush()
+    storage.users['1'].create_expenses('Empty')
+    add_expenses(storage, '1', [
+        Expense(float(rng.randint(1, 50)), 'Item', rng.choice(['Food', 'Home']),
+                TODAY - rng.randint(0, 10))
+        for _ in range(60)
+    ])
+
+    assert storage.has_pending('1')
+    queued = snapshot_queries(storage, '1')
+    storage.flush()
+    assert not storage.has_pending('1')
+
+    assert snapshot_queries(storage, '1') == queued
+    assert queued[(None, None)]['Empty'] == 0
+
+
+@pytest.mark.parametrize('offset, limit', [(0, 5), (55, 10), (100, 5)])
+def test_pages_follow_the_full_listing(open_storage, bind, offset, limit):
+    storage = open_storage()
+    bind({'storage': storage, 'users': storage.users})
+    save_user('1', 'Benchmark')
+    add_expenses(storage, '1', [Expense(1.0, 'Item', 'Food', TODAY - i % 3) for i in range(60)])
+    storage.flush()
+
+    listing = storage.get_records('1', 'expenses')
+
+    assert [record.date for record in listing] == sorted(record.date for record in listing)
+    page = storage.get_records('1', 'expenses', offset=offset, limit=limit)
+
+    assert [record.id for record in page] == \
+        [record.id for record in listing[offset:offset + limit]]
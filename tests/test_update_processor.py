@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime
+
+from telegram import Chat, Message, Update, User
+
+from update_processor import PerChatUpdateProcessor
+
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    return Update(update_id, message=Message(
+        update_id, datetime.now(), Chat(chat_id, Chat.PRIVATE),
+        from_user=User(chat_id, 'Benchmark', False), text=str(update_id),
+    ))
+
+
+def test_updates_of_a_chat_keep_their_order_while_other_chats_go_on():
+    processor = PerChatUpdateProcessor(max_concurrent_updates=4)
+    events = []
+    release = {}
+
+    async def handle(update_id: int, chat_id: int) -> None:
+        events.append(('start', update_id))
+        release[update_id] = asyncio.Event()
+
+        if chat_id == 1 and update_id == 1:
+            await release[update_id].wait()
+
+        await asyncio.sleep(0)
+        events.append(('end', update_id))
+
+    async def process() -> None:
+        updates = [(1, 1), (2, 1), (3, 2), (4, 1), (5, 2)]
+        tasks = [
+            asyncio.create_task(processor.process_update(
+                make_update(update_id, chat_id), handle(update_id, chat_id)))
+            for (update_id, chat_id) in updates
+        ]
+
+        while ('end', 5) not in events:
+            await asyncio.sleep(0)
+
+        # The first update of chat 1 is stuck; chat 2 is done, chat 1 waits its turn.
+        assert [event for event in events if event[1] in (2, 4)] == []
+        release[1].set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(process())
+
+    assert [update_id for (kind, update_id) in events if kind == 'start'] == [1, 3, 5, 2, 4]
+    assert events[events.index(('end', 1)):] == [
+        ('end', 1), ('start', 2), ('end', 2), ('start', 4), ('end', 4),
+    ]
+    assert processor._locks == {}
+
+
+def test_updates_without_a_chat_are_not_serialized():
+    processor = PerChatUpdateProcessor(max_concurrent_updates=2)
+    running = []
+
+    async def handle() -> None:
+        running.append(1)
+        await asyncio.sleep(0.01)
+        assert len(running) == 2
+
+    async def process() -> None:
+        await asyncio.gather(processor.process_update(object(), handle()),
+                             processor.process_update(object(), handle()))
+
+    asyncio.run(process())
+
+    assert PerChatUpdateProcessor.get_chat_key(object()) is None
+    assert PerChatUpdateProcessor.get_chat_key(make_update(1, 42)) == 42
@@ -0,0 +1,38 @@
+from classes import Expense, User
+from utils import get_amounts_by_category, get_general_amount, save_user
+
+FIRST_DAY = 738000
+
+
+def test_emptied_categories_leave_no_running_totals():
+    user = User('Benchmark')
+    user.add_records('expenses', [
+        Expense(0.1, 'Item', category, FIRST_DAY + day)
+        for day in range(0, 90, 3) for category in ['Food', 'Home']
+    ])
+
+    user.delete_records('expenses', [
+        record.id for record in user.records_by_id['expenses'].values()
+        if record.category == 'Food'
+    ])
+
+    assert list(user.totals['expenses']) == ['Home']
+
+    for buckets in (user.monthly_totals['expenses'], user.weekly_totals['expenses']):
+        assert all(list(totals) == ['Home'] for totals in buckets.values())
+
+    user.delete_records('expenses', list(user.records_by_id['expenses']))
+
+    assert user.monthly_totals['expenses'] == user.weekly_totals['expenses'] == {}
+
+
+def test_summed_amounts_are_not_truncated_below_their_value(open_storage, bind):
+    storage = open_storage()
+    bind({'storage': storage, 'users': storage.users})
+    save_user('1', 'Benchmark')
+    storage.users['1'].add_records('expenses', [
+        Expense(amount, 'Item', 'Food', FIRST_DAY) for amount in [0.1] * 10 + [0.7, 0.1, 0.2]
+    ])
+
+    assert get_general_amount('1', 'expenses') == 2
+    assert get_amounts_by_category('1', 'expenses') == {'Food': 2}
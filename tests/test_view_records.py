@@ -0,0 +1,65 @@
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+from classes import Expense
+from commands.view_records_handlers import PAGE_CALLBACK, build_records_page, turn_page
+from utils import save_user
+
+
+def press(data: str, user_id: int = 1) -> SimpleNamespace:
+    async def answer() -> None:
+        pass
+
+    query = SimpleNamespace(
+        data=data,
+        answer=answer,
+        from_user=SimpleNamespace(id=user_id),
+        message=SimpleNamespace(chat=SimpleNamespace(id=user_id), message_id=7),
+    )
+
+    return SimpleNamespace(callback_query=query)
+
+
+def test_page_buttons_keep_their_listing_filter(open_storage, bind, outbox, bot):
+    storage = open_storage()
+    bind({'storage': storage, 'users': storage.users})
+    save_user('1', 'Benchmark')
+    today = date.today().toordinal()
+    storage.users['1'].add_records('expenses', [
+        Expense(float(day), 'Item', 'Food' if day % 2 else 'Home', today - day)
+        for day in range(100)
+    ])
+
+    (_, markup) = build_records_page('1', 'expenses', ('Year', 'Food'), 0)
+    (button,) = markup.inline_keyboard[0]
+
+    assert button.callback_data == 'page:expenses:20:Year:Food'
+    assert len(button.callback_data.encode()) <= 64
+
+    # Another listing in between does not change what the button pages through.
+    build_records_page('1', 'expenses', (None, None), 0)
+
+    async def turn() -> None:
+        await turn_page(press(button.callback_data), SimpleNamespace(user_data={}))
+        await outbox.stop()
+
+    asyncio.run(turn())
+    (method, _, kwargs) = bot.calls[-1]
+    lines = kwargs['text'].splitlines()
+
+    assert method == 'edit_message_text'
+    assert lines[1].startswith('21. Category: Food')
+    assert all('Category: Food' in line for line in lines[1:21])
+    assert lines[-1] == 'Page 2 of 3'
+
+
+def test_page_callback_is_parsed_strictly():
+    assert PAGE_CALLBACK.match('page:incomes:40::').groupdict() == {
+        'record_type': 'incomes', 'offset': '40', 'date_filter': None, 'category': '',
+    }
+    assert PAGE_CALLBACK.match('page:expenses:0:Month:Debts,:x')['category'] == 'Debts,:x'
+
+    for data in ['page:expenses:20', 'page:other:0::', 'page:expenses:-1::',
+                 'page:expenses:0:Day:', 'page:expenses:0::Food\nx']:
+        assert PAGE_CALLBACK.match(data) is None
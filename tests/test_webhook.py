@@ -0,0 +1,86 @@
+import asyncio
+import socket
+import urllib.error
+
+import pytest
+
+pytest.importorskip('tornado')
+
+from telegram import User  # noqa: E402
+from telegram.ext import ExtBot  # noqa: E402
+
+import main  # noqa: E402
+from scripts.post_fake_updates import make_update, post_update  # noqa: E402
+
+SECRET_TOKEN = 'secret'
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def offline_bot(monkeypatch):
+    """
+    Answers the Bot API calls the application makes itself without reaching Telegram.
+    """
+    async def get_me(self, *args, **kwargs) -> User:
+        self._bot_user = User(1, 'Expense Tracker', True, username='expense_tracker_bot')
+
+        return self._bot_user
+
+    async def succeed(self, *args, **kwargs) -> bool:
+        return True
+
+    monkeypatch.setattr(ExtBot, 'get_me', get_me)
+    monkeypatch.setattr(ExtBot, 'set_webhook', succeed)
+    monkeypatch.setattr(ExtBot, 'delete_webhook', succeed)
+
+
+def test_posted_updates_are_dispatched(open_storage, bind, outbox, bot, offline_bot,
+                                       monkeypatch, tmp_path):
+    storage = open_storage()
+    bind({'storage': storage, 'users': storage.users})
+    monkeypatch.setattr(main, 'CONVERSATION_FILE', str(tmp_path / 'conversations.sqlite3'))
+    port = get_free_port()
+    url = f'http://127.0.0.1:{port}/hook'
+    app = main.build_application()
+
+    async def serve() -> None:
+        await app.initialize()
+        await app.updater.start_webhook(
+            listen='127.0.0.1', port=port, url_path='hook',
+            webhook_url=url, secret_token=SECRET_TOKEN,
+        )
+        await app.start()
+
+        try:
+            status = await asyncio.to_thread(
+                post_update, url, make_update(1, 7, '/start'), SECRET_TOKEN)
+            assert status == 200
+
+            with pytest.raises(urllib.error.HTTPError):
+                await asyncio.to_thread(post_update, url, make_update(2, 8, '/start'), 'wrong')
+
+            for _ in range(200):
+                await outbox.join()
+
+                if bot.calls:
+                    break
+
+                await asyncio.sleep(0.01)
+        finally:
+            await app.updater.stop()
+            await app.stop()
+            await app.shutdown()
+            await outbox.stop()
+
+    asyncio.run(serve())
+
+    ((method, chat_id, kwargs),) = bot.calls
+    assert (method, chat_id) == ('send_message', 7)
+    assert kwargs['text'].startswith('Hello, User 7.')
+    assert storage.users['7'].name == 'User 7'
@@ -0,0 +1,101 @@
+import asyncio
+from typing import Any, Awaitable
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates concurrently while keeping the order of updates within a chat.
+
+    Updates of one chat wait for each other on a per-chat lock before taking one of
+    the max_concurrent_updates slots, so a slow handler in one chat never holds back
+    other chats, and a burst in one chat never takes all the slots.
+
+    Methods:
+    - process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+                Processes an update once the previous updates of its chat are done.
+    """
+    def __init__(self, max_concurrent_updates: int) -> None:
+        """
+        Initializes a new PerChatUpdateProcessor object.
+
+        Args:
+        - max_concurrent_updates (int): The maximum number of updates processed at once.
+        """
+        super().__init__(max_concurrent_updates)
+        self._locks = {}
+
+    @staticmethod
+    def get_chat_key(update: object) -> int | None:
+        """
+        Returns the key the updates are serialized by.
+
+        Args:
+        - update (object): The update.
+
+        Returns:
+        - int | None: The chat ID, the user ID for updates without a chat,
+                    None for updates that need no ordering.
+        """
+        if not isinstance(update, Update):
+            return None
+
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+
+        if update.effective_user is not None:
+            return update.effective_user.id
+
+        return None
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        Processes an update once the previous updates of its chat are done.
+
+        Args:
+        - update (object): The update.
+        - coroutine (Awaitable[Any]): The coroutine processing the update.
+
+        Returns:
+        - None
+        """
+        key = self.get_chat_key(update)
+
+        if key is None:
+            await super().process_update(update, coroutine)
+            return
+
+        (lock, waiting) = self._locks.get(key, (asyncio.Lock(), 0))
+        self._locks[key] = (lock, waiting + 1)
+
+        try:
+            async with lock:
+                await super().process_update(update, coroutine)
+        finally:
+            (lock, waiting) = self._locks[key]
+
+            if waiting == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, waiting - 1)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        Awaits the coroutine processing the update.
+
+        Args:
+        - update (object): The update.
+        - coroutine (Awaitable[Any]): The coroutine processing the update.
+
+        Returns:
+        - None
+        """
+        await coroutine
+
+    async def initialize(self) -> None:
+        """Nothing to initialize."""
+
+    async def shutdown(self) -> None:
+        """Nothing to shut down."""
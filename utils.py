@@ -1,21 +1,91 @@
-import json
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
+from itertools import groupby
+from typing import Iterable, Iterator
 
-from constants import users
+from classes import Expense, Income, covers_whole_months
+from constants import users, storage, BUDGET_WARNING_SHARE
+from statistics_engine import engine
+from date_windows import get_window, parse_range
 
 
-def save_data(data: dict) -> None:
+def save_user(user_id: str, name: str) -> None:
     """
-    Saves the provided data to a JSON file.
+    Queues the creation of a new user for the journal.
 
     Args:
-    - data (dict): The data to be saved.
+    - user_id (str): The user's ID.
+    - name (str): The name of the user.
+
+    Returns:
+    - None
+    """
+    storage.submit({'op': 'user', 'user_id': user_id, 'name': name})
+
+
+def save_record(user_id: str, record_type: str, record: Expense | Income) -> None:
+    """
+    Queues a new record of the user for the journal.
+
+    Args:
+    - user_id (str): The user's ID.
+    - record_type (str): The type of record ('expenses' or 'incomes').
+    - record (Expense | Income): The record to be saved.
+
+    Returns:
+    - None
+    """
+    storage.submit({
+        'op': 'add',
+        'user_id': user_id,
+        'record_type': record_type,
+        'category': record.category,
+        'record': record.to_dict(),
+    })
+
+
+def save_budget(user_id: str, category: str, limit: float | None) -> None:
+    """
+    Queues a change of the user's monthly budget of a category for the journal.
+
+    Args:
+    - user_id (str): The user's ID.
+    - category (str): The name of the expense category.
+    - limit (float | None): The new budget, None when the budget is removed.
 
     Returns:
     - None
     """
-    with open('data.json', 'w') as file:
-        json.dump(data, file, indent=4)
+    storage.submit({'op': 'budget', 'user_id': user_id, 'category': category, 'limit': limit})
+
+
+def get_budget_warning(category: str, status: tuple | None, date_ordinal: int) -> str | None:
+    """
+    Builds the warning about a monthly budget that is nearly or completely spent.
+
+    Args:
+    - category (str): The name of the expense category.
+    - status (tuple | None): The amount spent in the month and the budget, as returned by
+      User.get_budget_status.
+    - date_ordinal (int): The date ordinal of the expense, naming the month of the budget.
+
+    Returns:
+    - str | None: The warning, None if there is no budget or less than
+      BUDGET_WARNING_SHARE of it is spent.
+    """
+    if status is None:
+        return None
+
+    (spent, limit) = status
+    month = date.fromordinal(date_ordinal).strftime('%Y-%m')
+
+    if spent > limit:
+        return f'Budget exceeded: {spent:.2f} of {limit:.2f} UAH spent on {category} in {month}.'
+
+    if spent >= limit * BUDGET_WARNING_SHARE:
+        return (f'Budget almost spent: {spent:.2f} of {limit:.2f} UAH spent on {category} '
+                f'in {month}, {limit - spent:.2f} UAH left.')
+
+    return None
 
 
 def is_valid_date(input_date: str) -> bool:
@@ -41,196 +111,295 @@ def is_valid_date(input_date: str) -> bool:
         return False
 
 
-def get_items_list(items: list, is_expense: bool) -> list:
+def iter_items(items: Iterable, is_expense: bool) -> Iterator[str]:
     """
-    Generates a list of formatted item strings.
+    Formats items one at a time.
 
     Args:
-    - items (list): The list of items.
+    - items (Iterable): The items.
     - is_expense (bool): Indicates whether the items are expenses.
 
     Returns:
-    - list: The list of formatted item strings.
+    - Iterator[str]: The formatted item strings.
     """
-    items_list = []
-
     for item in items:
         if is_expense:
-            message = (f"Category: {item['category']}, "
-                       f"Name: {item['title']} "
-                       f"(Date: {item['date']}) - {item['amount']}UAH")
+            yield (f"Category: {item.category}, "
+                   f"Name: {item.title} "
+                   f"(Date: {item.date_string}) - {item.amount}UAH")
         else:
-            message = f"Category: {item['category']} (Date: {item['date']}) - {item['amount']}UAH"
-        items_list.append(message)
-
-    return items_list
+            yield f"Category: {item.category} (Date: {item.date_string}) - {item.amount}UAH"
 
 
-def get_records_by_date(items: list, date_filter: str) -> list:
+def get_items_list(items: list, is_expense: bool) -> list:
     """
-    Filters items by date based on the specified filter.
+    Generates a list of formatted item strings.
 
     Args:
     - items (list): The list of items.
-    - date_filter (str): The date filter ('Week', 'Month', or 'Year').
+    - is_expense (bool): Indicates whether the items are expenses.
 
     Returns:
-    - list: The filtered list of items.
+    - list: The list of formatted item strings.
     """
-    today = date.today()
-    filtered_records = []
-    start_date = None
-    end_date = None
+    return list(iter_items(items, is_expense))
 
-    for item in items:
-        item_date = datetime.strptime(item['date'], "%Y-%m-%d")
 
-        match date_filter:
-            case 'Week':
-                start_date = today - timedelta(days=today.weekday())
-                end_date = start_date - timedelta(days=6)
-            case 'Month':
-                start_date = today - timedelta(days=today.weekday())
-                end_date = today.replace(month=today.month - 1)
-            case 'Year':
-                start_date = today - timedelta(days=today.weekday())
-                end_date = today - timedelta(days=365)
+def get_records_by_date(user_id: str, record_type: str, date_filter: str, category=None) -> list:
+    """
+    Filters the user's records by date based on the specified filter.
 
-        if start_date >= item_date.date() >= end_date:
-            filtered_records.append(item)
+    Args:
+    - user_id (str): The user's ID.
+    - record_type (str): The type of records ('expenses' or 'incomes').
+    - date_filter (str): The date filter ('Week', 'Month', or 'Year').
+    - category (str, optional): The category of the records.
 
-    return filtered_records
+    Returns:
+    - list: The filtered list of records.
+    """
+    (start_date, end_date) = get_window(date_filter)
 
+    return storage.get_records(user_id, record_type, start_date, end_date, category)
 
-def get_transaction_list(transaction: dict, is_expense: bool, date_filter=None) -> list:
+
+def get_records_page(
+        user_id: str,
+        record_type: str,
+        date_filter=None,
+        category=None,
+        offset: int = 0,
+        limit: int = 20,
+) -> tuple:
     """
-    Generates a list of formatted transaction strings.
+    Formats one page of the user's records.
+
+    Only the records of the page are read and formatted; the total is counted
+    by the storage without reading the records.
 
     Args:
-    - transaction (dict): The transaction data.
-    - is_expense (bool): Indicates whether the transactions are expenses.
+    - user_id (str): The user's ID.
+    - record_type (str): The type of records ('expenses' or 'incomes').
     - date_filter (str, optional): The date filter ('Week', 'Month', or 'Year').
+    - category (str, optional): The category of the records.
+    - offset (int, optional): The number of records before the page. Defaults to 0.
+    - limit (int, optional): The maximum number of records on the page. Defaults to 20.
 
     Returns:
-    - list: The list of formatted transaction strings.
+    - tuple: The list of formatted records of the page and the total number of records.
     """
-    filtered_records = []
-
-    if date_filter:
-        for _, items in transaction.items():
-            filtered_records.extend(get_records_by_date(items, date_filter))
-    else:
-        filtered_records = [item for sublist in transaction.values() for item in sublist]
+    (start_date, end_date) = get_window(date_filter) if date_filter else (None, None)
+    records = storage.get_records(
+        user_id, record_type, start_date, end_date, category, offset, limit
+    )
+    total = storage.count_records(user_id, record_type, start_date, end_date, category)
 
-    return get_items_list(filtered_records, is_expense)
+    return list(iter_items(records, record_type == 'expenses')), total
 
 
-def get_category_records_by_date(is_expense: bool, date_filter: str, records: list):
+def parse_dates(dates=None) -> tuple:
     """
-    Filters records by date based on the specified filter and category.
+    Parses a pair of dates in YYYY-MM-DD format.
 
     Args:
-    - is_expense (bool): Indicates whether the records are expenses.
-    - date_filter (str): The date filter ('Week', 'Month', or 'Year').
-    - records (list): The list of records.
+    - dates (tuple, optional): The start and end dates.
 
     Returns:
-    - list: The filtered list of records.
+    - tuple: The date ordinals of the start and end dates, (None, None) if no dates were provided.
     """
-    if records is None:
-        records = []
+    if dates is None:
+        return None, None
 
-    filtered_records = get_records_by_date(records, date_filter)
+    return parse_range(*dates)
 
-    return get_items_list(filtered_records, is_expense)
 
+def whole_amount(amount: float) -> int:
+    """
+    Drops the fractional part of an amount summed from floats.
+
+    The sum is rounded to cents first, so float errors such as 299.99999997
+    do not lose a whole unit.
+
+    Args:
+    - amount (float): The summed amount.
 
-def get_general_amount(records: dict, dates=None) -> int:
+    Returns:
+    - int: The whole part of the amount.
+    """
+    return int(round(amount, 2))
+
+
+def get_general_amount(user_id: str, record_type: str, dates=None) -> int:
     """
     Calculates the total amount from records within the specified date range.
 
+    All-time and whole-month ranges are read from the running totals; other
+    ranges use the NumPy statistics engine when NumPy is installed.
+
     Args:
-    - records (dict): The records data.
+    - user_id (str): The user's ID.
+    - record_type (str): The type of records ('expenses' or 'incomes').
     - dates (tuple, optional): The start and end dates.
 
     Returns:
     - int: The total amount.
     """
-    total_amount = 0
+    (start_date, end_date) = parse_dates(dates)
 
-    if dates is None:
-        for _, items in records.items():
-            for item in items:
-                total_amount += item['amount']
+    if engine is not None and not covers_whole_months(start_date, end_date):
+        amount = engine.get_total_amount(users[user_id], record_type, start_date, end_date)
     else:
-        (start_date, end_date) = dates
-        start_date = datetime.strptime(start_date, "%Y-%m-%d")
-        end_date = datetime.strptime(end_date, "%Y-%m-%d")
+        amount = storage.get_total_amount(user_id, record_type, start_date, end_date)
 
-        for _, items in records.items():
-            for item in items:
-                item_date = datetime.strptime(item['date'], "%Y-%m-%d")
+    return whole_amount(amount)
 
-                if start_date <= item_date <= end_date:
-                    total_amount += item['amount']
 
-    return int(total_amount)
+def get_amounts_by_category(user_id: str, record_type: str, dates=None) -> dict:
+    """
+    Calculates the total amounts by category within the specified date range.
 
+    All-time and whole-month ranges are read from the running totals; other
+    ranges use the NumPy statistics engine when NumPy is installed.
+
+    Args:
+    - user_id (str): The user's ID.
+    - record_type (str): The type of records ('expenses' or 'incomes').
+    - dates (tuple, optional): The start and end dates.
 
-def get_amounts_by_category(records: dict, start_date: str, end_date: str) -> list:
+    Returns:
+    - dict: The total amounts keyed by category.
     """
-    Calculates the total amounts by category within the specified date range.
+    (start_date, end_date) = parse_dates(dates)
+
+    if engine is not None and not covers_whole_months(start_date, end_date):
+        amounts = engine.get_amounts_by_category(users[user_id], record_type, start_date, end_date)
+    else:
+        amounts = storage.get_amounts_by_category(user_id, record_type, start_date, end_date)
+
+    return {category: whole_amount(amount) for category, amount in amounts.items()}
+
+
+def get_trend(user_id: str, period: str, dates: tuple) -> tuple:
+    """
+    Calculates the expenses by category and the incomes of every week or month of a date range.
+
+    The amounts come from the user's weekly and monthly running totals,
+    so no transaction is scanned.
 
     Args:
-    - records (dict): The records data.
-    - start_date (str): The start date.
-    - end_date (str): The end date.
+    - user_id (str): The user's ID.
+    - period (str): The length of a period ('week' or 'month').
+    - dates (tuple): The start and end dates.
 
     Returns:
-    - list: The list of total amounts by category.
+    - tuple: The labels of the periods, the expenses of every period keyed by category
+            (only the categories with expenses in the range) and the total incomes of every period.
     """
-    amounts_by_category = []
-    start_date = datetime.strptime(start_date, "%Y-%m-%d")
-    end_date = datetime.strptime(end_date, "%Y-%m-%d")
+    (start_date, end_date) = parse_dates(dates)
+    user = users[user_id]
+    expenses = user.get_trend('expenses', period, start_date, end_date)
+    incomes = user.get_trend('incomes', period, start_date, end_date)
+    label_format = '%Y-%m' if period == 'month' else '%Y-%m-%d'
 
-    for _, items in records.items():
-        total_amount = 0
+    labels = [date.fromordinal(first_day).strftime(label_format) for first_day, _ in expenses]
+    expenses_by_category = {}
 
-        for item in items:
-            item_date = datetime.strptime(item['date'], "%Y-%m-%d")
+    for category in user.expenses:
+        series = [round(amounts.get(category, 0), 2) for _, amounts in expenses]
 
-            if start_date <= item_date <= end_date:
-                total_amount += item['amount']
+        if any(series):
+            expenses_by_category[category] = series
 
-        amounts_by_category.append(int(total_amount))
+    income_totals = [round(sum(amounts.values()), 2) for _, amounts in incomes]
 
-    return amounts_by_category
+    return labels, expenses_by_category, income_totals
 
 
-def delete_record_from_data(
-        chosen_record: dict,
-        user_id: str,
-        record_type: str,
-        category: str
-) -> None:
+def select_record_ids(user_id: str, record_type: str, selection: str) -> list | None:
     """
-    Deletes a record from the user's data.
+    Resolves the records chosen for deletion.
+
+    The selection is either record numbers and ranges of numbers separated
+    by commas or spaces (e.g. "1, 3 5-7"), a date range
+    ("YYYY-MM-DD - YYYY-MM-DD") or a date filter ('Week', 'Month' or 'Year').
+    Numbers refer to the date-ordered listing of all the user's records of the type
+    and are resolved with one sliced query per run of consecutive numbers,
+    so no list of the listed IDs has to be kept.
 
     Args:
-    - chosen_record (dict): The record to be deleted.
     - user_id (str): The user's ID.
-    - record_type (str): The type of record ('expenses' or 'incomes').
-    - category (str): The category of the record.
+    - record_type (str): The type of records ('expenses' or 'incomes').
+    - selection (str): The text entered by the user.
 
     Returns:
-    - None
+    - list | None: The IDs of the chosen records, None if the selection is invalid.
     """
-    for i, record in enumerate(users[user_id][record_type][category]):
-        if id(chosen_record) == id(record):
-            if len(users[user_id][record_type][category]) <= 1:
-                del users[user_id][record_type][category]
+    dates = selection.split(' - ')
+
+    if len(dates) == 2 or selection.capitalize() in ('Week', 'Month', 'Year'):
+        try:
+            if len(dates) == 2:
+                (start_date, end_date) = parse_range(dates[0].strip(), dates[1].strip())
             else:
-                del users[user_id][record_type][category][i]
-                break
+                (start_date, end_date) = get_window(selection.capitalize())
+        except ValueError:
+            return None
+
+        chosen = storage.get_records(user_id, record_type, start_date, end_date)
+
+        return [record.id for record in chosen] or None
+
+    total = storage.count_records(user_id, record_type)
+    numbers = set()
+
+    for part in selection.replace(',', ' ').split():
+        (first, _, last) = part.partition('-')
+
+        if not first.isdigit() or not (last or first).isdigit():
+            return None
+
+        first, last = int(first), int(last or first)
+
+        if first < 1 or last > total or first > last:
+            return None
+
+        numbers.update(range(first, last + 1))
+
+    if not numbers:
+        return None
+
+    chosen = []
+
+    for _, run in groupby(enumerate(sorted(numbers)), lambda item: item[1] - item[0]):
+        run = [number for _, number in run]
+        chosen.extend(
+            record.id for record in
+            storage.get_records(user_id, record_type, offset=run[0] - 1, limit=len(run))
+        )
+
+    return chosen
+
+
+def delete_records_from_data(user_id: str, record_type: str, record_ids: list) -> int:
+    """
+    Deletes records from the user's data and queues a single journal entry for all of them.
+
+    Args:
+    - user_id (str): The user's ID.
+    - record_type (str): The type of records ('expenses' or 'incomes').
+    - record_ids (list): The IDs of the records to be deleted.
+
+    Returns:
+    - int: The number of deleted records.
+    """
+    deleted = users[user_id].delete_records(record_type, record_ids)
+
+    if deleted:
+        storage.submit({
+            'op': 'delete',
+            'user_id': user_id,
+            'record_type': record_type,
+            'ids': deleted,
+        })
 
-    save_data(users)
+    return len(deleted)